@@ -0,0 +1,164 @@
+"""
+Load test: latency of ordinary routes while one client floods /progress.
+
+Usage: python -m benchmarks.bench_admission [--duration 10] [--flooders 16]
+           [--probes 4] [--workers 1] [--threads 8]
+
+Runs the app under gunicorn (gunicorn.conf.py, gthread) three times:
+``baseline`` (no flood), ``flood_unprotected`` (rate limits off, no chart
+render cap) and ``flood_protected`` (the default admission settings). In the
+flood runs ``--flooders`` connections from one client address reload
+/progress and its chart in a loop, alternating between two members with a
+one-entry chart cache so most charts are re-rendered. Meanwhile ``--probes``
+clients, each request from a fresh address, time GET /summary, GET /plan and
+POST /api/v1/users/<id>/workouts. Prints a JSON report of probe latency
+percentiles and the flood's responses by status.
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import threading
+import time
+from collections import Counter
+from itertools import count
+
+from benchmarks.bench_routes import summarize
+from benchmarks.bench_startup import free_port, wait_for
+
+FLOOD_ADDRESS = "203.0.113.7"
+MEMBERS = ("FLOODA", "FLOODB")
+SEED_SESSIONS = 30
+SCENARIOS = {
+    "baseline": {"flood": False, "env": {}},
+    "flood_unprotected": {"flood": True,
+                          "env": {"ACEEST_RATE_LIMITS": "off", "ACEEST_CHART_CONCURRENCY": "0"}},
+    "flood_protected": {"flood": True, "env": {}},
+}
+PROBES = [
+    ("GET", "/summary", None),
+    ("GET", "/plan", None),
+    ("POST", "/api/v1/users/PROBE/workouts",
+     json.dumps({"category": "Workout", "exercise": "Probe", "duration": 20})),
+]
+_addresses = count(1)
+
+
+def next_address():
+    """Returns a client address not used before in this run."""
+    n = next(_addresses)
+    return f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}"
+
+
+def request(conn, method, path, body=None, *, address=None, cookie=None):  # pylint: disable=too-many-arguments
+    """Sends one request on ``conn``; returns (status, headers, seconds)."""
+    headers = {"X-Forwarded-For": address or next_address()}
+    if cookie:
+        headers["Cookie"] = cookie
+    if body is not None:
+        headers["Content-Type"] = ("application/json" if body.startswith("{")
+                                   else "application/x-www-form-urlencoded")
+    start = time.perf_counter()
+    conn.request(method, path, body=body, headers=headers)
+    response = conn.getresponse()
+    response.read()
+    return response.status, response.headers, time.perf_counter() - start
+
+
+def seed(port):
+    """Creates the flooded members with some sessions; returns their session cookies."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    cookies = []
+    for member in MEMBERS:
+        form = f"name={member}&regn_id={member}&age=30&gender=F&height=170&weight=60"
+        _, headers, _ = request(conn, "POST", "/", form)
+        cookies.append(headers["Set-Cookie"].split(";", 1)[0])
+        for i in range(SEED_SESSIONS):
+            request(conn, "POST", f"/api/v1/users/{member}/workouts",
+                    json.dumps({"category": ("Warm-up", "Workout", "Cool-down")[i % 3],
+                                "exercise": "Seed", "duration": 10 + i}))
+    conn.close()
+    return cookies
+
+
+def flood(port, cookie, stop, statuses):
+    """Reloads /progress and its chart from one address until ``stop`` is set."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    while not stop.is_set():
+        for path in ("/progress", "/progress.png"):
+            status, _, _ = request(conn, "GET", path, address=FLOOD_ADDRESS, cookie=cookie)
+            statuses[f"{path} {status}"] += 1
+    conn.close()
+
+
+def probe(port, stop, latencies):
+    """Times the probe routes round-robin until ``stop`` is set."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    while not stop.is_set():
+        for method, path, body in PROBES:
+            status, _, seconds = request(conn, method, path, body)
+            if status < 400:
+                latencies[f"{method} {path}"].append(seconds)
+    conn.close()
+
+
+def run_scenario(flooding, env, args):
+    """Starts gunicorn with ``env``, applies the load and returns the scenario report."""
+    port = free_port()
+    proc = subprocess.Popen(  # pylint: disable=consider-using-with
+        ["gunicorn", "-c", "gunicorn.conf.py", "src.wsgi:application"],
+        env={**os.environ, "PORT": str(port), "ACEEST_PROXY_HOPS": "1",
+             "ACEEST_CHART_CACHE_SIZE": "1", "GUNICORN_WORKER_CLASS": "gthread",
+             "GUNICORN_WORKERS": str(args.workers), "GUNICORN_THREADS": str(args.threads),
+             **env},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for(f"http://127.0.0.1:{port}/ready", time.perf_counter() + 60)
+        cookies = seed(port)
+        stop = threading.Event()
+        statuses = Counter()
+        latencies = {f"{method} {path}": [] for method, path, _ in PROBES}
+        threads = [threading.Thread(target=probe, args=(port, stop, latencies))
+                   for _ in range(args.probes)]
+        if flooding:
+            threads += [threading.Thread(target=flood,
+                                         args=(port, cookies[i % len(cookies)], stop, statuses))
+                        for i in range(args.flooders)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(args.duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        proc.terminate()
+        proc.wait(timeout=60)
+    report = {"probes": {route: summarize(values, elapsed)
+                         for route, values in latencies.items()}}
+    if flooding:
+        report["flood"] = {"requests_per_second": round(sum(statuses.values()) / elapsed, 1),
+                           "responses": dict(sorted(statuses.items()))}
+    return report
+
+
+def main():
+    """Parses arguments and prints the JSON report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--flooders", type=int, default=16)
+    parser.add_argument("--probes", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+    report = {"meta": vars(args)}
+    for name, scenario in SCENARIOS.items():
+        report[name] = run_scenario(scenario["flood"], scenario["env"], args)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark: scalar loops vs. the vectorised batch fitness functions.
+
+Usage: python -m benchmarks.bench_batch [--rows 1000000] [--repeat 3]
+Prints a JSON report with the best wall time of each variant and the speedup.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from src.fitness import (
+    WORKOUT_CATEGORIES, calculate_metrics, calculate_calories,
+    calculate_metrics_batch, calculate_calories_batch
+)
+
+
+def make_members(rows, seed=0):
+    """Returns random member columns of the given length."""
+    rng = np.random.default_rng(seed)
+    return {
+        "weight": rng.uniform(40, 150, rows),
+        "height": rng.uniform(140, 210, rows),
+        "age": rng.integers(16, 80, rows),
+        "gender": rng.choice(["M", "F"], rows),
+        "category": rng.choice(WORKOUT_CATEGORIES, rows),
+        "duration": rng.integers(5, 120, rows),
+    }
+
+
+def best_of(repeat, func):
+    """Returns the fastest of ``repeat`` runs of func(), in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(rows, repeat):
+    """Times every variant and returns the report dict."""
+    data = make_members(rows)
+    # Plain Python lists, as the nightly job had them before vectorising
+    lists = {name: column.tolist() for name, column in data.items()}
+
+    def metrics_loop():
+        return [calculate_metrics(w, h, a, g) for w, h, a, g in
+                zip(lists["weight"], lists["height"], lists["age"], lists["gender"])]
+
+    def calories_loop():
+        return [calculate_calories(c, d, w) for c, d, w in
+                zip(lists["category"], lists["duration"], lists["weight"])]
+
+    report = {"rows": rows, "repeat": repeat}
+    for name, loop, batch in (
+            ("metrics", metrics_loop,
+             lambda: calculate_metrics_batch(data["weight"], data["height"],
+                                             data["age"], data["gender"])),
+            ("calories", calories_loop,
+             lambda: calculate_calories_batch(data["category"], data["duration"],
+                                              data["weight"]))):
+        scalar_s = best_of(repeat, loop)
+        batch_s = best_of(repeat, batch)
+        report[name] = {
+            "scalar_s": round(scalar_s, 4),
+            "batch_s": round(batch_s, 4),
+            "speedup": round(scalar_s / batch_s, 1),
+        }
+    return report
+
+
+def main():
+    """Parses arguments and prints the JSON report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
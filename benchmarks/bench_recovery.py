@@ -0,0 +1,129 @@
+"""
+Benchmark: restart recovery time of the write-ahead-logged repository.
+
+Usage: python -m benchmarks.bench_recovery [--sessions 1000000] [--members 100]
+           [--tail 10000] [--writers 8] [--repeat 3]
+
+Logs ``--sessions`` sessions spread over ``--members`` members (as bulk-import
+batches), then times reopening the directory in two states: with only the log
+(every batch replayed), and after a snapshot followed by ``--tail`` single
+/add-style writes from ``--writers`` threads (snapshot memory-mapped, tail
+replayed). The tail writes also give the fsync'd write throughput with group
+commit. Prints a JSON report.
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.synthetic import session_columns
+from src.fitness import WORKOUT_CATEGORIES
+from src.repository import DurableRepository
+from src.store import to_epoch
+
+BATCH_ROWS = 10_000
+
+
+def seed(repo, sessions, members, seed_value=0):
+    """Logs ``sessions`` synthetic sessions in batches, round-robin over members."""
+    rng = np.random.default_rng(seed_value)
+    now = to_epoch(datetime.now())
+    for start in range(0, sessions, BATCH_ROWS):
+        repo.add_workouts(f"M{start // BATCH_ROWS % members}",
+                          session_columns(rng, min(BATCH_ROWS, sessions - start), now))
+
+
+def write_tail(repo, count, writers):
+    """Logs ``count`` single sessions from ``writers`` threads; returns the seconds taken."""
+    def worker(index):
+        for i in range(index, count, writers):
+            repo.add_workout(f"M{i % 7}", "Workout", "Tail", 30, 250.0, datetime.now())
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(writers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def time_restore(directory, repeat):
+    """Returns (best seconds to reopen ``directory``, sessions found)."""
+    timings, sessions = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        repo = DurableRepository(WORKOUT_CATEGORIES, directory)
+        timings.append(time.perf_counter() - start)
+        sessions = sum(repo.category_sizes().values())
+        repo.close()
+    return min(timings), sessions
+
+
+def disk_usage(directory):
+    """Returns {"log_bytes", "snapshot_bytes"} currently in ``directory``."""
+    usage = {"log_bytes": 0, "snapshot_bytes": 0}
+    for root, _, files in os.walk(directory):
+        for name in files:
+            size = os.path.getsize(os.path.join(root, name))
+            usage["log_bytes" if name.endswith(".log") else "snapshot_bytes"] += size
+    return usage
+
+
+def run(sessions, members, tail, writers, repeat):
+    """Runs both recovery scenarios and returns the report dict."""
+    directory = tempfile.mkdtemp(prefix="aceest-wal-")
+    try:
+        repo = DurableRepository(WORKOUT_CATEGORIES, directory)
+        start = time.perf_counter()
+        seed(repo, sessions, members)
+        seed_seconds = time.perf_counter() - start
+        repo.close()
+        log_only, found = time_restore(directory, repeat)
+        report = {
+            "sessions": sessions,
+            "members": members,
+            "seed_seconds": round(seed_seconds, 3),
+            "log_only": {"restore_seconds": round(log_only, 3), "sessions": found,
+                         **disk_usage(directory)},
+        }
+        repo = DurableRepository(WORKOUT_CATEGORIES, directory)
+        start = time.perf_counter()
+        repo.snapshot()
+        snapshot_seconds = time.perf_counter() - start
+        tail_seconds = write_tail(repo, tail, writers)
+        repo.close()
+        restore, found = time_restore(directory, repeat)
+        report["snapshot_and_tail"] = {
+            "snapshot_seconds": round(snapshot_seconds, 3),
+            "tail_writes": tail,
+            "tail_writes_per_second": round(tail / tail_seconds, 1),
+            "restore_seconds": round(restore, 3),
+            "sessions": found,
+            **disk_usage(directory),
+        }
+        return report
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    """Parses arguments and prints the JSON report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=lambda value: int(float(value)), default=1_000_000)
+    parser.add_argument("--members", type=int, default=100)
+    parser.add_argument("--tail", type=int, default=10_000)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.sessions, args.members, args.tail, args.writers, args.repeat),
+                     indent=2))
+
+
+if __name__ == "__main__":
+    main()
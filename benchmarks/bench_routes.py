@@ -0,0 +1,259 @@
+"""
+Benchmark: latency and throughput of every page route as the workout log grows.
+
+Usage: python -m benchmarks.bench_routes [--sizes 100,10000,1000000] [--requests 100]
+           [--concurrency 8] [--output results.json]
+           [--compare baseline.json [--threshold 0.2]]
+
+For each size the default member is seeded with that many synthetic sessions
+spread over the past year, then every route is timed through Flask's test
+client (sequential, in-process) and through a real threaded WSGI server
+(concurrent HTTP clients). calculate_metrics and calculate_calories are timed
+too. Only 200 and 302 responses are timed; any other status is counted under
+the route's "errors" and makes the exit status 1. The JSON report goes to
+stdout (and --output). With --compare, p90 route latencies and per-call
+function times are checked against a previous report and the exit status is 1
+if any got slower by more than --threshold.
+"""
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+import timeit
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from benchmarks.synthetic import session_columns
+from src.app import APP, REPO, DEFAULT_USER_ID
+from src.fitness import DEFAULT_WEIGHT_KG, calculate_metrics, calculate_calories
+from src.store import to_epoch
+
+# (method, path, form data); POST /add also keeps invalidating the chart cache
+ROUTES = [
+    ("GET", "/", None),
+    ("GET", "/add", None),
+    ("POST", "/add", {"category": "Workout", "exercise": "Bench", "duration": "30"}),
+    ("GET", "/summary", None),
+    ("GET", "/progress", None),
+    ("GET", "/progress.png", None),
+    ("GET", "/plan", None),
+    ("GET", "/diet", None),
+]
+DEFAULT_SIZES = "100,10000,1000000"
+SEED_CHUNK = 100_000
+# Anything else (429, 503, 500...) is an error, not a latency sample
+OK_STATUSES = (200, 302)
+# Regressions are judged on this percentile
+COMPARE_METRIC = "p90_ms"
+
+
+def seed(sessions, seed_value=0):
+    """Replaces all data with ``sessions`` synthetic sessions for the default member."""
+    REPO.clear()
+    REPO.save_profile(DEFAULT_USER_ID, {
+        "name": "Bench", "regn_id": DEFAULT_USER_ID, "age": 30, "gender": "M",
+        "height": 175.0, "weight": DEFAULT_WEIGHT_KG, "bmi": "22.9", "bmr": "1649",
+    })
+    rng = np.random.default_rng(seed_value)
+    now = to_epoch(datetime.now())
+    for start in range(0, sessions, SEED_CHUNK):
+        REPO.add_workouts(DEFAULT_USER_ID,
+                          session_columns(rng, min(SEED_CHUNK, sessions - start), now))
+
+
+def summarize(latencies, elapsed):
+    """Returns request count, throughput and latency percentiles (ms)."""
+    millis = np.asarray(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(float(np.percentile(millis, 50)), 3),
+        "p90_ms": round(float(np.percentile(millis, 90)), 3),
+        "p99_ms": round(float(np.percentile(millis, 99)), 3),
+        "max_ms": round(float(millis.max()), 3),
+    }
+
+
+def route_stats(samples, elapsed):
+    """Summarizes (status, seconds) samples, timing only the OK responses."""
+    latencies = [seconds for status, seconds in samples if status in OK_STATUSES]
+    errors = Counter(str(status) for status, _ in samples if status not in OK_STATUSES)
+    stats = summarize(latencies, elapsed) if latencies else {"requests": 0}
+    if errors:
+        stats["errors"] = dict(sorted(errors.items()))
+    return stats
+
+
+def bench_test_client(requests):
+    """Times each route sequentially through Flask's test client."""
+    client = APP.test_client()
+    results = {}
+    for method, path, data in ROUTES:
+        # One untimed request so lazy imports and caches do not skew the first sample
+        client.open(path, method=method, data=data)
+        samples = []
+        started = time.perf_counter()
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = client.open(path, method=method, data=data)
+            response.get_data()
+            samples.append((response.status_code, time.perf_counter() - start))
+        results[f"{method} {path}"] = route_stats(samples, time.perf_counter() - started)
+    return results
+
+
+class _QuietHandler(WSGIRequestHandler):
+    """Request handler without the per-request access log line."""
+
+    def log_request(self, code="-", size="-"):
+        pass
+
+
+def _http_request(port, method, path, data):
+    """Sends one request on a fresh connection; returns (status, seconds)."""
+    body = None
+    headers = {}
+    if data is not None:
+        body = "&".join(f"{key}={value}" for key, value in data.items())
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+    start = time.perf_counter()
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    try:
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+    finally:
+        conn.close()
+    return response.status, time.perf_counter() - start
+
+
+def bench_wsgi(requests, concurrency):
+    """Times each route with concurrent clients against a real threaded WSGI server."""
+    server = make_server("127.0.0.1", 0, APP, threaded=True, request_handler=_QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    results = {}
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as clients:
+            for method, path, data in ROUTES:
+                _http_request(server.port, method, path, data)
+                started = time.perf_counter()
+                samples = list(clients.map(
+                    lambda _, m=method, p=path, d=data: _http_request(server.port, m, p, d),
+                    range(requests)))
+                results[f"{method} {path}"] = route_stats(samples, time.perf_counter() - started)
+    finally:
+        server.shutdown()
+        thread.join()
+    return results
+
+
+def bench_functions(number=200_000):
+    """Returns nanoseconds per call of the scalar fitness functions."""
+    timings = {
+        "calculate_metrics": timeit.timeit(
+            lambda: calculate_metrics(72.5, 178.0, 34, "M"), number=number),
+        "calculate_calories": timeit.timeit(
+            lambda: calculate_calories("Workout", 45, 72.5), number=number),
+    }
+    return {name: {"ns_per_call": round(seconds / number * 1e9, 1)}
+            for name, seconds in timings.items()}
+
+
+def run(sizes, requests, concurrency):
+    """Runs every benchmark and returns the report dict."""
+    # Every request comes from one client; time the routes, not the rate limits
+    # (benchmarks/bench_admission.py covers those)
+    APP.extensions["admission"].limiters.clear()
+    report = {
+        "meta": {"sizes": sizes, "requests": requests, "concurrency": concurrency,
+                 "python": sys.version.split()[0]},
+        "functions": bench_functions(),
+        "routes": {"test_client": {}, "wsgi": {}},
+    }
+    for size in sizes:
+        seed(size)
+        report["routes"]["test_client"][str(size)] = bench_test_client(requests)
+        seed(size)
+        report["routes"]["wsgi"][str(size)] = bench_wsgi(requests, concurrency)
+    REPO.clear()
+    return report
+
+
+def _flatten(report):
+    """Returns {name: value} of the figures compared between reports."""
+    flat = {f"functions/{name}": entry["ns_per_call"]
+            for name, entry in report.get("functions", {}).items()}
+    for mode, by_size in report.get("routes", {}).items():
+        for size, by_route in by_size.items():
+            for route, stats in by_route.items():
+                if COMPARE_METRIC not in stats:
+                    continue
+                flat[f"routes/{mode}/{size}/{route}"] = stats[COMPARE_METRIC]
+    return flat
+
+
+def failed_routes(report):
+    """Returns the "mode/size/route" names that answered with an error status."""
+    return [f"{mode}/{size}/{route}"
+            for mode, by_size in report["routes"].items()
+            for size, by_route in by_size.items()
+            for route, stats in by_route.items() if "errors" in stats]
+
+
+def compare(baseline, current, threshold):
+    """Returns the figures that got slower than baseline * (1 + threshold)."""
+    before = _flatten(baseline)
+    regressions = []
+    for name, value in _flatten(current).items():
+        if name in before and before[name] > 0 and value > before[name] * (1 + threshold):
+            regressions.append({
+                "name": name,
+                "baseline": before[name],
+                "current": value,
+                "change": round(value / before[name] - 1, 3),
+            })
+    return regressions
+
+
+def main():
+    """Parses arguments, runs the suite and prints (and optionally compares) the report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help="comma-separated session counts to seed")
+    parser.add_argument("--requests", type=int, default=100, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=8, help="WSGI client threads")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--compare", help="baseline JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown before failing, as a fraction")
+    args = parser.parse_args()
+    sizes = [int(float(size)) for size in args.sizes.split(",")]
+    baseline = None
+    if args.compare:
+        # Read first so a bad path fails before the (long) run
+        with open(args.compare, encoding="utf-8") as previous:
+            baseline = json.load(previous)
+    report = run(sizes, args.requests, args.concurrency)
+    if baseline is not None:
+        report["regressions"] = compare(baseline, report, args.threshold)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as out:
+            out.write(text + "\n")
+    failed = failed_routes(report)
+    if failed:
+        print(f"Error responses from: {', '.join(failed)}", file=sys.stderr)
+    if report.get("regressions") or failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
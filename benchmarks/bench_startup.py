@@ -0,0 +1,116 @@
+"""
+Benchmark: cold start of the web app, with charting loaded lazily vs. eagerly.
+
+Usage: python -m benchmarks.bench_startup [--repeat 3]
+Imports the app in a fresh interpreter under ``python -X importtime`` to get the
+total import time, then starts it in another one and reports the time until
+/ready first answers (time to first byte) and until the first progress chart is
+served. The "eager" variant
+imports matplotlib.pyplot and pandas before the app, as src/app.py used to.
+"""
+import argparse
+import json
+import re
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+# Run inside child interpreters; {eager} and {port} are filled in per run
+IMPORT_SCRIPT = """
+if {eager}:
+    import matplotlib.pyplot, pandas
+import src.app
+"""
+SERVER_SCRIPT = IMPORT_SCRIPT + """
+from src.app import APP, CHART_SERVICE
+CHART_SERVICE.warm_up()
+APP.run(host="127.0.0.1", port={port}, debug=False, use_reloader=False)
+"""
+
+
+def free_port():
+    """Returns a TCP port that is currently free on localhost."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url, deadline, data=None):
+    """Polls url until it answers and returns the seconds waited from the call."""
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, data=data, timeout=5) as response:
+                response.read()
+                return time.perf_counter() - start
+        except OSError:
+            time.sleep(0.005)
+    raise TimeoutError(url)
+
+
+def import_seconds(stderr):
+    """Returns the total time spent importing modules, from -X importtime output.
+
+    Only top-level imports are summed (nested ones are already in their cumulative
+    time).
+    """
+    total = 0
+    for line in stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| (\S)", line)
+        if match:
+            total += int(match.group(1))
+    return total / 1e6
+
+
+def start_once(eager, timeout=60):
+    """Starts one server and returns its timings in seconds."""
+    imports = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_SCRIPT.format(eager=eager)],
+        capture_output=True, text=True, check=True, timeout=timeout,
+    )
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    proc = subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, "-c", SERVER_SCRIPT.format(eager=eager, port=port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = started + timeout
+        ready_s = (time.perf_counter() - started) + wait_for(base + "/ready", deadline)
+        # Log one session so the chart has something to draw; the default member is used
+        wait_for(base + "/add", deadline,
+                 data=b"category=Workout&exercise=Run&duration=30")
+        chart_s = wait_for(base + "/progress.png", deadline)
+    finally:
+        # SIGINT lets the server exit normally, which also stops the chart workers
+        proc.send_signal(signal.SIGINT)
+        proc.wait(timeout=timeout)
+    return {"import_s": import_seconds(imports.stderr), "ttfb_s": ready_s, "first_chart_s": chart_s}
+
+
+def run(repeat):
+    """Starts the app ``repeat`` times per variant and returns the best timings."""
+    report = {"repeat": repeat}
+    for name, eager in (("eager", True), ("lazy", False)):
+        runs = [start_once(eager) for _ in range(repeat)]
+        report[name] = {
+            key: round(min(r[key] for r in runs), 4) for key in runs[0]
+        }
+    report["ttfb_speedup"] = round(report["eager"]["ttfb_s"] / report["lazy"]["ttfb_s"], 1)
+    return report
+
+
+def main():
+    """Parses arguments and prints the JSON report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+"""
+Synthetic workout history shared by the benchmarks.
+"""
+from src.fitness import WORKOUT_CATEGORIES, DEFAULT_WEIGHT_KG, calculate_calories_batch
+from src.store import SECONDS_PER_DAY
+
+EXERCISES = ["Run", "Row", "Squat", "Plank", "Stretch"]
+
+
+def session_columns(rng, rows, now):
+    """Returns ``rows`` random sessions over the year before ``now`` (epoch seconds)."""
+    categories = rng.choice(WORKOUT_CATEGORIES, rows)
+    durations = rng.integers(5, 90, rows)
+    return {
+        "category": categories,
+        "exercise": rng.choice(EXERCISES, rows),
+        "duration": durations,
+        "calories": calculate_calories_batch(categories, durations, DEFAULT_WEIGHT_KG),
+        "timestamp": now - rng.integers(0, 365 * SECONDS_PER_DAY, rows),
+    }
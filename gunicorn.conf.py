@@ -0,0 +1,96 @@
+# pylint: disable=invalid-name
+
+"""
+Gunicorn settings for serving src.wsgi:application in production.
+
+Every value can be overridden from the environment (or the gunicorn command
+line). In-memory storage (memory://, or wal:///... persisted to a local log)
+lives in one process, so more than one worker needs ACEEST_STORAGE_URL=sqlite:///...
+
+Each open /events stream (live progress updates) holds a request thread under
+the default gthread worker. Pods serving many open pages should set
+GUNICORN_WORKER_CLASS=gevent, where a stream is a greenlet and one worker keeps
+up to GUNICORN_WORKER_CONNECTIONS of them open.
+"""
+import os
+import shutil
+import signal
+import tempfile
+
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+if worker_class == "gevent":
+    # Patch before the app is preloaded, so its locks, queues and sockets yield
+    # to other greenlets instead of blocking the whole worker
+    from gevent import monkey
+    monkey.patch_all()
+
+_shared_storage = os.environ.get("ACEEST_STORAGE_URL", "memory://").startswith("sqlite:")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+# Processes; threads inside each one overlap I/O (SQLite, sockets) and chart waits
+workers = int(os.environ.get("GUNICORN_WORKERS", "2" if _shared_storage else "1"))
+if workers > 1 and os.environ.get("ACEEST_STORAGE_URL", "").startswith("wal:"):
+    # Each worker would append its own writes to the one log (see DurableRepository.reopen)
+    raise RuntimeError("wal:/// storage is written by one process: set GUNICORN_WORKERS=1 "
+                       "or use sqlite:///")
+threads = int(os.environ.get("GUNICORN_THREADS", "8"))
+# Concurrent connections per gevent worker, idle event streams included
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", "4000"))
+# Keep connections from the ingress open between requests
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", "5"))
+# A worker that is silent this long is restarted; streamed exports heartbeat per chunk
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+# On SIGTERM (pod shutdown) workers finish in-flight requests for up to this long
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+# Recycle workers now and then so slow leaks (e.g. matplotlib caches) cannot build up;
+# only with shared storage, as a recycled worker takes in-memory state with it
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "5000" if _shared_storage else "0"))
+max_requests_jitter = 500
+# Build the app once in the master; workers fork with it already imported
+preload_app = True
+accesslog = "-"
+errorlog = "-"
+
+
+def _relay_directory(app, master_pid):
+    """Returns where this server's workers relay live events (ACEEST_EVENTS_DIR if set)."""
+    return app.config["EVENTS_DIR"] or os.path.join(
+        tempfile.gettempdir(), f"aceest-events-{master_pid}")
+
+
+def when_ready(server):
+    """Warms matplotlib/pandas in the master so forked workers start with them loaded."""
+    from src import charts  # pylint: disable=import-outside-toplevel
+    charts.load()
+    server.log.info("Chart modules loaded")
+
+
+def post_worker_init(worker):
+    """Reloads storage forked from the master, starts the chart renderer processes and
+    joins the relay that shares live events between this server's workers."""
+    # A respawned worker must not serve the master's startup state (see wal:///)
+    worker.wsgi.extensions["repository"].reopen()
+    worker.wsgi.extensions["charts"].warm_up()
+    broker = worker.wsgi.extensions["events"]
+    broker.start_relay(_relay_directory(worker.wsgi, worker.ppid))
+    handle_exit = signal.getsignal(signal.SIGTERM)
+
+    def drain_then_exit(signum, frame):
+        # Open event streams would otherwise hold a graceful stop for its whole timeout
+        broker.drain()
+        handle_exit(signum, frame)
+
+    signal.signal(signal.SIGTERM, drain_then_exit)
+    signal.siginterrupt(signal.SIGTERM, False)
+
+
+def worker_exit(server, worker):  # pylint: disable=unused-argument
+    """Stops the worker's chart renderer processes and event relay with it."""
+    worker.wsgi.extensions["charts"].shutdown()
+    worker.wsgi.extensions["events"].close()
+
+
+def on_exit(server):
+    """Removes the per-server event relay directory."""
+    if not server.app.wsgi().config["EVENTS_DIR"]:
+        shutil.rmtree(_relay_directory(server.app.wsgi(), os.getpid()), ignore_errors=True)
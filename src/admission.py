@@ -0,0 +1,181 @@
+"""
+Admission control for the ACEest Fitness Tracker's expensive routes.
+
+install(app) rate-limits requests per client and endpoint with token buckets
+(RateLimiter): each rule refills ``rate`` tokens per second up to ``burst``,
+every request takes one, and a client with none left gets 429 and a
+Retry-After of when its next token arrives. Rules come from DEFAULT_RULES,
+updated by ACEEST_RATE_LIMITS (see parse_rules()).
+
+Slots caps work in flight across the whole process: the app sheds progress
+chart renders beyond CHART_CONCURRENCY with 503 (see app.get_progress_chart),
+so a flood of chart requests can never take every worker thread.
+
+Clients are told apart by address, so rate limits need the client's own one:
+behind an ingress set ACEEST_PROXY_HOPS so it comes from X-Forwarded-For. A
+NodePort Service with the default externalTrafficPolicy may SNAT every client
+to a node address, sharing one bucket; either put an ingress in front, or opt
+in to externalTrafficPolicy: Local on the Service (which then only routes to
+pods on the node that took the connection). deployment/flask-app-deployment.yaml
+ships with the limits off for that reason. Everything is in-process: a token bucket is
+two floats per client, checked under one short lock per rule.
+"""
+import math
+import threading
+import time
+
+from flask import jsonify, make_response, request
+
+from src import metrics
+
+# endpoint: (tokens per second, burst); endpoints not listed are not limited
+DEFAULT_RULES = {
+    "progress_tracker": (1.0, 10),
+    "progress_chart": (1.0, 10),
+    "summary": (2.0, 20),
+    "add_workout": (2.0, 30),
+    "bulk_import": (0.05, 3),
+    "bulk_export": (0.1, 3),
+    "event_stream": (0.2, 5),
+    "api_v1.create_workout": (5.0, 50),
+    "api_v1.get_summary": (5.0, 20),
+    "api_v1.get_progress": (5.0, 20),
+    "api_v1.get_trends": (5.0, 20),
+    "api_v1.batch_metrics": (1.0, 5),
+    "api_v1.batch_calories": (1.0, 5),
+}
+# Clients tracked per rule; idle ones (whose bucket is full again) are forgotten first
+MAX_CLIENTS = 50_000
+
+
+def parse_rules(text):
+    """Returns DEFAULT_RULES updated from ``endpoint=rate/burst,...``.
+
+    ``endpoint=off`` drops one rule and ``off`` alone all of them. Raises
+    ValueError on malformed input.
+    """
+    rules = dict(DEFAULT_RULES)
+    text = text.strip()
+    if text == "off":
+        return {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        endpoint, _, limit = item.partition("=")
+        if limit == "off":
+            rules.pop(endpoint, None)
+            continue
+        try:
+            rate, burst = limit.split("/")
+            rules[endpoint] = (float(rate), int(burst))
+        except ValueError as err:
+            raise ValueError(f"Rate limit {item!r} must look like endpoint=rate/burst.") from err
+        if rules[endpoint][0] <= 0 or rules[endpoint][1] < 1:
+            raise ValueError(f"Rate limit {item!r} needs a positive rate and burst.")
+    return rules
+
+
+class RateLimiter:
+    """Token buckets for one rule, one per client."""
+
+    def __init__(self, rate, burst, max_clients=MAX_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        # client: (tokens, monotonic time they were counted)
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, client, now=None):
+        """Takes a token for ``client``; returns 0.0, or the seconds until one is available."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, stamp = self._buckets.get(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - stamp) * self.rate)
+            if tokens >= 1:
+                self._buckets[client] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[client] = (tokens, now)
+                wait = (1 - tokens) / self.rate
+            if len(self._buckets) > self.max_clients:
+                self._prune(now)
+        return wait
+
+    def _prune(self, now):
+        # Full buckets carry no state; then the longest-tracked clients go. Down to
+        # 3/4 of the limit, so a stream of new clients prunes once per many requests.
+        refill = self.burst / self.rate
+        self._buckets = {client: bucket for client, bucket in self._buckets.items()
+                         if now - bucket[1] < refill}
+        excess = len(self._buckets) - self.max_clients * 3 // 4
+        for client in list(self._buckets)[:max(0, excess)]:
+            del self._buckets[client]
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class Slots:
+    """A non-blocking cap on concurrent work: callers that find it full are turned away."""
+
+    def __init__(self, limit):
+        # 0 means no cap
+        self.limit = limit
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Takes a slot; returns False (taking nothing) when all are in use."""
+        with self._lock:
+            if self.limit and self._used >= self.limit:
+                return False
+            self._used += 1
+            return True
+
+    def release(self):
+        """Returns a slot taken by acquire()."""
+        with self._lock:
+            self._used -= 1
+
+    def available(self):
+        """Returns True if acquire() would succeed right now."""
+        return not self.limit or self._used < self.limit
+
+    def in_use(self):
+        """Returns the number of slots taken."""
+        return self._used
+
+
+class Admission:  # pylint: disable=too-few-public-methods
+    """An app's rate limiters (per endpoint) and chart render slots."""
+
+    def __init__(self, rules, chart_concurrency):
+        self.limiters = {endpoint: RateLimiter(rate, burst)
+                         for endpoint, (rate, burst) in rules.items()}
+        self.chart_slots = Slots(chart_concurrency)
+
+    def check(self):
+        """before_request hook: answers 429 when the client is out of tokens."""
+        limiter = self.limiters.get(request.endpoint)
+        if limiter is None:
+            return None
+        wait = limiter.acquire(request.remote_addr)
+        if not wait:
+            return None
+        metrics.ADMISSION_REJECTIONS.inc(request.endpoint, "rate_limited")
+        message = "Too many requests, slow down."
+        if request.blueprint == "api_v1":
+            response = jsonify(error=message)
+        else:
+            response = make_response(message)
+        response.status_code = 429
+        response.retry_after = math.ceil(wait)
+        return response
+
+
+def install(app):
+    """Rate-limits app's endpoints and adds its Admission as app.extensions["admission"]."""
+    admission = Admission(parse_rules(app.config["RATE_LIMITS"]),
+                          app.config["CHART_CONCURRENCY"])
+    app.extensions["admission"] = admission
+    app.before_request(admission.check)
+    return admission
@@ -0,0 +1,140 @@
+"""
+Trend analytics over a member's workout history for the ACEest Fitness Tracker.
+
+Reports are built from aggregates the repositories keep current on every
+append: per-day buckets (minutes, calories, sessions per category) and
+lifetime per-exercise totals. Logging a session only touches its own day and
+exercise buckets, and a report is a handful of vectorised NumPy operations
+over the days with sessions, however many sessions there are. Reports are
+cached per data version and day (cached_trends()).
+
+    report = cached_trends(repo, cache, user_id)
+    report["rolling"]["minutes_7d"]   # trailing 7-day average, one value per day
+"""
+from datetime import datetime
+
+import numpy as np
+
+from src.store import SECONDS_PER_DAY, to_epoch, day_label
+
+# Days shown in the daily and rolling series, and weeks in the weekly series
+DAILY_DAYS = 28
+WEEKLY_WEEKS = 12
+ROLLING_WINDOWS = (7, 28)
+METRICS = (("minutes", np.int64), ("calories", np.float64), ("sessions", np.int64))
+# Day 0 (1970-01-01) was a Thursday; shifting by 3 makes weeks start on Monday
+_WEEK_SHIFT = 3
+
+
+def _dense(daily, first_day, last_day):
+    """Returns ({metric: per-day totals}, {category: per-day minutes}) over a day range."""
+    span = last_day - first_day + 1
+    totals = {metric: np.zeros(span, dtype=dtype) for metric, dtype in METRICS}
+    minutes = {}
+    for category, columns in daily.items():
+        low, high = np.searchsorted(columns["day"], (first_day, last_day + 1))
+        index = columns["day"][low:high] - first_day
+        for metric, _ in METRICS:
+            # Day numbers are unique within a category, so plain += adds every bucket
+            totals[metric][index] += columns[metric][low:high]
+        minutes[category] = np.zeros(span, dtype=np.int64)
+        minutes[category][index] = columns["minutes"][low:high]
+    return totals, minutes
+
+
+def _trailing_mean(values, window):
+    """Returns the mean of each value and the ``window - 1`` before it (full windows only)."""
+    sums = np.cumsum(np.concatenate(([0.0], values)))
+    return (sums[window:] - sums[:-window]) / window
+
+
+def _streaks(daily, today):
+    """Returns the current and longest runs of consecutive days with sessions."""
+    active = np.unique(np.concatenate(
+        [columns["day"][columns["sessions"] > 0] for columns in daily.values()] or [[]]
+    )).astype(np.int64)
+    if active.size == 0:
+        return {"current": 0, "longest": 0, "longest_start": None, "longest_end": None,
+                "active_days": 0}
+    # Runs start wherever the gap to the previous active day is more than one day
+    starts = np.flatnonzero(np.diff(active, prepend=active[0] - 2) != 1)
+    ends = np.append(starts[1:], len(active)) - 1
+    lengths = ends - starts + 1
+    best = int(np.argmax(lengths))
+    # A streak is still alive until a whole day passes without a session
+    current = int(lengths[-1]) if active[-1] >= today - 1 else 0
+    return {
+        "current": current,
+        "longest": int(lengths[best]),
+        "longest_start": day_label(int(active[starts[best]])),
+        "longest_end": day_label(int(active[ends[best]])),
+        "active_days": len(active),
+    }
+
+
+def _exercises(exercise_totals):
+    """Returns per-exercise aggregates, most minutes first, with their share of minutes."""
+    rows = [{"category": category, "exercise": exercise, **totals}
+            for category, by_exercise in exercise_totals.items()
+            for exercise, totals in by_exercise.items()]
+    total = sum(row["minutes"] for row in rows)
+    for row in rows:
+        row["minutes_pct"] = 100.0 * row["minutes"] / total if total else 0.0
+    return sorted(rows, key=lambda row: (-row["minutes"], row["category"], row["exercise"]))
+
+
+def trends(repo, user_id, days=DAILY_DAYS, weeks=WEEKLY_WEEKS, now=None):  # pylint: disable=too-many-locals
+    """Returns the member's trend report (plain lists, ready for JSON or templates).
+
+    ``daily`` and ``rolling`` cover the last ``days`` days (today included),
+    ``weekly`` the last ``weeks`` Monday-based weeks, ``streaks`` and
+    ``exercises`` the whole history.
+    """
+    today = to_epoch(now or datetime.now()) // SECONDS_PER_DAY
+    daily = repo.daily(user_id)
+    first_day = today - days + 1
+    # Rolling windows reach back before the first shown day
+    window = max(ROLLING_WINDOWS)
+    totals, minutes = _dense(daily, first_day - window + 1, today)
+    shown = slice(window - 1, None)
+
+    this_week = (today + _WEEK_SHIFT) // 7
+    first_week_day = (this_week - weeks + 1) * 7 - _WEEK_SHIFT
+    week_totals, _ = _dense(daily, first_week_day, today)
+    week_index = np.arange(len(week_totals["minutes"])) // 7
+
+    return {
+        "daily": {
+            "dates": [day_label(day) for day in range(first_day, today + 1)],
+            **{metric: totals[metric][shown].tolist() for metric, _ in METRICS},
+            "minutes_by_category": {cat: values[shown].tolist()
+                                    for cat, values in minutes.items()},
+        },
+        "weekly": {
+            "weeks": [day_label(first_week_day + 7 * week) for week in range(weeks)],
+            **{metric: np.bincount(week_index, weights=week_totals[metric],
+                                   minlength=weeks).astype(dtype).tolist()
+               for metric, dtype in METRICS},
+        },
+        "rolling": {
+            f"{metric}_{size}d": np.round(
+                _trailing_mean(totals[metric], size)[window - size:], 2).tolist()
+            for metric in ("minutes", "calories") for size in ROLLING_WINDOWS
+        },
+        "streaks": _streaks(daily, today),
+        "exercises": _exercises(repo.exercise_totals(user_id)),
+    }
+
+
+def cached_trends(repo, cache, user_id, now=None):
+    """Returns trends() for the member, from ``cache`` unless their data or the day changed.
+
+    ``cache`` is any get/put LRU, such as charts.ChartCache.
+    """
+    today = to_epoch(now or datetime.now()) // SECONDS_PER_DAY
+    key = ("trends", user_id, repo.version(user_id), today)
+    report = cache.get(key)
+    if report is None:
+        report = trends(repo, user_id, now=now)
+        cache.put(key, report)
+    return report
@@ -0,0 +1,227 @@
+"""
+Versioned JSON API (``/api/v1``) for the ACEest Fitness Tracker.
+
+Members are addressed by ``regn_id`` in the URL. Writes apply the same
+validation as the HTML forms and answer with the created resource (201)
+instead of a redirect; progress data is returned as raw series for the client
+to chart.
+
+    GET  /api/v1/users/<regn_id>            profile
+    PUT  /api/v1/users/<regn_id>            create (201) or replace (200) profile
+    GET  /api/v1/users/<regn_id>/workouts   one page of sessions per category, newest
+                                            first; ?category=&since=&cursor=&limit=
+                                            (the full history: /workouts/export)
+    POST /api/v1/users/<regn_id>/workouts   log a session (201)
+    GET  /api/v1/users/<regn_id>/summary    totals and one page of a date range (default:
+                                            rolling week); ?start=&end=&category=&cursor=&limit=
+    GET  /api/v1/users/<regn_id>/progress   per-category series behind the charts
+    GET  /api/v1/users/<regn_id>/trends     daily/weekly trends, rolling averages,
+                                            streaks and per-exercise breakdown
+    POST /api/v1/batch/metrics              vectorised BMI/BMR
+    POST /api/v1/batch/calories             vectorised calories
+"""
+from datetime import datetime
+
+import numpy as np
+from flask import Blueprint, current_app, jsonify, request, url_for
+
+from src import analytics
+from src import services
+from src.fitness import WORKOUT_CATEGORIES, calculate_metrics_batch, calculate_calories_batch
+from src.repository import PAGE_SIZE
+from src.store import to_epoch
+
+API = Blueprint("api_v1", __name__, url_prefix="/api/v1")
+
+# Upper bound on rows per batch request; larger jobs should use the library API
+MAX_BATCH_ROWS = 1_000_000
+
+
+class ApiError(Exception):
+    """An error reported to the client as ``{"error": message}`` with a status code."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+@API.errorhandler(ApiError)
+def handle_api_error(err):
+    """Renders ApiError as JSON."""
+    return jsonify(error=err.message), err.status
+
+
+def _json_body():
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        raise ApiError("Request body must be a JSON object.")
+    return payload
+
+
+def _batch_columns(payload, numeric, text=(), broadcast=(), integer=()):
+    """Returns equally long 1-D NumPy columns for the given payload keys.
+
+    Keys in ``broadcast`` may also be a single value applied to every row, and
+    those in ``integer`` must hold whole numbers, as the forms require.
+    """
+    columns = {}
+    for name in (*numeric, *text):
+        if name not in payload:
+            raise ApiError(f"Missing field '{name}'.")
+        value = payload[name]
+        if not isinstance(value, list) and name not in broadcast:
+            raise ApiError(f"Field '{name}' must be a list.")
+        if name in numeric:
+            try:
+                column = np.asarray(value, dtype=np.float64)
+            except (TypeError, ValueError) as err:
+                raise ApiError(f"Field '{name}' must contain only numbers.") from err
+            if column.ndim != isinstance(value, list):
+                raise ApiError(f"Field '{name}' must be a flat list of numbers.")
+            if name in integer and not all(
+                    isinstance(item, int) and not isinstance(item, bool)
+                    for item in (value if column.ndim else [value])):
+                raise ApiError(f"Field '{name}' must contain whole numbers.")
+            if not np.all(np.isfinite(column)) or np.any(column <= 0):
+                raise ApiError(f"Field '{name}' must contain positive numbers.")
+        else:
+            if not all(isinstance(item, str) for item in value):
+                raise ApiError(f"Field '{name}' must contain only strings.")
+            column = np.asarray(value, dtype=object)
+        columns[name] = column
+    lengths = {len(column) for column in columns.values() if column.ndim}
+    if len(lengths) > 1:
+        raise ApiError("All list fields must have the same length.")
+    if lengths and lengths.pop() > MAX_BATCH_ROWS:
+        raise ApiError(f"At most {MAX_BATCH_ROWS} rows per request.", 413)
+    return columns
+
+
+def _repo():
+    return current_app.extensions["repository"]
+
+
+@API.route("/users/<regn_id>", methods=["GET"])
+def get_user(regn_id):
+    """Returns a member's profile."""
+    profile = _repo().get_profile(regn_id)
+    if not profile:
+        raise ApiError("Unknown member.", 404)
+    return jsonify(profile)
+
+
+@API.route("/users/<regn_id>", methods=["PUT"])
+def put_user(regn_id):
+    """Creates or replaces a member's profile."""
+    fields = dict(_json_body(), regn_id=regn_id)
+    created = not _repo().get_profile(regn_id)
+    try:
+        profile = services.save_profile(_repo(), fields)
+    except ValueError as err:
+        raise ApiError(str(err)) from err
+    response = jsonify(profile)
+    if created:
+        response.status_code = 201
+        response.headers["Location"] = url_for(".get_user", regn_id=regn_id)
+    return response
+
+
+@API.route("/users/<regn_id>/workouts", methods=["GET"])
+def list_workouts(regn_id):
+    """Returns one page of a member's sessions per category, newest first.
+
+    ``next`` holds the cursor of each category's following page (None on the last).
+    """
+    try:
+        query = services.parse_page_query(request.args)
+    except ValueError as err:
+        raise ApiError(str(err)) from err
+    start = None
+    if "since" in request.args:
+        try:
+            start = to_epoch(datetime.fromisoformat(request.args["since"]))
+        except ValueError as err:
+            raise ApiError("'since' must look like YYYY-MM-DD[ HH:MM:SS].") from err
+    categories = [query["category"]] if "category" in query else WORKOUT_CATEGORIES
+    repo = _repo()
+    workouts, next_cursors = {}, {}
+    for cat in categories:
+        workouts[cat], next_cursors[cat] = repo.page(
+            regn_id, cat, start=start, cursor=query.get("cursor"),
+            limit=query.get("limit", PAGE_SIZE))
+    return jsonify(workouts=workouts, next=next_cursors)
+
+
+@API.route("/users/<regn_id>/workouts", methods=["POST"])
+def create_workout(regn_id):
+    """Logs one session and returns it."""
+    payload = _json_body()
+    try:
+        entry = services.log_workout(
+            _repo(), regn_id,
+            payload.get("category"), payload.get("exercise"), payload.get("duration"),
+            max_entries=current_app.config["MAX_ENTRIES_PER_CATEGORY"],
+        )
+    except services.EntryLimitReached as err:
+        raise ApiError(str(err), 409) from err
+    except ValueError as err:
+        raise ApiError(str(err)) from err
+    current_app.extensions["events"].publish(regn_id, "workout", entry)
+    response = jsonify(entry)
+    response.status_code = 201
+    response.headers["Location"] = url_for(
+        ".list_workouts", regn_id=regn_id, category=entry["category"]
+    )
+    return response
+
+
+@API.route("/users/<regn_id>/summary")
+def get_summary(regn_id):
+    """Returns lifetime totals plus the aggregates and one page of a date range."""
+    try:
+        query = services.parse_summary_query(request.args)
+    except ValueError as err:
+        raise ApiError(str(err)) from err
+    report = services.summary_report(_repo(), regn_id, **query)
+    report.pop("alert_class")
+    return jsonify(report)
+
+
+@API.route("/users/<regn_id>/progress")
+def get_progress(regn_id):
+    """Returns the per-category series behind the progress charts."""
+    return jsonify(services.progress_series(_repo(), regn_id))
+
+
+@API.route("/users/<regn_id>/trends")
+def get_trends(regn_id):
+    """Returns the trend report (see src/analytics.py) of a member."""
+    return jsonify(analytics.cached_trends(
+        _repo(), current_app.extensions["analytics_cache"], regn_id))
+
+
+@API.route("/batch/metrics", methods=["POST"])
+def batch_metrics():
+    """Computes BMI and BMR for parallel weight/height/age/gender lists."""
+    columns = _batch_columns(_json_body(), ("weight", "height", "age"), ("gender",),
+                             integer=("age",))
+    genders = np.char.upper(columns["gender"].astype(str))
+    if not np.all((genders == "M") | (genders == "F")):
+        raise ApiError("Gender must be 'M' or 'F'.")
+    bmi, bmr = calculate_metrics_batch(
+        columns["weight"], columns["height"], columns["age"], genders
+    )
+    return jsonify(bmi=bmi.tolist(), bmr=bmr.tolist())
+
+
+@API.route("/batch/calories", methods=["POST"])
+def batch_calories():
+    """Computes calories for parallel category/duration lists and a weight (list or single)."""
+    columns = _batch_columns(
+        _json_body(), ("duration", "weight"), ("category",), broadcast=("weight",)
+    )
+    calories = calculate_calories_batch(
+        columns["category"], columns["duration"], columns["weight"]
+    )
+    return jsonify(calories=calories.tolist())
@@ -4,247 +4,323 @@
 """
 Flask application for the ACEest Fitness Tracker.
 Includes routes for user info, workout logging, summary, and progress tracking.
-"""
-import io
-import base64
-from datetime import datetime
-from flask import Flask, render_template, request, redirect, url_for, flash
-from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
-# pylint: disable=unused-import
-import pandas as pd # Retained for potential future use or cleaner data handling
-# pylint: enable=unused-import
-
-# Ensure the plot style is set for non-interactive rendering
-plt.style.use('ggplot')
 
-# Initialize Flask app
-APP = Flask(__name__)
-# IMPORTANT: Flask needs a secret key for session management (used by flash messages)
-APP.secret_key = 'your_super_secret_key_here'
+create_app() builds an app from ACEEST_* environment settings; APP is the default
+instance, served by src/wsgi.py under gunicorn.
+"""
+import os
+import hashlib
+from werkzeug.middleware.proxy_fix import ProxyFix
+from flask import (
+    Flask, render_template, request, redirect, url_for, flash, abort, make_response, session,
+    jsonify, Response, stream_with_context, current_app
+)
+from src import admission
+from src import analytics
+from src import bulk
+from src import charts
+from src import compression
+from src import events
+from src import metrics
+from src.api import API
+from src import services
+from src.fitness import WORKOUT_CATEGORIES, DEFAULT_WEIGHT_KG, MAX_DURATION_MIN
+from src.repository import create_repository
 
-# --- Global In-Memory Data Stores ---
-# Key: Category, Value: List of entries
-workouts_log = {"Warm-up": [], "Workout": [], "Cool-down": []}
-user_info = {} # Stores name, regn_id, weight, height, BMI, BMR
+# Members who have not saved their info yet share this id
+DEFAULT_USER_ID = "guest"
+# Seconds browsers should wait before asking again for a chart that timed out
+CHART_RETRY_AFTER = 2
 
-# --- Constants (Renamed to follow Pylint's UPPER_CASE convention for constants) ---
-MET_CONSTANTS = {
-    "Warm-up": 3.0,
-    "Workout": 6.0,
-    "Cool-down": 2.5
-}
-WORKOUT_CATEGORIES = list(workouts_log.keys())
+# --- Configuration ---
+def config_from_env():
+    """Returns the app settings, read from ACEEST_* environment variables."""
+    return {
+        # IMPORTANT: Flask needs a secret key for session management (used by flash
+        # messages); every worker must share it, so set ACEEST_SECRET_KEY in production
+        "SECRET_KEY": os.environ.get("ACEEST_SECRET_KEY", 'your_super_secret_key_here'),
+        "DEBUG": os.environ.get("ACEEST_DEBUG", "0").lower() in ("1", "true", "yes"),
+        # Profiles and workouts keyed by regn_id. Defaults to per-process memory;
+        # wal:////data/aceest keeps that memory but logs every write to disk so it
+        # survives restarts, and a SQLite file (sqlite:////data/aceest.db) shares
+        # state between workers and restarts.
+        "STORAGE_URL": os.environ.get("ACEEST_STORAGE_URL", "memory://"),
+        # Charts are drawn in this many worker processes (0 draws on the request thread)
+        "CHART_WORKERS": int(os.environ.get("ACEEST_CHART_WORKERS", "2")),
+        "CHART_CACHE_SIZE": int(os.environ.get("ACEEST_CHART_CACHE_SIZE", "128")),
+        # Chart requests rendering at once per worker, beyond which they get 503; it keeps
+        # threads free for other routes (0: no limit)
+        "CHART_CONCURRENCY": int(os.environ.get("ACEEST_CHART_CONCURRENCY", "4")),
+        # Per-client token buckets, "endpoint=rate/burst,..." over admission.DEFAULT_RULES
+        # ("off" disables them)
+        "RATE_LIMITS": os.environ.get("ACEEST_RATE_LIMITS", ""),
+        # Proxies in front of the app whose X-Forwarded-For names the client (the ingress)
+        "PROXY_HOPS": int(os.environ.get("ACEEST_PROXY_HOPS", "0")),
+        # Sessions one member may log per category (0: no limit)
+        "MAX_ENTRIES_PER_CATEGORY": int(os.environ.get("ACEEST_MAX_ENTRIES_PER_CATEGORY",
+                                                       "1000000")),
+        # Open /events streams per worker; 0 sizes it for the worker class (see src/events.py)
+        "EVENT_STREAMS": int(os.environ.get("ACEEST_EVENT_STREAMS", "0")),
+        # Directory where the workers of a pod relay events to each other (gunicorn.conf.py
+        # picks a per-server one when unset)
+        "EVENTS_DIR": os.environ.get("ACEEST_EVENTS_DIR", ""),
+    }
 
 # --- Utility Functions ---
-def calculate_metrics(weight_kg, height_cm, age, gender):
-    """Calculates BMI and BMR (Harris-Benedict revised approximation) based on user inputs."""
-    # Calculate BMI
-    bmi = weight_kg / ((height_cm/100)**2)
+def current_user_id():
+    """Returns the regn_id of the member using this browser session."""
+    return session.get("regn_id", DEFAULT_USER_ID)
+
+def repo():
+    """Returns the current app's WorkoutRepository."""
+    return current_app.extensions["repository"]
 
-    # Calculate BMR
-    # Harris-Benedict revised BMR formula (Approximation)
-    if gender.upper() == "M":
-        bmr = 10 * weight_kg + 6.25 * height_cm - 5 * age + 5
-    else: # Assuming Female (F)
-        bmr = 10 * weight_kg + 6.25 * height_cm - 5 * age - 161
-    return bmi, bmr
+def chart_service():
+    """Returns the current app's ChartService."""
+    return current_app.extensions["charts"]
 
-def calculate_calories(category, duration_min, weight_kg):
-    """Calculates estimated calories burned."""
-    # Formula: (MET * 3.5 * weight_kg / 200) * duration_min
-    met = MET_CONSTANTS.get(category, 5) # Default MET is 5
-    calories = (met * 3.5 * weight_kg / 200) * duration_min
-    return calories
+def publish_progress(user_id, event, entry=None):
+    """Pushes the member's updated totals to their open /events streams."""
+    current_app.extensions["events"].publish(user_id, event, entry)
 
 # -----------------------------------------------------------
 ## 1. User Info / Home Page
 # -----------------------------------------------------------
 
-@APP.route('/', methods=['GET', 'POST'])
 def index():
     """Handles the user information form submission and display."""
-    # Accessing mutable global state is necessary for this simple in-memory app
     if request.method == 'POST':
-        # Removed redundant .strip() where request.form[] already returns a string
-        name = request.form['name']
-        regn_id = request.form['regn_id']
-        gender = request.form['gender'].upper()
-        # Use a list to check for emptyness, as requested in original logic
-        if not all([name, regn_id, gender]):
-            flash("Please fill in all user information fields.", 'danger')
-            return redirect(url_for('index'))
         try:
-            # Type conversion and validation
-            age = int(request.form['age'])
-            height_cm = float(request.form['height'])
-            weight_kg = float(request.form['weight'])
-            if gender not in ["M", "F"]:
-                flash("Gender must be 'M' or 'F'.", 'danger')
-                return redirect(url_for('index'))
-            if not all([age > 0, height_cm > 0, weight_kg > 0]):
-                flash("Age, Height, and Weight must be positive numbers.", 'danger')
-                return redirect(url_for('index'))
-            bmi, bmr = calculate_metrics(weight_kg, height_cm, age, gender)
-            user_info.clear() # Clear existing info
-            user_info.update({
-                "name": name, 
-                "regn_id": regn_id, 
-                "age": age, 
-                "gender": gender,
-                "height": height_cm, 
-                "weight": weight_kg, 
-                "bmi": f"{bmi:.1f}", 
-                "bmr": f"{bmr:.0f}"
-            })
-            flash(
-                f"User info saved! BMI={user_info['bmi']}, BMR={user_info['bmr']} kcal/day", 
-                'success'
-            )
+            user_info = services.save_profile(repo(), request.form)
+        except ValueError as err:
+            flash(str(err), 'danger')
             return redirect(url_for('index'))
-        except ValueError:
-            flash("Invalid input. Age, Height, and Weight must be numbers.", 'danger')
-        except Exception as err: # pylint: disable=broad-exception-caught
-            flash(f"An unexpected error occurred: {err}", 'danger')
-    return render_template('index.html', user_info=user_info)
+        # Later requests from this browser act on behalf of this member
+        session["regn_id"] = user_info["regn_id"]
+        flash(
+            f"User info saved! BMI={user_info['bmi']}, BMR={user_info['bmr']} kcal/day", 
+            'success'
+        )
+        return redirect(url_for('index'))
+    return render_template('index.html', user_info=repo().get_profile(current_user_id()))
 # -----------------------------------------------------------
 ## 2. Log Workouts Page (The 'add' Route)
 # -----------------------------------------------------------
 
-@APP.route('/add', methods=['GET', 'POST'])
 def add_workout():
     """Handles logging a new workout session."""
     if request.method == 'POST':
-        category = request.form.get('category')
-        exercise = request.form.get('exercise').strip()
-        duration_str = request.form.get('duration').strip()
-
-        if not exercise or not duration_str:
-            flash("Please enter both exercise and duration.", 'danger')
-            return redirect(url_for('add_workout'))
-
         try:
-            duration = int(duration_str)
-            if duration <= 0:
-                # Raise ValueError to be caught by the block below
-                raise ValueError
-        except ValueError:
-            flash("Duration must be a positive whole number.", 'danger')
-            return redirect(url_for('add_workout'))
-        if category not in WORKOUT_CATEGORIES:
-            flash("Invalid workout category selected.", 'danger')
+            entry = services.log_workout(
+                repo(),
+                current_user_id(),
+                request.form.get('category'),
+                request.form.get('exercise'),
+                request.form.get('duration'),
+                max_entries=current_app.config["MAX_ENTRIES_PER_CATEGORY"],
+            )
+        except ValueError as err:
+            flash(str(err), 'danger')
             return redirect(url_for('add_workout'))
-
-        # Get weight from user_info, default to 70kg if not set
-        weight = user_info.get("weight", 70.0)
-        calories = calculate_calories(category, duration, weight)
-        entry = {
-            "exercise": exercise, 
-            "duration": duration, 
-            "calories": calories, 
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-        workouts_log[category].append(entry)
+        publish_progress(current_user_id(), "workout", entry)
         flash(
-            f"Added **{exercise}** ({duration} min) to {category} successfully! 💪", 
+            f"Added **{entry['exercise']}** ({entry['duration']} min) "
+            f"to {entry['category']} successfully! 💪",
             'success'
         )
         return redirect(url_for('add_workout'))
-    return render_template('add_workout.html', categories=WORKOUT_CATEGORIES)
+    return render_template('add_workout.html', categories=WORKOUT_CATEGORIES,
+                           max_duration=MAX_DURATION_MIN)
+# -----------------------------------------------------------
+## 2b. Bulk Import / Export
+# -----------------------------------------------------------
+def bulk_import():
+    """Imports many sessions from a streamed CSV or NDJSON request body."""
+    fmt = bulk.detect_format(request.mimetype)
+    if fmt is None:
+        return jsonify(error="Send text/csv or application/x-ndjson."), 415
+    user_id = current_user_id()
+    weight = repo().get_profile(user_id).get("weight", DEFAULT_WEIGHT_KG)
+    report = bulk.import_workouts(repo(), user_id, request.stream, fmt, weight,
+                                  max_entries=current_app.config["MAX_ENTRIES_PER_CATEGORY"])
+    if report["imported"]:
+        publish_progress(user_id, "import")
+    # A body that could not be read to the end is a client error, but the rows
+    # before it were written, so the report still says which
+    return jsonify(report), 400 if "error" in report else 200
+
+def bulk_export():
+    """Streams every logged session as CSV (default) or NDJSON (?format=ndjson)."""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in bulk.EXPORT_FORMATS:
+        abort(400)
+    return Response(
+        stream_with_context(bulk.export_workouts(repo(), current_user_id(), fmt)),
+        mimetype=bulk.EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename=workouts.{fmt}"},
+    )
 # -----------------------------------------------------------
 ## 3. Summary Page
 # -----------------------------------------------------------
-@APP.route('/summary')
 def summary():
-    """Calculates and displays the summary of all logged workouts."""
-    # Use sum with a generator expression for cleaner calculation
-    total_time = sum(
-        sum(entry['duration'] for entry in sessions)
-        for sessions in workouts_log.values()
-    )
-    # Simple motivation logic
-    if total_time == 0:
-        motivation = "Time to start moving!"
-        alert_class = "info"
-    elif total_time < 60:
-        motivation = "Nice effort! You're building consistency."
-        alert_class = "warning"
-    else:
-        motivation = "Excellent dedication! Keep up the great work."
-        alert_class = "success"
+    """Displays one page of sessions in a date range (default: this week) with the totals.
 
-    # Organize data for the template
-    summary_data = dict(workouts_log)
+    Query parameters: start, end (YYYY-MM-DD), category, cursor and limit.
+    """
+    try:
+        query = services.parse_summary_query(request.args)
+    except ValueError as err:
+        flash(str(err), 'danger')
+        return redirect(url_for('summary'))
+    report = services.summary_report(repo(), current_user_id(), **query)
     return render_template('summary.html',
-                           summary_data=summary_data,
-                           total_time=total_time,
-                           motivation=motivation,
-                           alert_class=alert_class)
+                           summary_data=report["sessions"],
+                           next_cursors=report["next"],
+                           date_range=report["range"],
+                           filters=request.args,
+                           total_time=report["total_minutes"],
+                           week_time=report["range"]["minutes"],
+                           week_sessions=report["range"]["sessions"],
+                           motivation=report["motivation"],
+                           alert_class=report["alert_class"],
+                           version=repo().version(current_user_id()))
 # -----------------------------------------------------------
 ## 4. Progress Tracker (Chart Generation)
 # -----------------------------------------------------------
-@APP.route('/progress')
+def workout_totals(user_id):
+    """Returns total logged minutes per category, in WORKOUT_CATEGORIES order."""
+    totals = repo().totals(user_id)
+    return {cat: totals[cat]["minutes"] for cat in WORKOUT_CATEGORIES}
+
+def cached_chart(key):
+    """Returns the cached chart entry for key, or None."""
+    return current_app.extensions["chart_cache"].get(key)
+
+def get_progress_chart(user_id):
+    """Returns the member's cached chart entry, rendering it if their workouts changed.
+
+    Returns None when there is nothing to chart yet. Raises
+    charts.ChartUnavailable when the renderer is saturated or too slow.
+    """
+    # Read the version before the totals so a concurrent write can only make the
+    # cached chart newer than its key, never older
+    key = (user_id, repo().version(user_id))
+    chart = cached_chart(key)
+    if chart is not None:
+        metrics.CHART_RENDERS.inc("cache_hit")
+        return chart
+    totals = workout_totals(user_id)
+    if sum(totals.values()) == 0:
+        return None
+    slots = current_app.extensions["admission"].chart_slots
+    if not slots.acquire():
+        metrics.CHART_RENDERS.inc("shed")
+        raise charts.ChartUnavailable("Too many charts rendering.")
+    repository, cache = repo(), current_app.extensions["chart_cache"]
+
+    def store(png):
+        # Also called from the renderer when a render outlives its request's timeout
+        chart = {
+            "png": png,
+            "etag": hashlib.sha1(png).hexdigest(),
+            "modified": repository.modified(user_id),
+        }
+        cache.put(key, chart)
+        return chart
+
+    try:
+        # Rendered outside the cache lock; concurrent misses on one key share the render
+        png = chart_service().render(key, totals, store)
+    finally:
+        slots.release()
+    return cache.get(key) or store(png)
+
 def progress_tracker():
-    """Generates and embeds workout progress charts."""
-    # Calculate total minutes per category
-    totals = {
-        cat: sum(entry['duration'] for entry in sessions)
-        for cat, sessions in workouts_log.items()
-    }
-    total_minutes = sum(totals.values())
-    if total_minutes == 0:
-        return render_template('progress.html', chart_img=None, total_minutes=0)
-    # Convert to pandas Series for cleaner plotting preparation
-    data_series = pd.Series(totals).sort_index()
-    # Create the Matplotlib figure
-    fig = Figure(figsize=(8, 5), dpi=100, facecolor='#FFFFFF')
-    chart_colors = ['#2196F3', '#4CAF50', '#FFC107'] # Blue, Green, Yellow
-    # --- Subplot 1: Bar Chart ---
-    # Pylint: disable=invalid-name, multiple-statements
-    ax1 = fig.add_subplot(121)
-    ax1.bar(data_series.index, data_series.values, color=chart_colors)
-    ax1.set_title("Total Minutes per Category", fontsize=10)
-    ax1.set_ylabel("Total Minutes", fontsize=8)
-    ax1.tick_params(axis='x', labelsize=8)
-    ax1.tick_params(axis='y', labelsize=8)
-    # Tidy up chart
-    ax1.spines['right'].set_visible(False)
-    ax1.spines['top'].set_visible(False)
-    ax1.grid(axis='y', linestyle='--', alpha=0.6)
-    # Pylint: enable=invalid-name, multiple-statements
-    # --- Subplot 2: Pie Chart ---
-    # Pylint: disable=invalid-name
-    ax2 = fig.add_subplot(122)
-    # Filter out categories with 0 minutes for the pie chart
-    pie_data = data_series[data_series > 0] # pylint: disable=unsubscriptable-object
-    # Use the same color scheme, mapped to the existing data
-    pie_colors = [
-        chart_colors[i] for i, cat in enumerate(WORKOUT_CATEGORIES)
-        if totals[cat] > 0
-    ]
-    ax2.pie(
-        pie_data.values,
-        labels=pie_data.index,
-        autopct="%1.1f%%",
-        startangle=90,
-        colors=pie_colors,
-        wedgeprops={"edgecolor":'white', 'linewidth': 1},
-        textprops={'fontsize': 8}
-    )
-    ax2.set_title("Workout Distribution (%)", fontsize=10)
-    ax2.axis('equal')
-    # Pylint: enable=invalid-name
-    fig.tight_layout(pad=2.0)
-    # Convert plot to PNG image (in-memory)
-    buf = io.BytesIO()
-    fig.savefig(buf, format="png")
-    data_uri = base64.b64encode(buf.getbuffer()).decode("ascii")
-    chart_img = f"data:image/png;base64,{data_uri}"
-    return render_template('progress.html', chart_img=chart_img, total_minutes=total_minutes)
+    """Displays the progress page; the chart itself is served by /progress.png."""
+    user_id = current_user_id()
+    series = services.progress_series(repo(), user_id)
+    if series["total_minutes"] == 0:
+        return render_template('progress.html', chart_url=None, total_minutes=0, version=None)
+    version = repo().version(user_id)
+    chart_url = None
+    # Link the chart unless it would have to queue behind a saturated renderer;
+    # the page then shows the numbers without it
+    if cached_chart((user_id, version)) is not None or (
+            not chart_service().saturated()
+            and current_app.extensions["admission"].chart_slots.available()):
+        # The version in the URL lets browsers tell charts of different data apart
+        chart_url = url_for('progress_chart', v=version)
+    return render_template('progress.html',
+                           chart_url=chart_url,
+                           series=series,
+                           trends=analytics.cached_trends(
+                               repo(), current_app.extensions["analytics_cache"], user_id),
+                           total_minutes=series["total_minutes"],
+                           week_minutes=series["week_minutes"],
+                           version=version)
+
+def progress_chart():
+    """Serves the cached progress chart PNG with ETag/Last-Modified validators."""
+    try:
+        chart = get_progress_chart(current_user_id())
+    except charts.ChartUnavailable:
+        metrics.ADMISSION_REJECTIONS.inc("progress_chart", "chart_busy")
+        response = make_response("Chart is busy, try again shortly.", 503)
+        response.retry_after = CHART_RETRY_AFTER
+        return response
+    if chart is None:
+        abort(404)
+    response = make_response(chart["png"])
+    response.mimetype = 'image/png'
+    response.set_etag(chart["etag"])
+    response.last_modified = chart["modified"]
+    # Let browsers and the ingress keep a copy, but revalidate since the data can change.
+    # The chart depends on the session cookie, so shared caches must key on it.
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    return response.make_conditional(request)
+
+def event_stream():
+    """Streams the member's progress updates as Server-Sent Events (see src/events.py).
+
+    The first event carries the current totals, so a reconnecting page catches up.
+    """
+    user_id = current_user_id()
+    broker = current_app.extensions["events"]
+    try:
+        subscription = broker.subscribe(user_id)
+    except events.StreamsExhausted:
+        # EventSource stops reconnecting on 204; the page still works, just not live
+        return Response(status=204)
+    try:
+        first = events.frame("progress", services.progress_update(repo(), user_id))
+    except Exception:
+        broker.unsubscribe(subscription)
+        raise
+    response = Response(broker.stream(subscription, first), mimetype=events.MIMETYPE)
+    response.cache_control.no_cache = True
+    # Ask nginx-style ingresses not to buffer the stream
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+# -----------------------------------------------------------
+## 4b. Readiness and Metrics
+# -----------------------------------------------------------
+def readiness():
+    """Readiness probe: answers as soon as the app serves requests.
+
+    Charting loads in the background, so its state is reported but does not
+    hold back traffic; the first /progress.png waits for it if still cold.
+    """
+    return jsonify(status="ready", charts=chart_service().status())
+
+def metrics_endpoint():
+    """Serves this worker's metrics in the Prometheus text format."""
+    text = metrics.REGISTRY.render() + current_app.extensions["metrics"].render()
+    return Response(text, content_type=metrics.CONTENT_TYPE)
 # -----------------------------------------------------------
 ## 5. Static Pages (Workout Plan and Diet Guide)
 # -----------------------------------------------------------
-@APP.route('/plan')
 def workout_plan():
     """Renders the static workout plan guide."""
     plan_data = {
@@ -266,7 +342,6 @@ def workout_plan():
         ]
     }
     return render_template('plan.html', plan_data=plan_data)
-@APP.route('/diet')
 def diet_guide():
     """Renders the static diet guide."""
     diet_data = {
@@ -285,8 +360,78 @@ def diet_guide():
     }
     return render_template('diet.html', diet_data=diet_data)
 # -----------------------------------------------------------
-## 6. Run Application
+## 6. Application Factory
+# -----------------------------------------------------------
+# (rule, endpoint, view, methods); endpoint names are what templates pass to url_for()
+ROUTES = [
+    ('/', 'index', index, ['GET', 'POST']),
+    ('/add', 'add_workout', add_workout, ['GET', 'POST']),
+    ('/workouts/import', 'bulk_import', bulk_import, ['POST']),
+    ('/workouts/export', 'bulk_export', bulk_export, ['GET']),
+    ('/summary', 'summary', summary, ['GET']),
+    ('/progress', 'progress_tracker', progress_tracker, ['GET']),
+    ('/progress.png', 'progress_chart', progress_chart, ['GET']),
+    ('/events', 'event_stream', event_stream, ['GET']),
+    ('/ready', 'readiness', readiness, ['GET']),
+    ('/metrics', 'metrics_endpoint', metrics_endpoint, ['GET']),
+    # Rendered once per app and served pre-compressed with a strong ETag
+    ('/plan', 'workout_plan', compression.cached_page(workout_plan), ['GET']),
+    ('/diet', 'diet_guide', compression.cached_page(diet_guide), ['GET']),
+]
+
+def create_app(config=None):
+    """Builds an app with its own repository, chart renderer and chart cache.
+
+    Settings come from config_from_env(), updated with ``config`` if given. Each
+    worker process serves the app it created (or inherited through a fork).
+    """
+    app = Flask(__name__)
+    app.config.update(config_from_env())
+    app.config.update(config or {})
+    repository = create_repository(app.config["STORAGE_URL"], WORKOUT_CATEGORIES)
+    # Views and blueprints reach their state through the app, not module globals
+    app.extensions["repository"] = repository
+    app.extensions["charts"] = charts.ChartService(app.config["CHART_WORKERS"])
+    app.extensions["chart_cache"] = charts.ChartCache(app.config["CHART_CACHE_SIZE"])
+    # Trend reports, keyed like the charts by member and data version (plus the day)
+    app.extensions["analytics_cache"] = charts.ChartCache(app.config["CHART_CACHE_SIZE"])
+    # Live updates for open /progress and /summary pages
+    app.extensions["events"] = events.Broker(
+        app.config["EVENT_STREAMS"],
+        build=lambda user_id, _, entry: services.progress_update(repository, user_id, entry))
+    for rule, endpoint, view, methods in ROUTES:
+        app.add_url_rule(rule, endpoint, view, methods=methods)
+    # JSON API under /api/v1 (see src/api.py)
+    app.register_blueprint(API)
+    # Per-endpoint request counts, latency histograms and in-flight gauges for /metrics
+    metrics.instrument(app)
+    # gzip/brotli for HTML, JSON and CSV responses (see src/compression.py)
+    compression.install(app)
+    # Per-client rate limits and the chart render cap (see src/admission.py)
+    admission.install(app)
+    if app.config["PROXY_HOPS"]:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config["PROXY_HOPS"])
+    # Gauges read from this app's own state, served next to the process-wide metrics
+    app_metrics = app.extensions["metrics"] = metrics.Registry()
+    app_metrics.gauge_function(
+        "aceest_workout_sessions", "Logged sessions per category across all members.",
+        ("category",), lambda: {(cat,): n for cat, n in repository.category_sizes().items()})
+    app_metrics.gauge_function(
+        "aceest_event_streams", "Open live-update streams in this worker.",
+        (), lambda: {(): app.extensions["events"].streams()})
+    return app
+
+# Default app for scripts, tests and src.wsgi; its state lives in APP.extensions
+APP = create_app()
+REPO = APP.extensions["repository"]
+CHART_SERVICE = APP.extensions["charts"]
+# -----------------------------------------------------------
+## 7. Run Application
 # -----------------------------------------------------------
 if __name__ == '__main__':
+    # Flask's development server; production runs src.wsgi under gunicorn
+    # (see gunicorn.conf.py). Set ACEEST_DEBUG=1 for the debugger and reloader.
+    # Load matplotlib/pandas off the request path while the server starts listening
+    CHART_SERVICE.warm_up()
     # Use APP instead of app for Pylint compliance
-    APP.run(debug=True, host='0.0.0.0', port=5000)
+    APP.run(host='0.0.0.0', port=int(os.environ.get("PORT", "5000")))
@@ -0,0 +1,166 @@
+# pylint: disable=too-many-locals, too-many-arguments
+
+"""
+Bulk workout import and export for the ACEest Fitness Tracker.
+
+Imports are parsed from the request stream row by row (CSV or NDJSON), validated
+with the same rules as the /add form, and written to the repository in chunks
+whose calories are computed in one vectorised pass. Exports are generators that
+pull sessions from the repository chunk by chunk, so neither direction ever holds
+a member's whole history in memory.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+from src.fitness import calculate_calories_batch, validate_workout
+from src.services import entry_limit_message
+from src.store import to_epoch
+
+IMPORT_CHUNK_SIZE = 5000
+EXPORT_CHUNK_SIZE = 1000
+# Only the first few rejected rows are reported back in detail
+MAX_REPORTED_ERRORS = 20
+EXPORT_COLUMNS = ["category", "exercise", "duration", "calories", "timestamp"]
+EXPORT_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+IMPORT_MIMETYPES = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+
+def detect_format(mimetype):
+    """Returns "csv" or "ndjson" for a request mimetype, or None if unsupported."""
+    return IMPORT_MIMETYPES.get(mimetype)
+
+
+def _csv_rows(stream):
+    """Yields (line number, row dict) from a binary CSV stream with a header row."""
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8", newline=""))
+    for row in reader:
+        yield reader.line_num, row
+
+
+def _ndjson_rows(stream):
+    """Yields (line number, row dict) from a binary NDJSON stream; None for bad lines."""
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_no, row if isinstance(row, dict) else None
+
+
+def _parse_timestamp(value, default):
+    """Returns epoch seconds for an ISO timestamp, or ``default`` if none was given."""
+    if value in (None, ""):
+        return default
+    try:
+        return to_epoch(datetime.fromisoformat(str(value).strip()))
+    except ValueError as err:
+        raise ValueError("Timestamp must look like YYYY-MM-DD HH:MM:SS.") from err
+
+
+class _Chunk:
+    """Column buffers for the rows of one import chunk."""
+
+    def __init__(self):
+        self.categories = []
+        self.exercises = []
+        self.durations = []
+        self.timestamps = []
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def add(self, category, exercise, duration, timestamp):
+        """Buffers one validated row."""
+        self.categories.append(category)
+        self.exercises.append(exercise)
+        self.durations.append(duration)
+        self.timestamps.append(timestamp)
+
+
+def _flush(repo, user_id, chunk, weight_kg):
+    """Computes the chunk's calories in one pass and writes it to the repository."""
+    repo.add_workouts(user_id, {
+        "category": chunk.categories,
+        "exercise": chunk.exercises,
+        "duration": chunk.durations,
+        "calories": calculate_calories_batch(chunk.categories, chunk.durations, weight_kg),
+        "timestamp": chunk.timestamps,
+    })
+
+
+def import_workouts(repo, user_id, stream, fmt, weight_kg, *, chunk_size=IMPORT_CHUNK_SIZE,
+                    max_entries=0):
+    """Imports sessions from a binary stream and returns an import report dict.
+
+    Rows need category, exercise and duration; timestamp is optional and defaults
+    to the time of the import. Invalid rows are skipped and counted, as are rows
+    beyond ``max_entries`` sessions per category (0: no limit). A body that is
+    not UTF-8 or not parseable as CSV stops the import; the rows read before it
+    are still written and the report gets an "error" message.
+    """
+    rows = _csv_rows(stream) if fmt == "csv" else _ndjson_rows(stream)
+    now = to_epoch(datetime.now())
+    report = {"imported": 0, "rejected": 0, "errors": []}
+    room = None
+    if max_entries:
+        room = {cat: max_entries - bucket["sessions"]
+                for cat, bucket in repo.totals(user_id).items()}
+    chunk = _Chunk()
+    try:
+        for line_no, row in rows:
+            try:
+                if row is None:
+                    raise ValueError("Row is not a JSON object.")
+                category, exercise, duration = validate_workout(
+                    row.get("category"), row.get("exercise"), row.get("duration")
+                )
+                timestamp = _parse_timestamp(row.get("timestamp"), now)
+                if room is not None:
+                    if room[category] <= 0:
+                        raise ValueError(entry_limit_message(category, max_entries))
+                    room[category] -= 1
+                chunk.add(category, exercise, duration, timestamp)
+            except ValueError as err:
+                report["rejected"] += 1
+                if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                    report["errors"].append({"line": line_no, "error": str(err)})
+                continue
+            if len(chunk) >= chunk_size:
+                _flush(repo, user_id, chunk, weight_kg)
+                report["imported"] += len(chunk)
+                chunk = _Chunk()
+    except UnicodeDecodeError:
+        report["error"] = "Import stopped: the body is not UTF-8 text."
+    except csv.Error as err:
+        report["error"] = f"Import stopped: malformed CSV ({err})."
+    if len(chunk):
+        _flush(repo, user_id, chunk, weight_kg)
+        report["imported"] += len(chunk)
+    return report
+
+
+def export_workouts(repo, user_id, fmt, *, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yields the member's sessions as CSV or NDJSON text, one chunk at a time."""
+    if fmt == "csv":
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=EXPORT_COLUMNS, lineterminator="\n")
+        writer.writeheader()
+        yield buf.getvalue()
+        for rows in repo.iter_sessions(user_id, chunk_size=chunk_size):
+            buf.seek(0)
+            buf.truncate()
+            writer.writerows(rows)
+            yield buf.getvalue()
+    else:
+        for rows in repo.iter_sessions(user_id, chunk_size=chunk_size):
+            yield "".join(json.dumps(row) + "\n" for row in rows)
@@ -0,0 +1,286 @@
+"""
+Progress chart rendering for the ACEest Fitness Tracker.
+
+matplotlib and pandas dominate the app's import time but only the progress chart
+needs them, so they are imported here on first use (or by a background warm-up
+started once the server is listening) instead of when the app module loads.
+matplotlib is forced onto the non-interactive Agg backend.
+
+Rendering is CPU-bound and holds the GIL, so the web app hands it to a
+ChartService backed by a process pool: request threads only wait on a future,
+concurrent requests for the same chart share one render, and a saturated or
+slow pool surfaces as ChartUnavailable instead of a stalled worker.
+"""
+import io
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from src import metrics
+
+# Plotting modules, filled in by load()
+_modules = {}
+_load_lock = threading.Lock()
+# Background warm-up thread, once started
+_warmup = {"thread": None}
+
+# Seconds a request waits for its chart before falling back
+CHART_RENDER_TIMEOUT = 5.0
+# Renders queued or running per pool process before new ones are turned away
+MAX_PENDING_PER_WORKER = 4
+
+
+class ChartUnavailable(Exception):
+    """The chart could not be rendered in time; the caller should fall back."""
+
+
+def load():
+    """Imports and configures matplotlib and pandas once; returns (Figure, pandas)."""
+    if not _modules:
+        with _load_lock:
+            if not _modules:
+                # pylint: disable=import-outside-toplevel
+                import matplotlib
+                matplotlib.use("Agg")
+                import matplotlib.style
+                from matplotlib.figure import Figure
+                import pandas as pd
+                # pylint: enable=import-outside-toplevel
+                # Ensure the plot style is set for non-interactive rendering
+                matplotlib.style.use('ggplot')
+                _modules.update(Figure=Figure, pd=pd)
+    return _modules["Figure"], _modules["pd"]
+
+
+def is_warm():
+    """Returns True once the plotting modules are loaded."""
+    return bool(_modules)
+
+
+def status():
+    """Returns "warm", "warming" or "cold" for the readiness endpoint."""
+    if is_warm():
+        return "warm"
+    if _warmup["thread"] is not None and _warmup["thread"].is_alive():
+        return "warming"
+    return "cold"
+
+
+def warm_up_in_background():
+    """Starts loading the plotting modules on a daemon thread; returns the thread."""
+    with _load_lock:
+        if _warmup["thread"] is None and not _modules:
+            _warmup["thread"] = threading.Thread(target=load, name="chart-warmup", daemon=True)
+            _warmup["thread"].start()
+    return _warmup["thread"]
+
+
+def render_progress_chart(totals, phases=None):
+    """Renders the bar and pie progress charts for the given totals as PNG bytes.
+
+    ``totals`` maps each category to its logged minutes, in display order. If a
+    ``phases`` dict is given, the seconds spent building the figure, in
+    tight_layout and in savefig are stored in it.
+    """
+    Figure, pd = load()  # pylint: disable=invalid-name
+    started = time.perf_counter()
+    # Convert to pandas Series for cleaner plotting preparation
+    data_series = pd.Series(totals).sort_index()
+    # Create the Matplotlib figure
+    fig = Figure(figsize=(8, 5), dpi=100, facecolor='#FFFFFF')
+    chart_colors = ['#2196F3', '#4CAF50', '#FFC107'] # Blue, Green, Yellow
+    # --- Subplot 1: Bar Chart ---
+    ax1 = fig.add_subplot(121)
+    ax1.bar(data_series.index, data_series.values, color=chart_colors)
+    ax1.set_title("Total Minutes per Category", fontsize=10)
+    ax1.set_ylabel("Total Minutes", fontsize=8)
+    ax1.tick_params(axis='x', labelsize=8)
+    ax1.tick_params(axis='y', labelsize=8)
+    # Tidy up chart
+    ax1.spines['right'].set_visible(False)
+    ax1.spines['top'].set_visible(False)
+    ax1.grid(axis='y', linestyle='--', alpha=0.6)
+    # --- Subplot 2: Pie Chart ---
+    ax2 = fig.add_subplot(122)
+    # Filter out categories with 0 minutes for the pie chart
+    pie_data = data_series[data_series > 0] # pylint: disable=unsubscriptable-object
+    # Use the same color scheme, mapped to the existing data
+    pie_colors = [chart_colors[i] for i, minutes in enumerate(totals.values()) if minutes > 0]
+    ax2.pie(
+        pie_data.values,
+        labels=pie_data.index,
+        autopct="%1.1f%%",
+        startangle=90,
+        colors=pie_colors,
+        wedgeprops={"edgecolor":'white', 'linewidth': 1},
+        textprops={'fontsize': 8}
+    )
+    ax2.set_title("Workout Distribution (%)", fontsize=10)
+    ax2.axis('equal')
+    built = time.perf_counter()
+    fig.tight_layout(pad=2.0)
+    laid_out = time.perf_counter()
+    # Convert plot to PNG image (in-memory)
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png")
+    if phases is not None:
+        phases.update({
+            "figure": built - started,
+            "tight_layout": laid_out - built,
+            "savefig": time.perf_counter() - laid_out,
+        })
+    return buf.getvalue()
+
+
+def render_timed(totals):
+    """Returns (PNG bytes, phase timings); what the worker processes run."""
+    phases = {}
+    png = render_progress_chart(totals, phases)
+    return png, phases
+
+
+def _record(phases, outcome):
+    for phase, seconds in phases.items():
+        metrics.CHART_PHASE_SECONDS.observe(seconds, phase)
+    metrics.CHART_RENDERS.inc(outcome)
+
+
+class ChartCache:
+    """Small thread-safe LRU of rendered chart entries.
+
+    Keys are (regn_id, workouts version); the version changes on every logged
+    workout so entries never go stale, they just age out.
+    """
+
+    def __init__(self, size=128):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the entry for key (marking it recently used), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        """Stores an entry, evicting the least recently used one once full."""
+        with self._lock:
+            self._entries[key] = entry
+            if len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
+class ChartService:
+    """Renders progress charts in worker processes, coalescing identical requests.
+
+    ``workers`` is the pool size; 0 renders inline on the calling thread (used
+    by the tests, whose savefig mocks only exist in this process). Renders are
+    keyed by the caller, e.g. on (regn_id, version), so one key is never drawn
+    twice at the same time.
+    """
+
+    def __init__(self, workers, timeout=CHART_RENDER_TIMEOUT):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_pending = max(1, workers) * MAX_PENDING_PER_WORKER
+        self._pool = None
+        # Re-entrant: a render that is already done runs its callback on submit
+        self._lock = threading.RLock()
+        self._in_flight = {}
+        self._warmup = None
+
+    def _executor(self):
+        if self._pool is None:
+            # Not fork: forking the threaded web process could copy locks held elsewhere
+            method = "spawn"
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                method = "forkserver"
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(method),
+                initializer=load,
+            )
+        return self._pool
+
+    def warm_up(self):
+        """Starts the worker processes (or the in-process import) in the background."""
+        if self.workers <= 0:
+            warm_up_in_background()
+            return
+        with self._lock:
+            if self._warmup is None:
+                # The pool initializer loads matplotlib/pandas in each worker
+                self._warmup = self._executor().submit(is_warm)
+
+    def status(self):
+        """Returns "warm", "warming" or "cold" for the readiness endpoint."""
+        if self.workers <= 0:
+            return status()
+        if self._warmup is None:
+            return "cold"
+        return "warm" if self._warmup.done() else "warming"
+
+    def pending(self):
+        """Returns the number of distinct renders queued or running."""
+        return len(self._in_flight)
+
+    def saturated(self):
+        """Returns True when new renders would be turned away."""
+        return self.workers > 0 and self.pending() >= self.max_pending
+
+    def render(self, key, totals, store=None):
+        """Returns the PNG for ``totals``, sharing any render already running for key.
+
+        Raises ChartUnavailable when the pool is saturated or the render takes
+        longer than the timeout. A render that times out still finishes, and
+        ``store(png)`` (if given when it was started) is called with its result
+        from the pool, so the caller can cache it for the next request.
+        """
+        if self.workers <= 0:
+            png, phases = render_timed(totals)
+            _record(phases, "rendered")
+            return png
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                metrics.CHART_RENDERS.inc("coalesced")
+            else:
+                if len(self._in_flight) >= self.max_pending:
+                    metrics.CHART_RENDERS.inc("saturated")
+                    raise ChartUnavailable("Chart renderer is saturated.")
+                future = self._executor().submit(render_timed, totals)
+                self._in_flight[key] = future
+                future.add_done_callback(
+                    lambda done, key=key: self._finished(key, done, store))
+        try:
+            return future.result(timeout=self.timeout)[0]
+        except FutureTimeout as err:
+            metrics.CHART_RENDERS.inc("timeout")
+            raise ChartUnavailable("Chart rendering timed out.") from err
+        except BrokenProcessPool as err:
+            # A worker died (e.g. OOM-killed); start a fresh pool for the next request
+            self.shutdown()
+            raise ChartUnavailable("Chart renderer restarted.") from err
+
+    def _finished(self, key, future, store):
+        with self._lock:
+            self._in_flight.pop(key, None)
+        # Recorded once per render, however many requests shared it
+        if not future.cancelled() and future.exception() is None:
+            png, phases = future.result()
+            _record(phases, "rendered")
+            if store is not None:
+                store(png)
+
+    def shutdown(self):
+        """Stops the worker processes."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,137 @@
+"""
+Response compression and cached static pages for the ACEest Fitness Tracker.
+
+install(app) compresses text, JSON and CSV responses of at least MIN_SIZE
+bytes with the best coding the client accepts: brotli when the optional
+``brotli`` package is installed, otherwise gzip. Streamed responses (the bulk
+export) and ones that already carry a Content-Encoding are passed through.
+
+cached_page(view) renders a page whose output never changes (the workout plan
+and diet guide) once per app, compresses it once per coding and then serves
+the stored bytes with a strong ETag, answering If-None-Match with 304.
+"""
+import gzip
+import hashlib
+import threading
+from functools import wraps
+
+from flask import current_app, request, session
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+# Below this many bytes the coding overhead outweighs the savings
+MIN_SIZE = 500
+COMPRESSIBLE_TYPES = frozenset({
+    "text/html", "text/plain", "text/css", "text/csv",
+    "application/json", "application/javascript", "image/svg+xml",
+})
+# Levels for per-response compression; cached pages use the maximum once
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def encodings():
+    """Returns the content-codings this process can produce, preferred first."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encodings):
+    """Returns the best coding allowed by an Accept-Encoding header, or None for identity."""
+    best, best_quality = None, 0
+    for coding in encodings():
+        quality = accept_encodings[coding]
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def encode(body, coding, best=False):
+    """Returns ``body`` compressed with ``coding`` ("br" or "gzip")."""
+    if coding == "br":
+        return brotli.compress(body, quality=11 if best else BROTLI_QUALITY)
+    # mtime=0 keeps the output (and any ETag derived from it) stable
+    return gzip.compress(body, compresslevel=9 if best else GZIP_LEVEL, mtime=0)
+
+
+def compress_response(response):
+    """after_request hook: compresses ``response`` in place when worthwhile."""
+    if response.mimetype not in COMPRESSIBLE_TYPES:
+        return response
+    # The body depends on the request's Accept-Encoding, so caches must key on it
+    response.vary.add("Accept-Encoding")
+    if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or response.calculate_content_length() < MIN_SIZE):
+        return response
+    coding = negotiate(request.accept_encodings)
+    if coding is None:
+        return response
+    response.set_data(encode(response.get_data(), coding))
+    response.content_encoding = coding
+    # A strong ETag names one representation; the compressed bytes are another
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f"{etag}-{coding}")
+    return response
+
+
+def install(app):
+    """Compresses eligible responses of every endpoint of app."""
+    app.extensions["page_cache"] = PageCache()
+    app.after_request(compress_response)
+
+
+class PageCache:
+    """Rendered pages by endpoint, with their ETag and every compressed variant."""
+
+    def __init__(self):
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def get(self, endpoint, render):
+        """Returns the page stored for ``endpoint``, calling ``render()`` the first time."""
+        page = self._pages.get(endpoint)
+        if page is not None:
+            return page
+        body = render().encode("utf-8")
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        page = {
+            "bodies": {None: body, **{coding: encode(body, coding, best=True)
+                                      for coding in encodings()}},
+            "etags": {None: etag, **{coding: f"{etag}-{coding}" for coding in encodings()}},
+        }
+        with self._lock:
+            # Two first requests may both render; they produce the same page
+            return self._pages.setdefault(endpoint, page)
+
+    def clear(self):
+        """Drops every stored page, e.g. after a template change."""
+        with self._lock:
+            self._pages.clear()
+
+
+def cached_page(view):
+    """Wraps a view whose rendered HTML is the same for every request.
+
+    Pending flash messages are rendered into the page, so those requests run
+    the view as usual and are neither stored nor validated.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if session.get("_flashes"):
+            return view(*args, **kwargs)
+        page = current_app.extensions["page_cache"].get(
+            request.endpoint, lambda: view(*args, **kwargs))
+        coding = negotiate(request.accept_encodings)
+        response = current_app.response_class(page["bodies"][coding], mimetype="text/html")
+        if coding is not None:
+            response.content_encoding = coding
+        response.set_etag(page["etags"][coding])
+        response.vary.add("Accept-Encoding")
+        # Browsers keep the page but revalidate, which costs a 304 and no rendering
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    return wrapper
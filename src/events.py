@@ -0,0 +1,254 @@
+"""
+Live progress events (Server-Sent Events) for the ACEest Fitness Tracker.
+
+Logging a session publishes a small event (the new session plus the member's
+updated totals) to a Broker, which fans it out to every open ``/events``
+stream of that member. The progress and summary pages subscribe with
+EventSource and update their numbers in place instead of reloading.
+
+Each stream waits on its own bounded queue, so a slow client only drops its
+own stale events (every event carries full totals, so the next one heals it).
+Under gunicorn's gevent worker (GUNICORN_WORKER_CLASS=gevent) a stream is a
+greenlet and thousands of idle ones cost a few KB each; under threaded workers
+each open stream holds a request thread, so at most THREADED_STREAMS are
+admitted per process and the rest are told (204) to stop reconnecting.
+
+Workers of one pod relay events to each other through Unix datagram sockets
+in a shared directory (start_relay()), so a session logged on one worker
+reaches streams held by another. Only the event's details travel; a worker
+builds the payload when, and only when, it holds a stream of that member.
+
+    broker = Broker(build=lambda user_id, event, entry: {...})
+    broker.publish(user_id, "workout", entry)   # built only where someone listens
+    Response(broker.stream(broker.subscribe(user_id)), mimetype=MIMETYPE)
+"""
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from collections import deque
+
+MIMETYPE = "text/event-stream"
+# Comment lines sent while idle keep proxies from closing the connection
+HEARTBEAT_SECONDS = 15.0
+# Streams end after this long and the browser reconnects (after RETRY_MS), so a
+# worker restart or a redeploy never strands a connection for long
+STREAM_SECONDS = 300.0
+RETRY_MS = 3000
+# Undelivered events kept per stream; older ones are dropped first
+QUEUE_SIZE = 16
+# Streams admitted per process by default, with and without gevent
+THREADED_STREAMS = 4
+COOPERATIVE_STREAMS = 10_000
+# Seconds a listing of the relay directory is reused before it is read again
+PEER_REFRESH_SECONDS = 1.0
+MAX_DATAGRAM = 65_536
+
+
+class StreamsExhausted(Exception):
+    """This process already serves its maximum number of event streams."""
+
+
+def cooperative():
+    """Returns True when gevent has patched threading, so waiting streams yield to others."""
+    monkey = sys.modules.get("gevent.monkey")
+    return monkey is not None and monkey.is_module_patched("threading")
+
+
+def frame(event, data):
+    """Returns the SSE wire format of one event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+class Subscription:
+    """One open stream: a bounded queue of encoded events for one member."""
+
+    def __init__(self, user_id, size=QUEUE_SIZE):
+        self.user_id = user_id
+        self._frames = deque(maxlen=size)
+        self._ready = threading.Event()
+
+    def push(self, data):
+        """Queues an encoded event, dropping the oldest one when full."""
+        self._frames.append(data)
+        self._ready.set()
+
+    def wait(self, timeout):
+        """Returns the queued events, waiting up to ``timeout`` seconds for one."""
+        if not self._ready.wait(timeout):
+            return []
+        # Clear before draining so a push in between sets the flag again
+        self._ready.clear()
+        frames = []
+        while self._frames:
+            frames.append(self._frames.popleft())
+        return frames
+
+
+class Broker:  # pylint: disable=too-many-instance-attributes
+    """Fans member events out to this process's streams and to the other workers."""
+
+    def __init__(self, max_streams=0, build=None):
+        # 0 picks COOPERATIVE_STREAMS or THREADED_STREAMS when the first stream opens
+        self.max_streams = max_streams
+        # build(user_id, event, detail) returns an event's payload; by default it is detail
+        self._build = build or (lambda user_id, event, detail: detail)
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._count = 0
+        self._relay = None
+        self._peers = ([], 0.0)
+        self._draining = False
+
+    # --- Local fan-out ---
+    def subscribe(self, user_id):
+        """Returns a new Subscription; raises StreamsExhausted at the stream limit."""
+        limit = self.max_streams or (COOPERATIVE_STREAMS if cooperative() else THREADED_STREAMS)
+        subscription = Subscription(user_id)
+        with self._lock:
+            if self._draining or self._count >= limit:
+                raise StreamsExhausted()
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Stops delivering to ``subscription``."""
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id, set())
+            if subscription in subscribers:
+                subscribers.discard(subscription)
+                self._count -= 1
+            if not subscribers:
+                self._subscribers.pop(subscription.user_id, None)
+
+    def streams(self):
+        """Returns the number of open streams in this process."""
+        return self._count
+
+    def drain(self):
+        """Ends every open stream and refuses new ones, ahead of a worker shutdown.
+
+        Browsers reconnect (to another worker) instead of holding the shutdown
+        until their streams time out.
+        """
+        with self._lock:
+            self._draining = True
+            subscriptions = [sub for subs in self._subscribers.values() for sub in subs]
+        for subscription in subscriptions:
+            subscription.push(b"")
+
+    def _deliver(self, user_id, event, detail):
+        """Builds the payload once for the member's streams here; returns False if none."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        if not subscribers:
+            return False
+        data = frame(event, self._build(user_id, event, detail))
+        for subscription in subscribers:
+            subscription.push(data)
+        return True
+
+    def publish(self, user_id, event, detail=None):
+        """Sends ``event`` to the member's streams here and on the other workers.
+
+        ``detail`` (JSON-ready) is passed to ``build``, which only runs in a
+        worker with a stream of the member. Returns True if it was sent.
+        """
+        peers = self._peer_paths()
+        if peers:
+            self._send(peers, json.dumps([user_id, event, detail]).encode())
+        return self._deliver(user_id, event, detail) or bool(peers)
+
+    def stream(self, subscription, first=None, heartbeat=HEARTBEAT_SECONDS,
+               lifetime=STREAM_SECONDS):
+        """Yields the SSE body of ``subscription``, starting with ``first`` if given.
+
+        Ends after ``lifetime`` seconds or drain(), and unsubscribes then or when
+        the client goes away (the server closes the generator once a heartbeat
+        fails to send).
+        """
+        try:
+            yield f"retry: {RETRY_MS}\n\n".encode()
+            if first is not None:
+                yield first
+            deadline = time.monotonic() + lifetime
+            while not self._draining and (remaining := deadline - time.monotonic()) > 0:
+                frames = subscription.wait(min(heartbeat, remaining))
+                yield b"".join(frames) if frames else b": ping\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+    # --- Relay between the workers of one pod ---
+    def start_relay(self, directory):
+        """Binds this process's relay socket in ``directory`` and starts receiving."""
+        if self._relay is not None:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{os.getpid()}-{id(self):x}.sock")
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(path)
+        thread = threading.Thread(target=self._receive, args=(sock,),
+                                  name="aceest-events", daemon=True)
+        self._relay = {"directory": directory, "path": path, "socket": sock, "thread": thread}
+        self._peers = ([], 0.0)
+        thread.start()
+
+    def _receive(self, sock):
+        while True:
+            payload = sock.recv(MAX_DATAGRAM)
+            if not payload:  # close() wakes us with an empty datagram
+                return
+            try:
+                user_id, event, detail = json.loads(payload)
+            except ValueError:
+                continue
+            try:
+                self._deliver(user_id, event, detail)
+            except Exception:  # pylint: disable=broad-exception-caught
+                # One payload that fails to build must not end the relay for every stream
+                continue
+
+    def _peer_paths(self):
+        """Returns the other workers' relay sockets (directory listing reused briefly)."""
+        relay = self._relay
+        if relay is None:
+            return []
+        peers, listed = self._peers
+        if time.monotonic() - listed > PEER_REFRESH_SECONDS:
+            peers = [os.path.join(relay["directory"], name)
+                     for name in os.listdir(relay["directory"]) if name.endswith(".sock")]
+            peers = [path for path in peers if path != relay["path"]]
+            self._peers = (peers, time.monotonic())
+        return peers
+
+    def _send(self, peers, payload):
+        sock = self._relay["socket"]
+        for path in peers:
+            try:
+                # Never block a request on a busy peer; it misses one event at worst
+                sock.sendto(payload, socket.MSG_DONTWAIT, path)
+            except BlockingIOError:
+                continue
+            except (ConnectionRefusedError, FileNotFoundError):
+                # A worker that exited without cleaning up (killed, or OOM)
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+                self._peers = ([], 0.0)
+
+    def close(self):
+        """Stops the relay and removes this process's socket."""
+        relay, self._relay = self._relay, None
+        if relay is None:
+            return
+        relay["socket"].sendto(b"", relay["path"])
+        relay["thread"].join(timeout=1.0)
+        relay["socket"].close()
+        try:
+            os.unlink(relay["path"])
+        except OSError:
+            pass
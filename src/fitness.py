@@ -0,0 +1,125 @@
+"""
+Fitness calculations and input validation for the ACEest Fitness Tracker.
+
+Kept free of Flask so the web routes, the bulk import path and offline jobs all
+apply exactly the same formulas and rules.
+"""
+import numpy as np
+
+# --- Constants (Renamed to follow Pylint's UPPER_CASE convention for constants) ---
+MET_CONSTANTS = {
+    "Warm-up": 3.0,
+    "Workout": 6.0,
+    "Cool-down": 2.5
+}
+WORKOUT_CATEGORIES = list(MET_CONSTANTS.keys())
+DEFAULT_MET = 5
+# Used for calorie estimates until the member saves their weight
+DEFAULT_WEIGHT_KG = 70.0
+# Longest session accepted, in minutes (a day); also keeps durations within int64 columns
+MAX_DURATION_MIN = 1440
+
+# --- Utility Functions ---
+def calculate_metrics(weight_kg, height_cm, age, gender):
+    """Calculates BMI and BMR (Harris-Benedict revised approximation) based on user inputs."""
+    # Calculate BMI
+    bmi = weight_kg / ((height_cm/100)**2)
+
+    # Calculate BMR
+    # Harris-Benedict revised BMR formula (Approximation)
+    if gender.upper() == "M":
+        bmr = 10 * weight_kg + 6.25 * height_cm - 5 * age + 5
+    else: # Assuming Female (F)
+        bmr = 10 * weight_kg + 6.25 * height_cm - 5 * age - 161
+    return bmi, bmr
+
+def calculate_calories(category, duration_min, weight_kg):
+    """Calculates estimated calories burned."""
+    # Formula: (MET * 3.5 * weight_kg / 200) * duration_min
+    met = MET_CONSTANTS.get(category, DEFAULT_MET) # Default MET is 5
+    calories = (met * 3.5 * weight_kg / 200) * duration_min
+    return calories
+
+# --- Vectorised Batch Versions ---
+# Accept NumPy arrays, pandas Series, lists or scalars (broadcast) and return
+# float64 NumPy arrays equal element-wise to the scalar functions above. Each
+# formula keeps the scalar operation order so the results match bit for bit.
+def calculate_metrics_batch(weight_kg, height_cm, age, gender):
+    """Vectorised calculate_metrics(); returns (bmi, bmr) arrays."""
+    weight_kg = np.asarray(weight_kg, dtype=np.float64)
+    height_cm = np.asarray(height_cm, dtype=np.float64)
+    age = np.asarray(age)
+    # Anything other than "M"/"m" is treated as female, like the scalar version
+    gender = np.asarray(gender)
+    male = (gender == "M") | (gender == "m")
+    # float_power goes through pow() like Python's ** (x*x can differ in the last bit)
+    bmi = weight_kg / np.float_power(height_cm/100, 2)
+    base = 10 * weight_kg + 6.25 * height_cm - 5 * age
+    bmr = np.where(male, base + 5, base - 161)
+    return bmi, bmr
+
+def calculate_calories_batch(category, duration_min, weight_kg):
+    """Vectorised calculate_calories(); returns a calories array."""
+    category = np.asarray(category)
+    # One vectorised comparison per known category; everything else keeps the default
+    met = np.full(category.shape, DEFAULT_MET, dtype=np.float64)
+    for name, value in MET_CONSTANTS.items():
+        met[category == name] = value
+    weight_kg = np.asarray(weight_kg, dtype=np.float64)
+    return (met * 3.5 * weight_kg / 200) * np.asarray(duration_min, dtype=np.float64)
+
+def validate_workout(category, exercise, duration):
+    """Validates a workout submission and returns (category, exercise, duration).
+
+    Raises ValueError carrying the message shown to the member.
+    """
+    # JSON bodies may carry any type here; only text counts, as in a form field
+    exercise = exercise.strip() if isinstance(exercise, str) else ""
+    duration_str = str(duration if duration is not None else "").strip()
+    if not exercise or not duration_str:
+        raise ValueError("Please enter both exercise and duration.")
+    try:
+        duration = int(duration_str)
+    except ValueError:
+        duration = 0
+    if duration <= 0:
+        raise ValueError("Duration must be a positive whole number.")
+    if duration > MAX_DURATION_MIN:
+        raise ValueError(f"Duration must be at most {MAX_DURATION_MIN} minutes.")
+    if not isinstance(category, str) or category not in WORKOUT_CATEGORIES:
+        raise ValueError("Invalid workout category selected.")
+    return category, exercise, duration
+
+def validate_profile(fields):
+    """Validates a user info submission and returns the cleaned values as a dict.
+
+    ``fields`` is a mapping (a form or a JSON object) with name, regn_id, age,
+    gender, height and weight. Raises ValueError carrying the message shown to
+    the member.
+    """
+    # Non-text values (possible in JSON) count as missing, as they could not come from the form
+    name, regn_id, gender = (fields.get(key) if isinstance(fields.get(key), str) else ""
+                             for key in ("name", "regn_id", "gender"))
+    gender = gender.upper()
+    # Use a list to check for emptyness, as requested in original logic
+    if not all([name, regn_id, gender]):
+        raise ValueError("Please fill in all user information fields.")
+    try:
+        # str() first so JSON numbers follow the same rules as form fields
+        age = int(str(fields.get("age")))
+        height_cm = float(str(fields.get("height")))
+        weight_kg = float(str(fields.get("weight")))
+    except ValueError as err:
+        raise ValueError("Invalid input. Age, Height, and Weight must be numbers.") from err
+    if gender not in ["M", "F"]:
+        raise ValueError("Gender must be 'M' or 'F'.")
+    if not all([age > 0, height_cm > 0, weight_kg > 0]):
+        raise ValueError("Age, Height, and Weight must be positive numbers.")
+    return {
+        "name": name,
+        "regn_id": regn_id,
+        "age": age,
+        "gender": gender,
+        "height": height_cm,
+        "weight": weight_kg,
+    }
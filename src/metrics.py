@@ -0,0 +1,283 @@
+# pylint: disable=too-few-public-methods
+
+"""
+In-process metrics for the ACEest Fitness Tracker, exposed in Prometheus text format.
+
+Counters, gauges and histograms are sharded per thread: each thread updates its
+own dict without taking a lock, and only a scrape walks (and copies) every
+shard. Shards of finished threads are folded into a retired total at scrape
+time, so a thread-per-request server does not grow the shard list forever.
+Under gevent shards belong to OS threads, not greenlets: a greenlet never
+reports finished, and greenlets of one thread never interleave mid-update.
+Every worker process keeps its own registry; scrape each worker (or pod).
+
+    REQUESTS.inc("index", "GET", "200")
+    CHART_PHASE_SECONDS.observe(0.12, "savefig")
+"""
+import sys
+import threading
+import time
+
+from src import events
+
+# Latency buckets in seconds, from a cached page up to a slow chart render
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _OSThread:
+    """An OS thread by ident, for when gevent makes threading report greenlets."""
+
+    def __init__(self, ident):
+        self.ident = ident
+
+    def is_alive(self):
+        """Returns True while the OS thread runs."""
+        return self.ident in sys._current_frames()  # pylint: disable=protected-access
+
+
+def _os_thread_api():
+    """Returns (thread-local class, current thread function) keyed by OS thread."""
+    if not events.cooperative():
+        return threading.local, threading.current_thread
+    monkey = sys.modules["gevent.monkey"]
+    get_ident = monkey.get_original("_thread", "get_ident")
+    return monkey.get_original("threading", "local"), lambda: _OSThread(get_ident())
+
+
+class _Sharded:  # pylint: disable=too-many-instance-attributes
+    """Per-thread dicts of label values -> state, merged on collection."""
+
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        local, self._current_thread = _os_thread_api()
+        self._local = local()
+        self._shards = []
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((self._current_thread(), shard))
+        return shard
+
+    def _merge(self, into, state):
+        raise NotImplementedError
+
+    def collect(self):
+        """Returns {label values: state} summed over every thread."""
+        with self._lock:
+            alive = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, shard))
+                else:
+                    # Nobody writes to a finished thread's shard any more
+                    for labels, state in shard.items():
+                        self._merge(self._retired, (labels, state))
+            self._shards = alive
+            merged = {}
+            for labels, state in self._retired.items():
+                self._merge(merged, (labels, state))
+            # dict.copy() is atomic under the GIL, so a concurrent update is never half-seen
+            for _, shard in alive:
+                for labels, state in shard.copy().items():
+                    self._merge(merged, (labels, state))
+        return merged
+
+
+class Counter(_Sharded):
+    """A monotonically increasing count."""
+
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        """Adds ``amount`` to the series with the given label values."""
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def _merge(self, into, state):
+        labels, value = state
+        into[labels] = into.get(labels, 0) + value
+
+    def samples(self):
+        """Yields (suffix, label values, extra labels, value) for exposition."""
+        for labels, value in sorted(self.collect().items()):
+            yield "", labels, (), value
+
+
+class Gauge(Counter):
+    """A value that can go up and down, e.g. requests in flight."""
+
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        """Subtracts ``amount`` from the series with the given label values."""
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Sharded):
+    """Observations counted into cumulative buckets, plus their sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, *labels):
+        """Records one observation for the series with the given label values."""
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            # [bucket counts..., sum]; the +Inf bucket doubles as the count
+            state = shard[labels] = [0] * len(self.buckets) + [0.0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[i] += 1
+                break
+        state[-1] += value
+
+    def _merge(self, into, state):
+        labels, values = state
+        total = into.setdefault(labels, [0] * len(values[:-1]) + [0.0])
+        for i, value in enumerate(values):
+            total[i] += value
+
+    def samples(self):
+        """Yields (suffix, label values, extra labels, value) for exposition."""
+        for labels, state in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                yield "_bucket", labels, (("le", _format_value(bound)),), cumulative
+            yield "_sum", labels, (), state[-1]
+            yield "_count", labels, (), cumulative
+
+
+class GaugeFunction:
+    """A gauge read from a callback at scrape time, e.g. a storage size."""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames, func):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.func = func
+
+    def samples(self):
+        """Yields (suffix, label values, extra labels, value) for exposition."""
+        for labels, value in sorted(self.func().items()):
+            yield "", labels, (), value
+
+
+class Registry:
+    """A named set of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        """Adds a metric (replacing one of the same name) and returns it."""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        """Creates and registers a Counter."""
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        """Creates and registers a Gauge."""
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Creates and registers a Histogram."""
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_function(self, name, documentation, labelnames, func):
+        """Registers a gauge whose {label values: value} come from ``func()``."""
+        return self.register(GaugeFunction(name, documentation, labelnames, func))
+
+    def render(self):
+        """Returns every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, extra, value in metric.samples():
+                lines.append(
+                    f"{metric.name}{suffix}{_format_labels(metric.labelnames, labels, extra)} "
+                    f"{_format_value(value)}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+# --- Application metrics ---
+REGISTRY = Registry()
+REQUESTS = REGISTRY.counter(
+    "aceest_http_requests_total", "HTTP requests handled.", ("endpoint", "method", "status"))
+REQUEST_SECONDS = REGISTRY.histogram(
+    "aceest_http_request_duration_seconds", "Time spent handling a request.", ("endpoint",))
+IN_FLIGHT = REGISTRY.gauge(
+    "aceest_http_requests_in_flight", "Requests currently being handled.", ("endpoint",))
+CHART_PHASE_SECONDS = REGISTRY.histogram(
+    "aceest_chart_phase_seconds", "Time spent in each progress chart rendering phase.",
+    ("phase",))
+CHART_RENDERS = REGISTRY.counter(
+    "aceest_chart_renders_total", "Progress chart renders by outcome.", ("outcome",))
+ADMISSION_REJECTIONS = REGISTRY.counter(
+    "aceest_admission_rejections_total", "Requests turned away by admission control.",
+    ("endpoint", "reason"))
+
+
+def instrument(app):
+    """Records request counts, latency and in-flight requests for every endpoint of app."""
+    # pylint: disable=import-outside-toplevel
+    from flask import g, request
+
+    def endpoint():
+        # Unmatched URLs share one series instead of one per path
+        return request.endpoint or "unmatched"
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+        IN_FLIGHT.inc(endpoint())
+
+    @app.after_request
+    def record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def record_request(_):
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return
+        name = endpoint()
+        IN_FLIGHT.dec(name)
+        REQUEST_SECONDS.observe(time.perf_counter() - start, name)
+        REQUESTS.inc(name, request.method, str(g.pop("metrics_status", 500)))
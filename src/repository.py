@@ -0,0 +1,785 @@
+# pylint: disable=too-many-arguments, too-many-positional-arguments, too-many-instance-attributes
+# pylint: disable=too-many-locals
+
+"""
+Storage backends for the ACEest Fitness Tracker.
+
+Routes talk to a WorkoutRepository keyed by the member's ``regn_id`` instead of
+module-level globals, so several workers (or pods sharing a volume) can serve the
+same members. Three implementations are provided:
+
+* InMemoryRepository - one WorkoutLog per member; fast, but per-process.
+* DurableRepository  - InMemoryRepository plus a local write-ahead log and
+  snapshots (see src/wal.py), so its state survives restarts; per-process.
+* SQLiteRepository   - an embedded database in WAL mode with a connection pool,
+  indexed (user, category, timestamp) lookups and group-committed writes.
+
+create_repository() picks one from a URL such as ``memory://``,
+``wal:////data/aceest`` or ``sqlite:////data/aceest.db``.
+"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+
+from src import wal
+from src.store import (
+    WorkoutLog, SECONDS_PER_DAY, TIMESTAMP_FORMAT,
+    to_epoch, from_epoch, day_label, encode_cursor, decode_cursor
+)
+
+# Sessions per summary page unless the caller asks for another size
+PAGE_SIZE = 20
+# Log bytes after which DurableRepository writes a snapshot and drops the log
+SNAPSHOT_BYTES = 64 * 1024 * 1024
+
+
+class WorkoutRepository:
+    """Interface shared by the storage backends; every method is keyed by ``user_id``."""
+
+    def __init__(self, categories):
+        self.categories = list(categories)
+
+    def get_profile(self, user_id):
+        """Returns the stored profile dict of a member, or an empty dict."""
+        raise NotImplementedError
+
+    def save_profile(self, user_id, profile):
+        """Replaces the profile of a member."""
+        raise NotImplementedError
+
+    def add_workout(self, user_id, category, exercise, duration, calories, when):
+        """Logs one session; ``when`` is a naive wall-clock datetime."""
+        raise NotImplementedError
+
+    def add_workouts(self, user_id, columns):
+        """Logs a batch of sessions given as parallel columns.
+
+        ``columns`` maps category, exercise, duration, calories and timestamp (epoch
+        seconds, see src.store.to_epoch) to equally long sequences or arrays.
+        """
+        raise NotImplementedError
+
+    def totals(self, user_id):
+        """Returns lifetime {category: {minutes, calories, sessions}} aggregates."""
+        raise NotImplementedError
+
+    def window(self, user_id, days, now=None):
+        """Returns aggregates over the last ``days`` calendar days (today included)."""
+        raise NotImplementedError
+
+    def between(self, user_id, first_day, last_day):
+        """Returns aggregates over day numbers first_day..last_day (inclusive)."""
+        raise NotImplementedError
+
+    def daily(self, user_id):
+        """Returns {category: {"day", "minutes", "calories", "sessions"}} NumPy arrays.
+
+        One element per day with sessions (day number = epoch seconds //
+        SECONDS_PER_DAY), sorted by day.
+        """
+        raise NotImplementedError
+
+    def exercise_totals(self, user_id):
+        """Returns lifetime {category: {exercise: {minutes, calories, sessions}}} aggregates."""
+        raise NotImplementedError
+
+    def sessions(self, user_id, category, since=None):
+        """Returns the time-ordered entry dicts of a category, optionally from ``since`` on."""
+        raise NotImplementedError
+
+    def page(self, user_id, category, start=None, end=None, cursor=None, limit=PAGE_SIZE):
+        """Returns one page of a category's sessions, newest first, and the next cursor.
+
+        ``start``/``end`` bound the timestamps as epoch seconds [start, end).
+        ``cursor`` is the opaque value returned with the previous page; the next
+        cursor is None on the last page. Entry dicts also carry their ``date``.
+        Raises ValueError for a malformed cursor.
+        """
+        raise NotImplementedError
+
+    def iter_sessions(self, user_id, chunk_size=1000):
+        """Yields lists of at most ``chunk_size`` entry dicts (with their category).
+
+        Sessions are grouped by category in WORKOUT_CATEGORIES order, oldest first,
+        and fetched chunk by chunk so a full history is never held in memory.
+        """
+        raise NotImplementedError
+
+    def category_sizes(self):
+        """Returns {category: logged sessions} summed over every member."""
+        raise NotImplementedError
+
+    def version(self, user_id):
+        """Returns a token that changes whenever the member's workouts change."""
+        raise NotImplementedError
+
+    def modified(self, user_id):
+        """Returns when the member's workouts last changed (aware UTC datetime)."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Removes every member and session."""
+        raise NotImplementedError
+
+    def reopen(self):
+        """Called in a worker process forked after the repository was created."""
+
+
+class InMemoryRepository(WorkoutRepository):
+    """Keeps each member's profile and WorkoutLog in this process."""
+
+    def __init__(self, categories):
+        super().__init__(categories)
+        self._profiles = {}
+        self._logs = {}
+        self._lock = threading.Lock()
+
+    def workouts(self, user_id):
+        """Returns the member's WorkoutLog, creating an empty one on first use."""
+        log = self._logs.get(user_id)
+        if log is None:
+            with self._lock:
+                log = self._logs.setdefault(user_id, WorkoutLog(self.categories))
+        return log
+
+    def get_profile(self, user_id):
+        return dict(self._profiles.get(user_id, {}))
+
+    def save_profile(self, user_id, profile):
+        # Swapped in whole and never mutated afterwards, so a concurrent reader
+        # gets either the previous or the new profile, never a mix or an empty one
+        self._profiles[user_id] = dict(profile)
+
+    def add_workout(self, user_id, category, exercise, duration, calories, when):
+        self.workouts(user_id)[category].add(exercise, duration, calories, when)
+
+    def add_workouts(self, user_id, columns):
+        log = self.workouts(user_id)
+        categories = np.asarray(columns["category"], dtype=object)
+        exercises = np.asarray(columns["exercise"], dtype=object)
+        for category in self.categories:
+            mask = categories == category
+            if mask.any():
+                log[category].extend(
+                    exercises[mask],
+                    np.asarray(columns["duration"])[mask],
+                    np.asarray(columns["calories"])[mask],
+                    np.asarray(columns["timestamp"])[mask],
+                )
+
+    def totals(self, user_id):
+        return self.workouts(user_id).totals()
+
+    def window(self, user_id, days, now=None):
+        return self.workouts(user_id).window(days, now=now)
+
+    def between(self, user_id, first_day, last_day):
+        return self.workouts(user_id).between(first_day, last_day)
+
+    def daily(self, user_id):
+        return self.workouts(user_id).daily()
+
+    def exercise_totals(self, user_id):
+        return self.workouts(user_id).exercise_totals()
+
+    def sessions(self, user_id, category, since=None):
+        log = self.workouts(user_id)[category]
+        return log.since(since) if since is not None else list(log)
+
+    def page(self, user_id, category, start=None, end=None, cursor=None, limit=PAGE_SIZE):
+        return self.workouts(user_id)[category].page(start, end, cursor, limit)
+
+    def iter_sessions(self, user_id, chunk_size=1000):
+        log = self.workouts(user_id)
+        for category in self.categories:
+            # The views are a snapshot: later appends never write into them
+            columns = log[category].columns()
+            for start in range(0, len(columns["timestamp"]), chunk_size):
+                stop = start + chunk_size
+                yield [
+                    {
+                        "category": category,
+                        "exercise": log.exercise_name(code),
+                        "duration": duration,
+                        "calories": calories,
+                        "timestamp": from_epoch(ts).strftime(TIMESTAMP_FORMAT),
+                    }
+                    for code, duration, calories, ts in zip(
+                        columns["exercise"][start:stop].tolist(),
+                        columns["duration"][start:stop].tolist(),
+                        columns["calories"][start:stop].tolist(),
+                        columns["timestamp"][start:stop].tolist(),
+                    )
+                ]
+
+    def category_sizes(self):
+        sizes = dict.fromkeys(self.categories, 0)
+        for log in list(self._logs.values()):
+            for category in self.categories:
+                sizes[category] += len(log[category])
+        return sizes
+
+    def version(self, user_id):
+        return self.workouts(user_id).version
+
+    def modified(self, user_id):
+        return self.workouts(user_id).modified
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+            self._logs.clear()
+
+
+class DurableRepository(InMemoryRepository):
+    """
+    InMemoryRepository whose changes survive restarts.
+
+    Each write is applied in memory and appended to a write-ahead log in
+    ``directory``; the call returns once the record is fsynced, and concurrent
+    writers share one fsync (group commit). If the log cannot be written, memory
+    is reloaded from disk and every later write raises WALError. Reads never touch the disk. After
+    ``snapshot_bytes`` of log a background thread writes a snapshot and drops
+    the log it covers. Opening the directory restores the newest snapshot,
+    memory-mapped, and replays the log written after it.
+    """
+
+    def __init__(self, categories, directory, sync=True, snapshot_bytes=SNAPSHOT_BYTES):
+        super().__init__(categories)
+        self.directory = directory
+        self.snapshot_bytes = snapshot_bytes
+        # Orders log appends like the in-memory changes; held for microseconds
+        self._gate = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._rolled_back = False
+        self._log = wal.WriteAheadLog(directory, sync=sync)
+        self._recover()
+
+    _APPLY = {
+        wal.PROFILE: InMemoryRepository.save_profile,
+        wal.WORKOUT: InMemoryRepository.add_workout,
+        wal.BATCH: InMemoryRepository.add_workouts,
+        wal.CLEAR: InMemoryRepository.clear,
+    }
+
+    def _recover(self):
+        self._log.open(max([self._load(), *wal.segments(self.directory)]))
+
+    def _load(self):
+        """Loads the snapshot and the log after it into memory; returns the snapshot's segment."""
+        segment, index, columns = wal.load_snapshot(self.directory)
+        if index is not None:
+            for user_id, profile in index["profiles"].items():
+                InMemoryRepository.save_profile(self, user_id, profile)
+            for user in index["users"]:
+                self.workouts(user["id"]).restore(user["names"], {
+                    category: tuple(columns[name][start:end] for name, _ in wal.COLUMNS)
+                    for category, (start, end) in user["slices"].items()
+                })
+        for kind, args in wal.replay(self.directory, segment):
+            self._APPLY[kind](self, *args)
+        return segment
+
+    def _write(self, record, kind, *args):
+        with self._gate:
+            # A log that failed takes no more changes, so memory never runs ahead of it
+            self._log.check()
+            # Applied first: a change that fails here is never logged
+            self._APPLY[kind](self, *args)
+            ticket = self._log.append(record)
+        try:
+            self._log.wait(ticket)
+        except wal.WALError:
+            self._roll_back()
+            raise
+        if self._log.size >= self.snapshot_bytes and not self._snapshot_lock.locked():
+            threading.Thread(target=self.snapshot, name="aceest-snapshot", daemon=True).start()
+
+    def _roll_back(self):
+        # Drops the changes of the batch that failed to reach the log (and any that
+        # were applied behind it) by reloading what a restart would see
+        with self._gate:
+            if not self._rolled_back:
+                self._rolled_back = True
+                InMemoryRepository.clear(self)
+                self._load()
+
+    def save_profile(self, user_id, profile):
+        profile = dict(profile)
+        self._write(wal.profile_record(user_id, profile), wal.PROFILE, user_id, profile)
+
+    def add_workout(self, user_id, category, exercise, duration, calories, when):
+        seconds = to_epoch(when)
+        self._write(wal.workout_record(user_id, category, exercise, duration, calories, seconds),
+                    wal.WORKOUT, user_id, category, exercise, duration, calories, seconds)
+
+    def add_workouts(self, user_id, columns):
+        if len(columns["timestamp"]) == 0:
+            return
+        self._write(wal.batch_record(user_id, columns), wal.BATCH, user_id, columns)
+
+    def clear(self):
+        self._write(wal.clear_record(), wal.CLEAR)
+
+    def snapshot(self):
+        """Writes a snapshot of the current state and deletes the log it replaces."""
+        with self._snapshot_lock:
+            with self._gate:
+                # Everything before the new segment is in memory, nothing after it is
+                segment = self._log.rotate()
+                profiles = {user_id: dict(profile) for user_id, profile in self._profiles.items()}
+                users = [
+                    (user_id, log.exercise_names(),
+                     {category: log[category].columns() for category in self.categories})
+                    for user_id, log in self._logs.items()
+                ]
+            # The column views are immutable, so the files are written without the gate
+            wal.write_snapshot(self.directory, segment, profiles, users)
+            wal.prune(self.directory, segment)
+
+    def reopen(self):
+        # A worker forked from the process that opened the log (gunicorn's preload)
+        # reloads from disk: writes made by a previous worker are only there.
+        # It takes the log's lock for itself first, so a second worker fails here
+        # (WALError) instead of appending to the same segment.
+        with self._gate:
+            self._log.relock()
+            InMemoryRepository.clear(self)
+            self._recover()
+
+    def close(self):
+        """Flushes the log and releases the directory for another process."""
+        self._log.close()
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    regn_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS workouts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    regn_id TEXT NOT NULL,
+    category TEXT NOT NULL,
+    exercise TEXT NOT NULL,
+    duration INTEGER NOT NULL,
+    calories REAL NOT NULL,
+    ts INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_workouts_user_category_ts ON workouts (regn_id, category, ts);
+CREATE TABLE IF NOT EXISTS daily_totals (
+    regn_id TEXT NOT NULL,
+    category TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    minutes INTEGER NOT NULL,
+    calories REAL NOT NULL,
+    sessions INTEGER NOT NULL,
+    PRIMARY KEY (regn_id, category, day)
+);
+CREATE TABLE IF NOT EXISTS versions (
+    regn_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    modified INTEGER NOT NULL
+);
+"""
+# Added after daily_totals; databases created before it are backfilled once
+_EXERCISE_TOTALS = """
+CREATE TABLE exercise_totals (
+    regn_id TEXT NOT NULL,
+    category TEXT NOT NULL,
+    exercise TEXT NOT NULL,
+    minutes INTEGER NOT NULL,
+    calories REAL NOT NULL,
+    sessions INTEGER NOT NULL,
+    PRIMARY KEY (regn_id, category, exercise)
+)
+"""
+
+
+class SQLiteRepository(WorkoutRepository):
+    """
+    Embedded SQLite backend shared by every worker that opens the same file.
+
+    Writes are group-committed: concurrent callers queue their statements and one
+    of them commits the whole batch in a single transaction while the others wait,
+    so a call only returns once its data is durable and visible to other workers.
+    Per-day aggregates are maintained in the same transaction, which keeps totals
+    and window reads independent of history length.
+    """
+
+    def __init__(self, categories, path, pool_size=4, timeout=5.0):
+        super().__init__(categories)
+        self.path = path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+        self._created = 0
+        # Group commit state
+        self._commit_cond = threading.Condition()
+        self._pending = []
+        self._open_batch = 0
+        self._committed_batch = -1
+        self._failed_batches = {}
+        self._flushing = False
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            # IMMEDIATE so only one of several workers starting together backfills
+            conn.execute("BEGIN IMMEDIATE")
+            if not conn.execute("SELECT 1 FROM sqlite_master "
+                                "WHERE type = 'table' AND name = 'exercise_totals'").fetchone():
+                conn.execute(_EXERCISE_TOTALS)
+                conn.execute(
+                    "INSERT INTO exercise_totals SELECT regn_id, category, exercise, "
+                    "SUM(duration), SUM(calories), COUNT(*) FROM workouts "
+                    "GROUP BY regn_id, category, exercise")
+            conn.execute("COMMIT")
+
+    # --- Connection pool ---
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False
+        )
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """Borrows a pooled connection; the pool is rebuilt in forked worker processes."""
+        with self._pool_lock:
+            if self._pool_pid != os.getpid():
+                self._pool = queue.LifoQueue()
+                self._pool_pid = os.getpid()
+                self._created = 0
+            pool = self._pool
+            try:
+                conn = pool.get_nowait()
+            except queue.Empty:
+                conn = None
+                if self._created < self.pool_size:
+                    self._created += 1
+                    conn = self._connect()
+        if conn is None:
+            conn = pool.get(timeout=self.timeout)
+        try:
+            yield conn
+        finally:
+            pool.put(conn)
+
+    # --- Group commit ---
+    def _write(self, statements):
+        """Queues (sql, params) statements and returns once they are committed."""
+        with self._commit_cond:
+            self._pending.extend(statements)
+            batch = self._open_batch
+            while self._committed_batch < batch:
+                if self._flushing:
+                    self._commit_cond.wait()
+                    continue
+                # Nobody is committing: lead this batch, everything queued so far
+                self._flushing = True
+                work, self._pending = self._pending, []
+                self._open_batch += 1
+                self._commit_cond.release()
+                error = None
+                try:
+                    self._apply(work)
+                except sqlite3.Error as err:
+                    error = err
+                finally:
+                    self._commit_cond.acquire()
+                    self._flushing = False
+                    self._committed_batch = batch
+                    if error is not None:
+                        self._failed_batches[batch] = error
+                    # Waiters of older batches have long picked up their error
+                    for stale in [b for b in self._failed_batches if b < batch - 64]:
+                        del self._failed_batches[stale]
+                    self._commit_cond.notify_all()
+            error = self._failed_batches.get(batch)
+        if error is not None:
+            raise error
+
+    def _apply(self, statements):
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    # A list of parameter tuples means "run once per tuple"
+                    if isinstance(params, list):
+                        conn.executemany(sql, params)
+                    else:
+                        conn.execute(sql, params)
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _query(self, sql, params=()):
+        with self._connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    # --- Repository interface ---
+    def get_profile(self, user_id):
+        rows = self._query("SELECT data FROM profiles WHERE regn_id = ?", (user_id,))
+        return json.loads(rows[0][0]) if rows else {}
+
+    def save_profile(self, user_id, profile):
+        self._write([(
+            "INSERT INTO profiles (regn_id, data) VALUES (?, ?) "
+            "ON CONFLICT(regn_id) DO UPDATE SET data = excluded.data",
+            (user_id, json.dumps(profile)),
+        )])
+
+    def add_workout(self, user_id, category, exercise, duration, calories, when):
+        seconds = to_epoch(when)
+        now = int(datetime.now(timezone.utc).timestamp())
+        self._write([
+            (
+                "INSERT INTO workouts (regn_id, category, exercise, duration, calories, ts) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (user_id, category, exercise, int(duration), float(calories), seconds),
+            ),
+            (
+                # AUTOINCREMENT ids are never reused, so they make a monotonic version;
+                # this must directly follow the workouts INSERT
+                "INSERT INTO versions VALUES (?, last_insert_rowid(), ?) "
+                "ON CONFLICT(regn_id) DO UPDATE SET "
+                "version = excluded.version, modified = excluded.modified",
+                (user_id, now),
+            ),
+            (
+                "INSERT INTO daily_totals VALUES (?, ?, ?, ?, ?, 1) "
+                "ON CONFLICT(regn_id, category, day) DO UPDATE SET "
+                "minutes = minutes + excluded.minutes, "
+                "calories = calories + excluded.calories, sessions = sessions + 1",
+                (user_id, category, seconds // SECONDS_PER_DAY, int(duration), float(calories)),
+            ),
+            (
+                "INSERT INTO exercise_totals VALUES (?, ?, ?, ?, ?, 1) "
+                "ON CONFLICT(regn_id, category, exercise) DO UPDATE SET "
+                "minutes = minutes + excluded.minutes, "
+                "calories = calories + excluded.calories, sessions = sessions + 1",
+                (user_id, category, exercise, int(duration), float(calories)),
+            ),
+        ])
+
+    def add_workouts(self, user_id, columns):
+        count = len(columns["timestamp"])
+        if not count:
+            return
+        categories = np.asarray(columns["category"], dtype=object)
+        durations = np.asarray(columns["duration"], dtype=np.int64)
+        calories = np.asarray(columns["calories"], dtype=np.float64)
+        seconds = np.asarray(columns["timestamp"], dtype=np.int64)
+        rows = list(zip(
+            [user_id] * count, categories.tolist(), list(columns["exercise"]),
+            durations.tolist(), calories.tolist(), seconds.tolist(),
+        ))
+        exercises = np.asarray(columns["exercise"], dtype=object)
+        # Pre-aggregate the batch per (category, day) and (category, exercise) so each
+        # bucket is upserted once
+        daily, by_exercise = [], []
+        for category in self.categories:
+            mask = categories == category
+            if not mask.any():
+                continue
+            for buckets, keys in ((daily, seconds[mask] // SECONDS_PER_DAY),
+                                  (by_exercise, exercises[mask])):
+                distinct, inverse = np.unique(keys, return_inverse=True)
+                buckets += zip(
+                    [user_id] * len(distinct), [category] * len(distinct), distinct.tolist(),
+                    np.bincount(inverse, weights=durations[mask]).astype(np.int64).tolist(),
+                    np.bincount(inverse, weights=calories[mask]).tolist(),
+                    np.bincount(inverse).tolist(),
+                )
+        now = int(datetime.now(timezone.utc).timestamp())
+        self._write([
+            (
+                "INSERT INTO workouts (regn_id, category, exercise, duration, calories, ts) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            ),
+            (
+                "INSERT INTO versions VALUES (?, last_insert_rowid(), ?) "
+                "ON CONFLICT(regn_id) DO UPDATE SET "
+                "version = excluded.version, modified = excluded.modified",
+                (user_id, now),
+            ),
+            (
+                "INSERT INTO daily_totals VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(regn_id, category, day) DO UPDATE SET "
+                "minutes = minutes + excluded.minutes, "
+                "calories = calories + excluded.calories, "
+                "sessions = sessions + excluded.sessions",
+                daily,
+            ),
+            (
+                "INSERT INTO exercise_totals VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(regn_id, category, exercise) DO UPDATE SET "
+                "minutes = minutes + excluded.minutes, "
+                "calories = calories + excluded.calories, "
+                "sessions = sessions + excluded.sessions",
+                by_exercise,
+            ),
+        ])
+
+    def _aggregate(self, user_id, first_day=None, last_day=None):
+        sql = ("SELECT category, SUM(minutes), SUM(calories), SUM(sessions) "
+               "FROM daily_totals WHERE regn_id = ?")
+        params = [user_id]
+        if first_day is not None:
+            sql += " AND day BETWEEN ? AND ?"
+            params += [first_day, last_day]
+        result = {cat: {"minutes": 0, "calories": 0.0, "sessions": 0} for cat in self.categories}
+        for category, minutes, calories, sessions in self._query(sql + " GROUP BY category",
+                                                                 params):
+            result[category] = {"minutes": minutes, "calories": calories, "sessions": sessions}
+        return result
+
+    def totals(self, user_id):
+        return self._aggregate(user_id)
+
+    def window(self, user_id, days, now=None):
+        today = to_epoch(now or datetime.now()) // SECONDS_PER_DAY
+        return self._aggregate(user_id, today - days + 1, today)
+
+    def between(self, user_id, first_day, last_day):
+        return self._aggregate(user_id, first_day, last_day)
+
+    def daily(self, user_id):
+        rows = self._query(
+            "SELECT category, day, minutes, calories, sessions FROM daily_totals "
+            "WHERE regn_id = ? ORDER BY category, day", (user_id,))
+        result = {}
+        for category in self.categories:
+            picked = [row[1:] for row in rows if row[0] == category]
+            result[category] = {
+                key: np.array([row[i] for row in picked], dtype=dtype)
+                for i, (key, dtype) in enumerate((("day", np.int64), ("minutes", np.int64),
+                                                  ("calories", np.float64),
+                                                  ("sessions", np.int64)))
+            }
+        return result
+
+    def exercise_totals(self, user_id):
+        result = {category: {} for category in self.categories}
+        for category, exercise, minutes, calories, sessions in self._query(
+                "SELECT category, exercise, minutes, calories, sessions FROM exercise_totals "
+                "WHERE regn_id = ?", (user_id,)):
+            result[category][exercise] = {
+                "minutes": minutes, "calories": calories, "sessions": sessions}
+        return result
+
+    def page(self, user_id, category, start=None, end=None, cursor=None, limit=PAGE_SIZE):
+        upper, skip = (2**63 - 1, 0) if cursor is None else decode_cursor(cursor)
+        # Newest first on the (regn_id, category, ts) index; OFFSET only skips the
+        # rows sharing the cursor's timestamp that the previous page already showed
+        rows = self._query(
+            "SELECT exercise, duration, calories, ts FROM workouts "
+            "WHERE regn_id = ? AND category = ? AND ts >= ? AND ts < ? AND ts <= ? "
+            "ORDER BY ts DESC, id DESC LIMIT ? OFFSET ?",
+            (user_id, category,
+             -2**63 if start is None else start, 2**63 - 1 if end is None else end,
+             upper, limit + 1, skip),
+        )
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1][3]
+            ties = sum(1 for row in rows if row[3] == last)
+            next_cursor = encode_cursor(last, ties + (skip if last == upper else 0))
+        return [
+            {
+                "exercise": exercise,
+                "duration": duration,
+                "calories": calories,
+                "timestamp": from_epoch(ts).strftime(TIMESTAMP_FORMAT),
+                "date": day_label(ts // SECONDS_PER_DAY),
+            }
+            for exercise, duration, calories, ts in rows
+        ], next_cursor
+
+    def sessions(self, user_id, category, since=None):
+        rows = self._query(
+            "SELECT exercise, duration, calories, ts FROM workouts "
+            "WHERE regn_id = ? AND category = ? AND ts >= ? ORDER BY ts, id",
+            (user_id, category, to_epoch(since) if since is not None else -2**63),
+        )
+        return [
+            {
+                "exercise": exercise,
+                "duration": duration,
+                "calories": calories,
+                "timestamp": from_epoch(ts).strftime(TIMESTAMP_FORMAT),
+            }
+            for exercise, duration, calories, ts in rows
+        ]
+
+    def iter_sessions(self, user_id, chunk_size=1000):
+        for category in self.categories:
+            # Keyset pagination on the (regn_id, category, ts) index; the connection
+            # is returned to the pool between chunks
+            last = (-2**63, 0)
+            while True:
+                rows = self._query(
+                    "SELECT exercise, duration, calories, ts, id FROM workouts "
+                    "WHERE regn_id = ? AND category = ? AND (ts, id) > (?, ?) "
+                    "ORDER BY ts, id LIMIT ?",
+                    (user_id, category, last[0], last[1], chunk_size),
+                )
+                if not rows:
+                    break
+                yield [
+                    {
+                        "category": category,
+                        "exercise": exercise,
+                        "duration": duration,
+                        "calories": calories,
+                        "timestamp": from_epoch(ts).strftime(TIMESTAMP_FORMAT),
+                    }
+                    for exercise, duration, calories, ts, _ in rows
+                ]
+                last = (rows[-1][3], rows[-1][4])
+
+    def category_sizes(self):
+        # Read from the aggregates: one row per member, category and day
+        sizes = dict.fromkeys(self.categories, 0)
+        for category, sessions in self._query(
+                "SELECT category, SUM(sessions) FROM daily_totals GROUP BY category"):
+            sizes[category] = sessions
+        return sizes
+
+    def _version_row(self, user_id):
+        rows = self._query("SELECT version, modified FROM versions WHERE regn_id = ?", (user_id,))
+        return rows[0] if rows else (0, 0)
+
+    def version(self, user_id):
+        return self._version_row(user_id)[0]
+
+    def modified(self, user_id):
+        return datetime.fromtimestamp(self._version_row(user_id)[1], timezone.utc)
+
+    def clear(self):
+        self._write([(f"DELETE FROM {table}", ()) for table in
+                     ("profiles", "workouts", "daily_totals", "exercise_totals", "versions")])
+
+
+def create_repository(url, categories):
+    """Builds a repository from ``memory://``, ``wal:///<directory>`` or ``sqlite:///<path>``."""
+    if url in ("", "memory", "memory://"):
+        return InMemoryRepository(categories)
+    if url.startswith("wal:///"):
+        return DurableRepository(categories, url[len("wal:///"):])
+    if url.startswith("sqlite:///"):
+        return SQLiteRepository(categories, url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported storage URL: {url}")
@@ -0,0 +1,204 @@
+# pylint: disable=too-many-arguments, too-many-locals
+
+"""
+Member-level operations shared by the HTML pages and the JSON API.
+
+Each function takes the repository explicitly, applies the validation and
+formulas from src/fitness.py, and returns plain dicts ready for a template or
+for jsonify().
+"""
+from datetime import date, datetime, timedelta
+
+from src.fitness import (
+    WORKOUT_CATEGORIES, DEFAULT_WEIGHT_KG,
+    calculate_metrics, calculate_calories, validate_profile, validate_workout
+)
+from src.repository import PAGE_SIZE
+from src.store import SECONDS_PER_DAY, TIMESTAMP_FORMAT, to_epoch, decode_cursor
+
+# Rolling window shown as the "weekly" summary
+SUMMARY_WINDOW_DAYS = 7
+# Largest page a client may ask for
+MAX_PAGE_SIZE = 100
+
+
+def save_profile(repo, fields):
+    """Validates, completes (BMI/BMR) and stores a member profile; returns it.
+
+    ``fields`` is the submitted form or JSON object. Raises ValueError with the
+    member-facing message on invalid input.
+    """
+    profile = validate_profile(fields)
+    bmi, bmr = calculate_metrics(
+        profile["weight"], profile["height"], profile["age"], profile["gender"]
+    )
+    profile.update({"bmi": f"{bmi:.1f}", "bmr": f"{bmr:.0f}"})
+    repo.save_profile(profile["regn_id"], profile)
+    return profile
+
+
+class EntryLimitReached(ValueError):
+    """The member already has the most sessions a category may hold."""
+
+
+def entry_limit_message(category, max_entries):
+    """Returns the member-facing message for a full category."""
+    return f"You have reached the limit of {max_entries} {category} sessions."
+
+
+def log_workout(repo, user_id, category, exercise, duration, *, max_entries=0):
+    """Validates and stores one session, returning the created entry.
+
+    Raises ValueError with the member-facing message on invalid input, and
+    EntryLimitReached when the category already holds ``max_entries`` sessions
+    (0: no limit; concurrent writers may overshoot it by a session or two).
+    """
+    category, exercise, duration = validate_workout(category, exercise, duration)
+    if max_entries and repo.totals(user_id)[category]["sessions"] >= max_entries:
+        raise EntryLimitReached(entry_limit_message(category, max_entries))
+    # Get weight from the member's profile, default to 70kg if not set
+    weight = repo.get_profile(user_id).get("weight", DEFAULT_WEIGHT_KG)
+    calories = calculate_calories(category, duration, weight)
+    when = datetime.now().replace(microsecond=0)
+    repo.add_workout(user_id, category, exercise, duration, calories, when)
+    return {
+        "category": category,
+        "exercise": exercise,
+        "duration": duration,
+        "calories": calories,
+        "timestamp": when.strftime(TIMESTAMP_FORMAT),
+    }
+
+
+def motivation_for(total_minutes):
+    """Returns the (message, alert class) pair for a lifetime training time."""
+    # Simple motivation logic
+    if total_minutes == 0:
+        return "Time to start moving!", "info"
+    if total_minutes < 60:
+        return "Nice effort! You're building consistency.", "warning"
+    return "Excellent dedication! Keep up the great work.", "success"
+
+
+def parse_summary_query(args):
+    """Validates summary filters from a query string; returns summary_report() kwargs.
+
+    Accepts ``start``/``end`` (YYYY-MM-DD, inclusive), ``category``, ``cursor``
+    (needs ``category``) and ``limit``. Raises ValueError with a client-facing message.
+    """
+    query = {}
+    try:
+        for key in ("start", "end"):
+            if args.get(key):
+                query[key] = date.fromisoformat(args[key])
+    except ValueError as err:
+        raise ValueError("Dates must look like YYYY-MM-DD.") from err
+    if "start" in query and "end" in query and query["start"] > query["end"]:
+        raise ValueError("The start date must not be after the end date.")
+    query.update(parse_page_query(args))
+    return query
+
+
+def parse_page_query(args):
+    """Validates ``category``, ``cursor`` (needs ``category``) and ``limit`` from a
+    query string; returns the given ones. Raises ValueError with a client-facing message.
+    """
+    query = {}
+    if args.get("category"):
+        if args["category"] not in WORKOUT_CATEGORIES:
+            raise ValueError("Invalid workout category selected.")
+        query["category"] = args["category"]
+    if args.get("cursor"):
+        if "category" not in query:
+            raise ValueError("A cursor needs a category.")
+        try:
+            decode_cursor(args["cursor"])
+        except ValueError as err:
+            raise ValueError("Invalid cursor.") from err
+        query["cursor"] = args["cursor"]
+    if args.get("limit"):
+        try:
+            query["limit"] = int(args["limit"])
+        except ValueError:
+            query["limit"] = 0
+        if not 1 <= query["limit"] <= MAX_PAGE_SIZE:
+            raise ValueError(f"Limit must be between 1 and {MAX_PAGE_SIZE}.")
+    return query
+
+
+def summary_report(repo, user_id, *, start=None, end=None, category=None, cursor=None,
+                   limit=PAGE_SIZE):
+    """Returns lifetime totals, aggregates of a date range and one page of its sessions.
+
+    The range defaults to the rolling week, and to the week ending on ``end`` when
+    only that is given. Sessions are listed newest first per
+    category (or for ``category`` only), ``limit`` at a time; ``next`` holds the
+    cursor of each category's following page. All totals come from the
+    aggregates, never from the listed rows.
+    """
+    today = datetime.now().date()
+    end = end or today
+    start = start or end - timedelta(days=SUMMARY_WINDOW_DAYS - 1)
+    first_day = to_epoch(datetime.combine(start, datetime.min.time())) // SECONDS_PER_DAY
+    last_day = to_epoch(datetime.combine(end, datetime.min.time())) // SECONDS_PER_DAY
+    # Totals come from the running aggregates instead of rescanning every entry
+    totals = repo.totals(user_id)
+    in_range = repo.between(user_id, first_day, last_day)
+    total_minutes = sum(bucket["minutes"] for bucket in totals.values())
+    motivation, alert_class = motivation_for(total_minutes)
+    categories = [category] if category else list(WORKOUT_CATEGORIES)
+    sessions, next_cursors = {}, {}
+    for cat in categories:
+        sessions[cat], next_cursors[cat] = repo.page(
+            user_id, cat,
+            start=first_day * SECONDS_PER_DAY, end=(last_day + 1) * SECONDS_PER_DAY,
+            cursor=cursor, limit=limit,
+        )
+    return {
+        "total_minutes": total_minutes,
+        "motivation": motivation,
+        "alert_class": alert_class,
+        "totals": totals,
+        "range": {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "rolling_week": end == today and end - start == timedelta(days=SUMMARY_WINDOW_DAYS - 1),
+            "minutes": sum(bucket["minutes"] for bucket in in_range.values()),
+            "sessions": sum(bucket["sessions"] for bucket in in_range.values()),
+            "totals": in_range,
+        },
+        "sessions": sessions,
+        "next": next_cursors,
+    }
+
+
+def progress_series(repo, user_id):
+    """Returns the raw per-category series behind the progress charts."""
+    totals = repo.totals(user_id)
+    minutes = [totals[cat]["minutes"] for cat in WORKOUT_CATEGORIES]
+    total_minutes = sum(minutes)
+    return {
+        "categories": list(WORKOUT_CATEGORIES),
+        "minutes": minutes,
+        "calories": [totals[cat]["calories"] for cat in WORKOUT_CATEGORIES],
+        "sessions": [totals[cat]["sessions"] for cat in WORKOUT_CATEGORIES],
+        "distribution_pct": [
+            100.0 * value / total_minutes if total_minutes else 0.0 for value in minutes
+        ],
+        "total_minutes": total_minutes,
+        "week_minutes": sum(
+            bucket["minutes"] for bucket in repo.window(user_id, SUMMARY_WINDOW_DAYS).values()
+        ),
+    }
+
+
+def progress_update(repo, user_id, entry=None):
+    """Returns the live-update payload of a member: progress_series() plus the
+    rolling week's session count, the data version and the session just logged."""
+    week = repo.window(user_id, SUMMARY_WINDOW_DAYS)
+    return {
+        **progress_series(repo, user_id),
+        "week_sessions": sum(bucket["sessions"] for bucket in week.values()),
+        "version": repo.version(user_id),
+        "entry": entry,
+    }
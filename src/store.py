@@ -0,0 +1,476 @@
+"""
+In-memory workout store for the ACEest Fitness Tracker.
+
+WorkoutLog behaves like the original ``{category: [entry, ...]}`` dict, but keeps
+running per-category aggregates (minutes, calories, session count), per-day and
+per-exercise buckets up to date on every append, so totals, rolling day/week
+windows and trends are answered without rescanning the logged history.
+
+Sessions are stored column-wise in NumPy arrays instead of one dict per entry:
+durations as int64, calories as float64, timestamps as int64 epoch seconds and
+exercise names as int32 codes into a string table shared by all categories.
+Indexing a CategoryLog still returns the familiar entry dict, built on demand.
+Timestamps are wall-clock (naive local) times encoded as if they were UTC, so
+they round-trip to the same ``TIMESTAMP_FORMAT`` string regardless of DST.
+
+Because the columns are kept sorted by timestamp they double as a time index:
+``since()`` and ``page()`` binary-search it, so reading a window or one page of
+history costs O(log n + page) however long the member has been logging.
+
+Each WorkoutLog is safe to share between request threads. Writers take the
+log's lock; readers hold it only long enough to take a snapshot: views of the
+columns sized at that instant (appends write past them, and growing or
+re-sorting allocates fresh arrays, so the views never change afterwards) or
+copies of the aggregate records. Rows are then built outside the lock.
+"""
+import calendar
+import functools
+import itertools
+import threading
+from collections.abc import Mapping, Sequence
+from datetime import datetime, timedelta, timezone
+import numpy as np
+
+# Format used for entry timestamps throughout the app and templates
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+SECONDS_PER_DAY = 86400
+_EPOCH = datetime(1970, 1, 1)
+_INITIAL_CAPACITY = 16
+# Versions are drawn from one process-wide sequence so that two logs (e.g. a log
+# and its replacement after a reset) never report the same version
+_VERSIONS = itertools.count(1)
+
+
+def to_epoch(when):
+    """Converts a naive wall-clock datetime to epoch seconds."""
+    return calendar.timegm(when.timetuple())
+
+
+def from_epoch(seconds):
+    """Converts epoch seconds produced by to_epoch() back to a naive datetime."""
+    return _EPOCH + timedelta(seconds=int(seconds))
+
+
+def window_start(days, now=None):
+    """Returns the first instant covered by a ``days``-long window ending today."""
+    today = (now or datetime.now()).date()
+    return datetime.combine(today - timedelta(days=days - 1), datetime.min.time())
+
+
+@functools.lru_cache(maxsize=4096)
+def day_label(day):
+    """Returns the YYYY-MM-DD label of a day number (epoch seconds // SECONDS_PER_DAY)."""
+    return from_epoch(day * SECONDS_PER_DAY).strftime("%Y-%m-%d")
+
+
+def encode_cursor(seconds, skip):
+    """Returns the page cursor for "older than ``seconds``, after ``skip`` ties"."""
+    return f"{int(seconds)}.{int(skip)}"
+
+
+def decode_cursor(cursor):
+    """Returns (seconds, skip) from a page cursor; raises ValueError if malformed."""
+    seconds, _, skip = str(cursor).partition(".")
+    seconds, skip = int(seconds), int(skip)
+    # Both parts are compared with int64 columns (and SQLite INTEGERs)
+    bounds = np.iinfo(np.int64)
+    if skip < 0 or not bounds.min <= seconds <= bounds.max or skip > bounds.max:
+        raise ValueError("Invalid cursor.")
+    return seconds, skip
+
+
+def _empty_totals():
+    """Returns a zeroed aggregate record."""
+    return {"minutes": 0, "calories": 0.0, "sessions": 0}
+
+
+def _group_sums(keys, minutes, calories):
+    """Returns (distinct keys, minutes, calories, sessions per key) as Python lists."""
+    distinct, inverse = np.unique(keys, return_inverse=True)
+    return (
+        distinct.tolist(),
+        np.bincount(inverse, weights=minutes).astype(np.int64).tolist(),
+        np.bincount(inverse, weights=calories).tolist(),
+        np.bincount(inverse).tolist(),
+    )
+
+
+class CategoryLog(Sequence): # pylint: disable=too-many-instance-attributes
+    """The time-ordered sessions of one category; appends update the owner's aggregates."""
+
+    def __init__(self, owner, category):
+        self._owner = owner
+        self._category = category
+        self._size = 0
+        self._allocate(_INITIAL_CAPACITY)
+        # False after a back-dated append; the columns are re-sorted lazily on read
+        self._sorted = True
+
+    def _allocate(self, capacity):
+        self._durations = np.empty(capacity, dtype=np.int64)
+        self._calories = np.empty(capacity, dtype=np.float64)
+        self._times = np.empty(capacity, dtype=np.int64)
+        self._exercises = np.empty(capacity, dtype=np.int32)
+
+    def _reserve(self, extra):
+        """Grows the columns geometrically so appends stay amortised O(1)."""
+        needed = self._size + extra
+        capacity = len(self._times)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        # Fresh arrays rather than in-place resize: views handed out earlier keep
+        # pointing at the old buffers, which are never written again.
+        old = (self._durations, self._calories, self._times, self._exercises)
+        self._allocate(capacity)
+        for new_column, old_column in zip(
+                (self._durations, self._calories, self._times, self._exercises), old):
+            new_column[:self._size] = old_column[:self._size]
+
+    def _ensure_sorted(self):
+        if self._sorted:
+            return
+        size = self._size
+        order = np.argsort(self._times[:size], kind="stable")
+        # Sorted into fresh arrays for the same reason _reserve() does not resize
+        old = (self._durations, self._calories, self._times, self._exercises)
+        self._allocate(len(self._times))
+        for new_column, old_column in zip(
+                (self._durations, self._calories, self._times, self._exercises), old):
+            new_column[:size] = old_column[:size][order]
+        self._sorted = True
+
+    def _snapshot(self):
+        """Returns (exercises, durations, calories, times) views as of now, time-ordered."""
+        with self._owner.lock:
+            self._ensure_sorted()
+            size = self._size
+            return (self._exercises[:size], self._durations[:size],
+                    self._calories[:size], self._times[:size])
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        snapshot = self._snapshot()
+        size = len(snapshot[3])
+        if isinstance(index, slice):
+            return [self._row(snapshot, i) for i in range(*index.indices(size))]
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("workout index out of range")
+        return self._row(snapshot, index)
+
+    def __iter__(self):
+        snapshot = self._snapshot()
+        for i in range(len(snapshot[3])):
+            yield self._row(snapshot, i)
+
+    def _row(self, snapshot, i):
+        exercises, durations, calories, times = snapshot
+        return {
+            "exercise": self._owner.exercise_name(exercises[i]),
+            "duration": int(durations[i]),
+            "calories": float(calories[i]),
+            "timestamp": from_epoch(times[i]).strftime(TIMESTAMP_FORMAT),
+        }
+
+    def add(self, exercise, duration, calories, when):
+        """Logs a session; ``when`` is a naive datetime or epoch seconds."""
+        seconds = when if isinstance(when, (int, np.integer)) else to_epoch(when)
+        with self._owner.lock:
+            self._reserve(1)
+            i = self._size
+            self._durations[i] = duration
+            self._calories[i] = calories
+            self._times[i] = seconds
+            code = self._exercises[i] = self._owner.exercise_code(exercise)
+            if i and self._sorted and seconds < self._times[i - 1]:
+                self._sorted = False
+            self._size = i + 1
+            self._owner.record(self._category, code, duration, calories, seconds)
+
+    def extend(self, exercises, durations, calories, seconds):
+        """Logs many sessions at once from parallel sequences (timestamps in epoch seconds)."""
+        count = len(seconds)
+        if not count:
+            return
+        durations = np.asarray(durations, dtype=np.int64)
+        calories = np.asarray(calories, dtype=np.float64)
+        seconds = np.asarray(seconds, dtype=np.int64)
+        with self._owner.lock:
+            codes = np.fromiter(
+                (self._owner.exercise_code(name) for name in exercises),
+                dtype=np.int32, count=count
+            )
+            self._reserve(count)
+            start, end = self._size, self._size + count
+            self._durations[start:end] = durations
+            self._calories[start:end] = calories
+            self._times[start:end] = seconds
+            self._exercises[start:end] = codes
+            if self._sorted and (
+                    (start and seconds[0] < self._times[start - 1])
+                    or bool(np.any(seconds[1:] < seconds[:-1]))):
+                self._sorted = False
+            self._size = end
+            self._owner.record_many(self._category, codes, durations, calories, seconds)
+
+    def append(self, entry):
+        """Logs a session given as an entry dict (exercise, duration, calories, timestamp)."""
+        self.add(
+            entry["exercise"],
+            entry["duration"],
+            entry["calories"],
+            datetime.strptime(entry["timestamp"], TIMESTAMP_FORMAT),
+        )
+
+    def clear(self):
+        """Removes every session of this category and resets its aggregates."""
+        with self._owner.lock:
+            self._size = 0
+            self._allocate(_INITIAL_CAPACITY)
+            self._sorted = True
+            self._owner.reset(self._category)
+
+    def adopt(self, exercises, durations, calories, seconds):
+        """Takes over time-ordered columns (e.g. memory-mapped) as this empty log's sessions.
+
+        The arrays are used as they are and only ever read: the first append
+        grows into fresh arrays, as it would from full ones.
+        """
+        if len(seconds) == 0:
+            return
+        with self._owner.lock:
+            if self._size:
+                raise ValueError("only an empty log can adopt sessions")
+            self._exercises, self._durations = exercises, durations
+            self._calories, self._times = calories, seconds
+            self._size = len(seconds)
+            self._sorted = True
+            self._owner.record_many(self._category, exercises, durations, calories, seconds)
+
+    def since(self, when):
+        """Returns the sessions logged at or after ``when`` (binary search on the index)."""
+        snapshot = self._snapshot()
+        start = int(np.searchsorted(snapshot[3], to_epoch(when), side="left"))
+        return [self._row(snapshot, i) for i in range(start, len(snapshot[3]))]
+
+    def page(self, start=None, end=None, cursor=None, limit=20):  # pylint: disable=too-many-locals
+        """Returns (sessions newest first, next cursor or None) within [start, end).
+
+        ``start``/``end`` are epoch seconds; ``cursor`` comes from a previous
+        page. Each session dict also carries its ``date`` (YYYY-MM-DD).
+        """
+        snapshot = self._snapshot()
+        times = snapshot[3]
+        low = 0 if start is None else int(np.searchsorted(times, start, side="left"))
+        high = len(times) if end is None else int(np.searchsorted(times, end, side="left"))
+        if cursor is not None:
+            seconds, skip = decode_cursor(cursor)
+            high = min(high, int(np.searchsorted(times, seconds, side="right")) - skip)
+        first = max(low, high - limit)
+        rows = []
+        for i in range(high - 1, first - 1, -1):
+            row = self._row(snapshot, i)
+            row["date"] = day_label(int(times[i]) // SECONDS_PER_DAY)
+            rows.append(row)
+        next_cursor = None
+        if first > low:
+            seconds = int(times[first])
+            ties_seen = int(np.searchsorted(times, seconds, side="right")) - first
+            next_cursor = encode_cursor(seconds, ties_seen)
+        return rows, next_cursor
+
+    def columns(self):
+        """Returns read-only, zero-copy NumPy views of the time-ordered columns."""
+        exercises, durations, calories, times = self._snapshot()
+        views = {
+            "exercise": exercises,
+            "duration": durations,
+            "calories": calories,
+            "timestamp": times,
+        }
+        for view in views.values():
+            view.flags.writeable = False
+        return views
+
+
+class WorkoutLog(Mapping): # pylint: disable=too-many-instance-attributes
+    """Mapping of category -> CategoryLog with O(1) running aggregates."""
+
+    def __init__(self, categories):
+        # Re-entrant: a CategoryLog append holds it while recording aggregates
+        self.lock = threading.RLock()
+        self._logs = {cat: CategoryLog(self, cat) for cat in categories}
+        self._totals = {cat: _empty_totals() for cat in categories}
+        # Key: Category, Value: {day number: aggregate record for that day}
+        self._daily = {cat: {} for cat in categories}
+        # Key: Category, Value: {exercise code: lifetime aggregate record}
+        self._by_exercise = {cat: {} for cat in categories}
+        # Interned exercise names shared by every category
+        self._names = []
+        self._name_codes = {}
+        # Bumped on every change; keys caches built on top of the log
+        self.version = 0
+        self.modified = datetime.now(timezone.utc).replace(microsecond=0)
+
+    def __getitem__(self, category):
+        return self._logs[category]
+
+    def __iter__(self):
+        return iter(self._logs)
+
+    def __len__(self):
+        return len(self._logs)
+
+    def exercise_code(self, name):
+        """Returns the string-table code of an exercise name, interning it if new."""
+        code = self._name_codes.get(name)
+        if code is None:
+            with self.lock:
+                code = self._name_codes.get(name)
+                if code is None:
+                    # Name first: a reader holding the code must find it in the table
+                    self._names.append(name)
+                    code = self._name_codes[name] = len(self._names) - 1
+        return code
+
+    def exercise_name(self, code):
+        """Returns the exercise name stored under a string-table code."""
+        return self._names[code]
+
+    def exercise_names(self):
+        """Returns a copy of the string table, indexed by exercise code."""
+        with self.lock:
+            return list(self._names)
+
+    def restore(self, names, columns):
+        """Loads sessions saved by exercise_names() and CategoryLog.columns() into this log.
+
+        ``columns`` maps category to (exercise codes, durations, calories,
+        timestamps); the arrays are adopted without copying.
+        """
+        with self.lock:
+            if self._names:
+                raise ValueError("only an empty log can be restored")
+            for name in names:
+                self.exercise_code(name)
+            for category, arrays in columns.items():
+                self._logs[category].adopt(*arrays)
+
+    def _changed(self):
+        self.version = next(_VERSIONS)
+        # HTTP dates have one-second resolution
+        self.modified = datetime.now(timezone.utc).replace(microsecond=0)
+
+    def record(self, category, exercise, minutes, calories, seconds):
+        """Adds one session to the lifetime, per-day and per-exercise aggregates of a category.
+
+        ``exercise`` is the string-table code of the exercise name.
+        """
+        with self.lock:
+            for bucket in (
+                self._totals[category],
+                self._daily[category].setdefault(seconds // SECONDS_PER_DAY, _empty_totals()),
+                self._by_exercise[category].setdefault(int(exercise), _empty_totals()),
+            ):
+                bucket["minutes"] += int(minutes)
+                bucket["calories"] += float(calories)
+                bucket["sessions"] += 1
+            self._changed()
+
+    def record_many(self, category, exercises, minutes, calories, seconds):  # pylint: disable=too-many-locals
+        """Adds a batch of sessions (parallel arrays; exercise codes) to a category's aggregates."""
+        # One bucket update per distinct day (and exercise) rather than per session
+        groups = [
+            (self._daily[category], *_group_sums(seconds // SECONDS_PER_DAY, minutes, calories)),
+            (self._by_exercise[category], *_group_sums(exercises, minutes, calories)),
+        ]
+        with self.lock:
+            totals = self._totals[category]
+            totals["minutes"] += int(minutes.sum())
+            totals["calories"] += float(calories.sum())
+            totals["sessions"] += len(seconds)
+            for buckets, keys, key_minutes, key_calories, key_sessions in groups:
+                for i, key in enumerate(keys):
+                    bucket = buckets.setdefault(key, _empty_totals())
+                    bucket["minutes"] += key_minutes[i]
+                    bucket["calories"] += key_calories[i]
+                    bucket["sessions"] += key_sessions[i]
+            self._changed()
+
+    def reset(self, category):
+        """Zeroes the aggregates of a category (its sessions were cleared)."""
+        with self.lock:
+            self._totals[category] = _empty_totals()
+            self._daily[category] = {}
+            self._by_exercise[category] = {}
+            self._changed()
+
+    def totals(self):
+        """Returns lifetime aggregates per category."""
+        with self.lock:
+            return {cat: dict(bucket) for cat, bucket in self._totals.items()}
+
+    def window(self, days, now=None):
+        """Returns aggregates per category over the last ``days`` calendar days (today included)."""
+        today = to_epoch(now or datetime.now()) // SECONDS_PER_DAY
+        return self.between(today - days + 1, today)
+
+    def between(self, first_day, last_day):
+        """Returns aggregates per category over day numbers first_day..last_day (inclusive)."""
+        result = {}
+        # Held for the whole sum so every category reflects the same instant
+        with self.lock:
+            for cat, daily in self._daily.items():
+                bucket = _empty_totals()
+                # Walk whichever is shorter: the range or the days with sessions
+                if last_day - first_day + 1 <= len(daily):
+                    buckets = (daily.get(day) for day in range(first_day, last_day + 1))
+                else:
+                    buckets = (totals for day, totals in daily.items()
+                               if first_day <= day <= last_day)
+                for day_totals in buckets:
+                    if day_totals:
+                        for key, value in day_totals.items():
+                            bucket[key] += value
+                result[cat] = bucket
+        return result
+
+    def daily(self):
+        """Returns {category: {"day", "minutes", "calories", "sessions"}} arrays of day buckets.
+
+        Day numbers are sorted ascending; only days with sessions are present.
+        """
+        with self.lock:
+            copies = {cat: sorted((day, dict(bucket)) for day, bucket in daily.items())
+                      for cat, daily in self._daily.items()}
+        result = {}
+        for cat, buckets in copies.items():
+            result[cat] = {"day": np.array([day for day, _ in buckets], dtype=np.int64)}
+            for key, dtype in (("minutes", np.int64), ("calories", np.float64),
+                               ("sessions", np.int64)):
+                result[cat][key] = np.array([bucket[key] for _, bucket in buckets], dtype=dtype)
+        return result
+
+    def exercise_totals(self):
+        """Returns lifetime {category: {exercise name: aggregate record}}."""
+        with self.lock:
+            return {cat: {self._names[code]: dict(bucket) for code, bucket in by_code.items()}
+                    for cat, by_code in self._by_exercise.items()}
+
+    def frame(self, category):
+        """Returns a pandas DataFrame over the category's columns without copying them."""
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+        columns = self._logs[category].columns()
+        return pd.DataFrame({
+            "exercise": pd.Categorical.from_codes(
+                columns["exercise"], categories=pd.Index(self._names, dtype=object)
+            ),
+            "duration": columns["duration"],
+            "calories": columns["calories"],
+            "timestamp": columns["timestamp"],
+        }, copy=False)
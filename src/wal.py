@@ -0,0 +1,400 @@
+# pylint: disable=too-many-locals, too-many-instance-attributes, too-many-arguments
+# pylint: disable=too-many-positional-arguments
+
+"""
+Write-ahead log and snapshots for the durable in-memory repository.
+
+Every change is appended to the current log segment (``wal-<n>.log``) as a
+compact binary record before the caller gets its answer:
+
+    kind (1 byte) | payload length (4) | CRC-32 of kind and payload (4) | payload
+
+Writers queue their record and one of them writes and fsyncs everything queued
+so far (group commit), so concurrent requests share a single fsync.
+
+A snapshot (``snapshot-<n>/``) holds the whole state as .npy column files plus
+a JSON index, and covers every segment numbered below ``n``. Recovery loads the
+newest complete snapshot memory-mapped and replays the segments from ``n`` on;
+a torn record at the end of the last segment (a crash mid-write) is cut off.
+Once a snapshot is complete the segments and snapshots it supersedes are
+deleted, which keeps the log compact.
+"""
+import fcntl
+import json
+import os
+import shutil
+import struct
+import threading
+import zlib
+
+import numpy as np
+
+# Record kinds
+PROFILE, WORKOUT, BATCH, CLEAR = 1, 2, 3, 4
+# Snapshot column files, in the order CategoryLog keeps them
+COLUMNS = (("exercise", np.int32), ("duration", np.int64),
+           ("calories", np.float64), ("timestamp", np.int64))
+
+_HEADER = struct.Struct("<BII")
+_COUNT = struct.Struct("<I")
+_WORKOUT = struct.Struct("<qdq")
+_SEGMENT = "wal-{:08d}.log"
+_SNAPSHOT = "snapshot-{:08d}"
+
+
+class WALError(RuntimeError):
+    """The log could not be written; later appends fail too, as durability is lost."""
+
+
+# --- Record encoding ---
+def _frame(kind, payload):
+    checksum = zlib.crc32(payload, zlib.crc32(bytes((kind,))))
+    return _HEADER.pack(kind, len(payload), checksum) + payload
+
+
+def _pack_str(value):
+    data = value.encode("utf-8")
+    return _COUNT.pack(len(data)) + data
+
+
+def _pack_strs(values):
+    return _COUNT.pack(len(values)) + b"".join(_pack_str(value) for value in values)
+
+
+def profile_record(user_id, profile):
+    """Returns the record replacing a member's profile."""
+    return _frame(PROFILE, _pack_str(user_id) + _pack_str(json.dumps(profile)))
+
+
+def workout_record(user_id, category, exercise, duration, calories, seconds):
+    """Returns the record logging one session (timestamp in epoch seconds)."""
+    return _frame(WORKOUT, _pack_str(user_id) + _pack_str(category) + _pack_str(exercise)
+                  + _WORKOUT.pack(int(duration), float(calories), int(seconds)))
+
+
+def batch_record(user_id, columns):
+    """Returns the record logging a batch of sessions given as parallel columns.
+
+    Category and exercise names are stored once each, with int32 codes per row.
+    """
+    categories, category_codes = np.unique(
+        np.asarray(columns["category"], dtype=object), return_inverse=True)
+    exercises, exercise_codes = np.unique(
+        np.asarray(columns["exercise"], dtype=object), return_inverse=True)
+    return _frame(BATCH, b"".join([
+        _pack_str(user_id),
+        _COUNT.pack(len(category_codes)),
+        _pack_strs(categories.tolist()),
+        category_codes.astype(np.int32).tobytes(),
+        _pack_strs(exercises.tolist()),
+        exercise_codes.astype(np.int32).tobytes(),
+        np.asarray(columns["duration"], dtype=np.int64).tobytes(),
+        np.asarray(columns["calories"], dtype=np.float64).tobytes(),
+        np.asarray(columns["timestamp"], dtype=np.int64).tobytes(),
+    ]))
+
+
+def clear_record():
+    """Returns the record removing every member and session."""
+    return _frame(CLEAR, b"")
+
+
+class _Payload:
+    """Reads the fields of one record payload in order."""
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def take(self, size):
+        """Returns the next ``size`` bytes."""
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += size
+        return chunk
+
+    def count(self):
+        """Returns the next unsigned 32-bit count."""
+        return _COUNT.unpack(self.take(_COUNT.size))[0]
+
+    def string(self):
+        """Returns the next length-prefixed UTF-8 string."""
+        return bytes(self.take(self.count())).decode("utf-8")
+
+    def strings(self):
+        """Returns the next count-prefixed list of strings."""
+        return [self.string() for _ in range(self.count())]
+
+    def array(self, dtype, count):
+        """Returns the next ``count`` values of ``dtype`` as an array."""
+        return np.frombuffer(self.take(count * np.dtype(dtype).itemsize), dtype=dtype)
+
+
+def decode(kind, payload):
+    """Returns the arguments of the repository call a record stands for."""
+    reader = _Payload(payload)
+    if kind == PROFILE:
+        return reader.string(), json.loads(reader.string())
+    if kind == WORKOUT:
+        user_id, category, exercise = reader.string(), reader.string(), reader.string()
+        return (user_id, category, exercise,
+                *_WORKOUT.unpack(reader.take(_WORKOUT.size)))
+    if kind == BATCH:
+        user_id, rows = reader.string(), reader.count()
+        categories = np.array(reader.strings(), dtype=object)[reader.array(np.int32, rows)]
+        exercises = np.array(reader.strings(), dtype=object)[reader.array(np.int32, rows)]
+        return user_id, {
+            "category": categories,
+            "exercise": exercises,
+            "duration": reader.array(np.int64, rows),
+            "calories": reader.array(np.float64, rows),
+            "timestamp": reader.array(np.int64, rows),
+        }
+    if kind == CLEAR:
+        return ()
+    raise WALError(f"Unknown record kind {kind}")
+
+
+# --- Segments and recovery ---
+def _numbered(directory, prefix, suffix=""):
+    numbers = []
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and name.endswith(suffix):
+            number = name[len(prefix):len(name) - len(suffix)]
+            if number.isdigit():
+                numbers.append(int(number))
+    return sorted(numbers)
+
+
+def segments(directory):
+    """Returns the numbers of the log segments in ``directory``, oldest first."""
+    return _numbered(directory, "wal-", ".log")
+
+
+def _fsync_dir(directory):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _read_segment(path):
+    """Returns ([(kind, payload)], bytes up to the end of the last intact record)."""
+    with open(path, "rb") as segment:
+        data = memoryview(segment.read())
+    records, pos = [], 0
+    while pos + _HEADER.size <= len(data):
+        kind, length, checksum = _HEADER.unpack(data[pos:pos + _HEADER.size])
+        end = pos + _HEADER.size + length
+        payload = data[pos + _HEADER.size:end]
+        if end > len(data) or zlib.crc32(payload, zlib.crc32(bytes((kind,)))) != checksum:
+            break
+        records.append((kind, payload))
+        pos = end
+    return records, pos
+
+
+def replay(directory, first_segment):
+    """Yields (kind, arguments) of every record in segments from ``first_segment`` on.
+
+    A damaged tail of the newest segment is truncated away; damage anywhere
+    else would silently drop acknowledged writes and raises WALError.
+    """
+    numbers = [number for number in segments(directory) if number >= first_segment]
+    for number in numbers:
+        path = os.path.join(directory, _SEGMENT.format(number))
+        records, intact = _read_segment(path)
+        if intact < os.path.getsize(path):
+            if number != numbers[-1]:
+                raise WALError(f"{path} is damaged at byte {intact}")
+            with open(path, "r+b") as segment:
+                segment.truncate(intact)
+                os.fsync(segment.fileno())
+        for kind, payload in records:
+            yield kind, decode(kind, payload)
+
+
+# --- Snapshots ---
+def write_snapshot(directory, segment, profiles, users):
+    """Writes the state preceding log segment ``segment`` as a snapshot.
+
+    ``users`` is a list of (user_id, exercise names, {category: columns}) where
+    columns are the CategoryLog.columns() views. Files are written under a
+    temporary name and renamed once fsynced, so a crash never leaves a partial
+    snapshot behind.
+    """
+    final = os.path.join(directory, _SNAPSHOT.format(segment))
+    temporary = final + ".tmp"
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.mkdir(temporary)
+    index, parts, start = [], {name: [] for name, _ in COLUMNS}, 0
+    for user_id, names, by_category in users:
+        slices = {}
+        for category, columns in by_category.items():
+            end = start + len(columns["timestamp"])
+            slices[category] = [start, end]
+            for name, _ in COLUMNS:
+                parts[name].append(columns[name])
+            start = end
+        index.append({"id": user_id, "names": names, "slices": slices})
+    for name, dtype in COLUMNS:
+        column = np.concatenate(parts[name]) if parts[name] else np.empty(0, dtype=dtype)
+        with open(os.path.join(temporary, f"{name}.npy"), "wb") as out:
+            np.save(out, column.astype(dtype, copy=False))
+            out.flush()
+            os.fsync(out.fileno())
+    with open(os.path.join(temporary, "index.json"), "w", encoding="utf-8") as out:
+        json.dump({"segment": segment, "profiles": profiles, "users": index}, out)
+        out.flush()
+        os.fsync(out.fileno())
+    _fsync_dir(temporary)
+    os.rename(temporary, final)
+    _fsync_dir(directory)
+
+
+def load_snapshot(directory):
+    """Returns (first segment to replay, index dict or None, {column: memory-mapped array})."""
+    numbers = _numbered(directory, "snapshot-")
+    if not numbers:
+        return 1, None, {}
+    path = os.path.join(directory, _SNAPSHOT.format(numbers[-1]))
+    with open(os.path.join(path, "index.json"), encoding="utf-8") as source:
+        index = json.load(source)
+    columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+               for name, _ in COLUMNS}
+    return numbers[-1], index, columns
+
+
+def prune(directory, segment):
+    """Deletes the segments and snapshots superseded by snapshot ``segment``."""
+    for number in segments(directory):
+        if number < segment:
+            os.remove(os.path.join(directory, _SEGMENT.format(number)))
+    for name in os.listdir(directory):
+        if name.startswith("snapshot-") and name != _SNAPSHOT.format(segment):
+            # Memory-mapped files of a loaded snapshot stay readable after unlinking
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+# --- Appending ---
+class WriteAheadLog:
+    """The append side of the log: one open segment, group-committed writes.
+
+    Only one process may append to a directory; opening it takes an exclusive
+    lock on ``LOCK``. Forked processes share that lock, so each must call
+    relock() before appending: the first one to do so holds it, the next fails.
+    """
+
+    def __init__(self, directory, sync=True):
+        self.directory = directory
+        self.sync = sync
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = None
+        self._lock()
+        self.segment = None
+        # Bytes appended to the open segment, for deciding when to snapshot
+        self.size = 0
+        self._file = None
+        self._cond = threading.Condition()
+        self._buffer = []
+        self._appended = 0
+        self._durable = 0
+        self._flushing = False
+        self._error = None
+
+    def _lock(self):
+        self._lock_file = open(os.path.join(self.directory, "LOCK"), "a+b")  # pylint: disable=consider-using-with
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError as err:
+            self._lock_file.close()
+            raise WALError(f"{self.directory} is in use by another process") from err
+
+    def relock(self):
+        """Takes the directory lock for this process alone, after a fork.
+
+        Releasing the inherited lock releases it for the parent (which must not
+        append any more) and every child that has not relocked yet.
+        """
+        fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+        self._lock_file.close()
+        self._lock()
+
+    def open(self, segment):
+        """Starts appending to segment number ``segment`` (created if missing)."""
+        with self._cond:
+            if self._file is not None:
+                self._file.close()
+            path = os.path.join(self.directory, _SEGMENT.format(segment))
+            self._file = open(path, "ab")  # pylint: disable=consider-using-with
+            _fsync_dir(self.directory)
+            self.segment = segment
+            self.size = self._file.tell()
+
+    def check(self):
+        """Raises WALError if a write has failed; the log then takes no more records."""
+        with self._cond:
+            if self._error is not None:
+                raise WALError("write-ahead log is unusable") from self._error
+
+    def append(self, record):
+        """Queues a record and returns its ticket for wait()."""
+        with self._cond:
+            self.check()
+            self._buffer.append(record)
+            self.size += len(record)
+            self._appended += 1
+            return self._appended
+
+    def wait(self, ticket):
+        """Returns once the record with ``ticket`` (and all before it) is on disk."""
+        with self._cond:
+            while self._durable < ticket and self._error is None:
+                if self._flushing:
+                    self._cond.wait()
+                    continue
+                # Nobody is writing: lead this batch, everything queued so far
+                self._flushing = True
+                data, self._buffer, upto = b"".join(self._buffer), [], self._appended
+                self._cond.release()
+                try:
+                    self._write(data)
+                except OSError as err:
+                    self._error = err
+                finally:
+                    self._cond.acquire()
+                    self._flushing = False
+                    self._durable = upto
+                    self._cond.notify_all()
+            if self._error is not None:
+                raise WALError("write-ahead log is unusable") from self._error
+
+    def _write(self, data):
+        self._file.write(data)
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+
+    def rotate(self):
+        """Flushes the open segment, starts the next one and returns its number."""
+        with self._cond:
+            while self._flushing:
+                self._cond.wait()
+            if self._buffer:
+                self._write(b"".join(self._buffer))
+                self._buffer = []
+                self._durable = self._appended
+                self._cond.notify_all()
+            self.open(self.segment + 1)
+            return self.segment
+
+    def close(self):
+        """Writes out anything queued, closes the segment and releases the directory."""
+        if self._error is None:
+            # After a failure there is nothing left to write; its writers were told
+            self.wait(self._appended)
+        with self._cond:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        self._lock_file.close()
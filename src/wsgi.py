@@ -0,0 +1,9 @@
+"""
+WSGI entry point for production serving.
+
+    gunicorn -c gunicorn.conf.py src.wsgi:application
+
+The app is built once on import; with ``preload_app`` gunicorn does that in the
+master and forks the workers from it (see gunicorn.conf.py).
+"""
+from src.app import APP as application  # pylint: disable=unused-import
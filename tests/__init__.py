@@ -0,0 +1,10 @@
+"""
+Test suite for the ACEest Fitness Tracker.
+
+The suites drive src.app.APP from one client address, so its per-client rate
+limits are switched off before it is built; tests/test_admission.py builds
+its own apps with them on.
+"""
+import os
+
+os.environ.setdefault("ACEEST_RATE_LIMITS", "off")
@@ -5,7 +5,11 @@
 Unit tests for the Flask-based ACEest Fitness Tracker application,
 refactored to be compliant with Pylint standards.
 """
+import re
+import subprocess
+import sys
 import unittest
+from datetime import datetime
 from unittest.mock import patch
 # The following imports are retained because they might be necessary for global
 # data structures or app logic defined in src.app, even if not explicitly
@@ -15,10 +19,11 @@ import json
 import pandas as pd
 # pylint: enable=unused-import
 
-# Import the Flask application and global data stores
+# Import the Flask application and its storage repository
 # Suppress import-error since src.app is assumed to exist in the user's structure.
 # pylint: disable=import-error
-from src.app import APP as app, user_info, workouts_log
+from src.app import APP as app, REPO, DEFAULT_USER_ID, CHART_SERVICE, create_app
+from src import charts
 # pylint: enable=import-error
 
 class FlaskFitnessTrackerTests(unittest.TestCase):
@@ -27,20 +32,26 @@ class FlaskFitnessTrackerTests(unittest.TestCase):
     """
 
     def setUp(self):
-        """Set up a test client and clear global data before each test."""
+        """Set up a test client and clear stored data before each test."""
         # Renamed self.app to self.app_client for snake_case compliance
         self.app_client = app.test_client()
         self.app_client.testing = True
-        # CRITICAL: Clear global data before every test for isolation
-        user_info.clear()
-        for category in workouts_log: # pylint: disable=consider-using-dict-items
-            workouts_log[category].clear()
+        # CRITICAL: Clear stored data before every test for isolation
+        REPO.clear()
+        # Draw charts in this process so the savefig mocks apply
+        workers = patch.object(CHART_SERVICE, "workers", 0)
+        workers.start()
+        self.addCleanup(workers.stop)
     def set_default_user_info(self):
         """Utility to populate necessary user info for calorie calculations."""
-        user_info.update({
+        # The test client has no session yet, so it acts as the default member
+        REPO.save_profile(DEFAULT_USER_ID, {
             "name": "Test User", "regn_id": "123", "age": 30, "gender": "M",
             "height": 180.0, "weight": 75.0, "bmi": "23.1", "bmr": "1738"
         })
+    def logged_sessions(self, category):
+        """Utility returning the sessions stored for the default member."""
+        return REPO.sessions(DEFAULT_USER_ID, category)
 
     def post_user_info(self, name="Test User", regn="123", age=30, gender="M", height=180, weight=75):
         """Utility for simulating user info submission."""
@@ -88,9 +99,9 @@ class FlaskFitnessTrackerTests(unittest.TestCase):
         # Check flash message for success and calculated metrics
         self.assertIn(b'User info saved!', response.data)
         self.assertIn(b'BMR: <strong>1576</strong> kcal/day', response.data)
-        # Check global store update
-        self.assertEqual(user_info['weight'], 80.0)
-        self.assertEqual(user_info['gender'], 'F')
+        # Check stored profile, keyed by regn_id
+        self.assertEqual(REPO.get_profile("123")['weight'], 80.0)
+        self.assertEqual(REPO.get_profile("123")['gender'], 'F')
     def test_post_user_info_invalid_input(self):
         """Tests handling of non-numeric input for metrics."""
         response = self.post_user_info(age="twenty")
@@ -99,12 +110,30 @@ class FlaskFitnessTrackerTests(unittest.TestCase):
             b'Invalid input. Age, Height, and Weight must be numbers.',
             response.data
         )
-        self.assertTrue(not user_info) # Should be empty
+        self.assertTrue(not REPO.get_profile("123")) # Should be empty
     def test_post_user_info_missing_field(self):
         """Tests handling of missing required fields."""
         response = self.post_user_info(name="")
         self.assertIn(b'Please fill in all user information fields.', response.data)
-        self.assertTrue(not user_info) # Should be empty
+        self.assertTrue(not REPO.get_profile("123")) # Should be empty
+    def test_saved_profile_is_used_for_later_workouts(self):
+        """Tests that saving info binds the session to that member's data."""
+        self.post_user_info(regn="M-42", weight=100)
+        self.post_workout(exercise="Rowing", duration=10, category="Workout")
+        # (6 * 3.5 * 100 / 200) * 10 = 105
+        self.assertAlmostEqual(REPO.sessions("M-42", "Workout")[0]["calories"], 105.0)
+        self.assertEqual(len(self.logged_sessions("Workout")), 0)
+    def test_members_do_not_see_each_other(self):
+        """Tests that two browsers with different members keep separate logs."""
+        other_client = app.test_client()
+        self.post_user_info(regn="A-1")
+        other_client.post('/', data={
+            'name': 'Other', 'regn_id': 'B-2', 'age': '40', 'gender': 'F',
+            'height': '160', 'weight': '60'
+        })
+        self.post_workout(duration=30)
+        response = other_client.get('/summary')
+        self.assertIn(b'Total Training Time Logged: <strong>0</strong> minutes', response.data)
 # ----------------------------------------------------------------------
 ## 2. Add Workout Tests (/add)
 # ----------------------------------------------------------------------
@@ -118,26 +147,28 @@ class FlaskFitnessTrackerTests(unittest.TestCase):
             b'Added **Pushups** (20 min) to Workout successfully!', 
             response.data
         )
-        # Check global data store
-        self.assertEqual(len(workouts_log["Workout"]), 1)
+        # Check stored sessions
+        self.assertEqual(len(self.logged_sessions("Workout")), 1)
     def test_add_workout_calorie_calculation(self):
         """Tests if calories are calculated (MET=6 for Workout, weight=75kg, duration=10min)."""
         self.set_default_user_info() # CRITICAL: Ensure user info exists
         # Expected: (6 * 3.5 * 75 / 200) * 10 = 78.75
         self.post_workout(exercise="Weights", duration=10, category="Workout")
-        self.assertAlmostEqual(workouts_log["Workout"][0]["calories"], 78.75, places=2)
+        self.assertAlmostEqual(self.logged_sessions("Workout")[0]["calories"], 78.75, places=2)
     def test_add_workout_missing_fields(self):
         """Tests submission without duration."""
         self.set_default_user_info() # Ensure info exists, but this should still fail validation
         response = self.post_workout(duration="", exercise="Run")
         self.assertIn(b'Please enter both exercise and duration.', response.data)
-        self.assertEqual(len(workouts_log["Warm-up"]), 0)
+        self.assertEqual(len(self.logged_sessions("Warm-up")), 0)
     def test_add_workout_invalid_duration(self):
         """Tests submission with non-positive duration."""
         self.set_default_user_info() # Ensure user info exists
         response_zero = self.post_workout(duration=0)
         self.assertIn(b'Duration must be a positive whole number.', response_zero.data)
-        self.assertEqual(len(workouts_log["Workout"]), 0)
+        response_huge = self.post_workout(duration=99999999999999999999999)
+        self.assertIn(b'Duration must be at most 1440 minutes.', response_huge.data)
+        self.assertEqual(len(self.logged_sessions("Workout")), 0)
 # ----------------------------------------------------------------------
 ## 3. Summary Tests (/summary)
 # ----------------------------------------------------------------------
@@ -175,6 +206,51 @@ class FlaskFitnessTrackerTests(unittest.TestCase):
         response_high = self.app_client.get('/summary')
         self.assertIn(b'alert-success', response_high.data)
         self.assertIn(b'Excellent dedication!', response_high.data)
+    def test_summary_lists_only_last_seven_days(self):
+        """Tests that old sessions count toward totals but are not listed."""
+        self.set_default_user_info()
+        REPO.add_workout(
+            DEFAULT_USER_ID, "Workout", "Rowing", 40, 200.0, datetime(2020, 1, 1, 8, 0, 0)
+        )
+        self.post_workout(exercise="Cycling", duration=25, category="Workout")
+        response = self.app_client.get('/summary')
+        self.assertIn(b'Total Training Time Logged: <strong>65</strong> minutes', response.data)
+        self.assertIn(b'Last 7 days: <strong>25</strong> minutes', response.data)
+        self.assertIn(b'<strong>Cycling</strong> - 25 min', response.data)
+        self.assertNotIn(b'Rowing', response.data)
+    def test_summary_pages_with_cursor(self):
+        """Tests that the week is listed a page at a time, newest first."""
+        self.set_default_user_info()
+        for minutes in range(1, 26):
+            REPO.add_workout(DEFAULT_USER_ID, "Workout", f"Set{minutes}", minutes, 1.0,
+                             datetime.now().replace(microsecond=0, second=minutes % 60))
+        response = self.app_client.get('/summary')
+        self.assertIn(b'Last 7 days: <strong>325</strong> minutes over <strong>25</strong>', response.data)
+        self.assertIn(b'<strong>Set25</strong>', response.data)
+        self.assertNotIn(b'<strong>Set5</strong>', response.data)
+        self.assertIn(b'Older Workout sessions', response.data)
+        older = re.search(rb'href="(/summary\?[^"]*cursor=[^"]*)"', response.data).group(1)
+        page_two = self.app_client.get(older.decode().replace('&amp;', '&'))
+        self.assertIn(b'<strong>Set5</strong>', page_two.data)
+        self.assertNotIn(b'<strong>Set25</strong>', page_two.data)
+        self.assertNotIn(b'Older Workout sessions', page_two.data)
+    def test_summary_date_range_filter(self):
+        """Tests listing an older date range with totals from the aggregates."""
+        self.set_default_user_info()
+        REPO.add_workout(
+            DEFAULT_USER_ID, "Workout", "Rowing", 40, 200.0, datetime(2020, 1, 1, 8, 0, 0)
+        )
+        self.post_workout(exercise="Cycling", duration=25, category="Workout")
+        response = self.app_client.get('/summary?start=2020-01-01&end=2020-01-31')
+        self.assertIn(b'2020-01-01 to 2020-01-31: <strong>40</strong> minutes', response.data)
+        self.assertIn(b'<strong>Rowing</strong>', response.data)
+        self.assertNotIn(b'<strong>Cycling</strong>', response.data)
+        self.assertIn(b'Total Training Time Logged: <strong>65</strong> minutes', response.data)
+        # An end date alone shows the week ending then
+        response = self.app_client.get('/summary?end=2020-01-03')
+        self.assertIn(b'2019-12-28 to 2020-01-03: <strong>40</strong> minutes', response.data)
+        bad = self.app_client.get('/summary?start=2020-02-01&end=2020-01-01', follow_redirects=True)
+        self.assertIn(b'The start date must not be after the end date.', bad.data)
 # ----------------------------------------------------------------------
 ## 4. Progress Tracker Tests (/progress)
 # ----------------------------------------------------------------------
@@ -185,12 +261,90 @@ class FlaskFitnessTrackerTests(unittest.TestCase):
         self.assertIn(b'No workout data logged yet.', response.data)
     @patch('matplotlib.figure.Figure.savefig')
     def test_progress_tracker_with_data_generates_chart(self, mock_savefig):
-        """Tests that a chart image is generated and embedded."""
+        """Tests that the page links the chart and /progress.png renders it."""
         self.set_default_user_info() # CRITICAL: Ensure user info exists
         self.post_workout(duration=10, category="Warm-up")
         self.post_workout(duration=50, category="Workout")
         mock_savefig.side_effect = lambda fp, format: fp.write(b"dummy_chart_data")
         response = self.app_client.get('/progress')
         self.assertEqual(response.status_code, 200)
+        self.assertIn(b'/progress.png?v=', response.data)
+        self.assertNotIn(b'data:image/png;base64', response.data)
+        chart = self.app_client.get('/progress.png')
+        self.assertEqual(chart.status_code, 200)
+        self.assertEqual(chart.mimetype, 'image/png')
+        self.assertEqual(chart.data, b"dummy_chart_data")
         mock_savefig.assert_called_once()
-        self.assertIn(b'data:image/png;base64', response.data)
+    @patch('matplotlib.figure.Figure.savefig')
+    def test_progress_chart_is_cached_until_new_workout(self, mock_savefig):
+        """Tests that repeat chart views reuse the render until a workout is logged."""
+        self.set_default_user_info()
+        self.post_workout(duration=20, category="Workout")
+        mock_savefig.side_effect = lambda fp, format: fp.write(b"chart")
+        self.app_client.get('/progress.png')
+        self.app_client.get('/progress.png')
+        self.assertEqual(mock_savefig.call_count, 1)
+        self.post_workout(duration=5, category="Cool-down")
+        self.app_client.get('/progress.png')
+        self.assertEqual(mock_savefig.call_count, 2)
+    @patch('matplotlib.figure.Figure.savefig')
+    def test_progress_chart_conditional_get(self, mock_savefig):
+        """Tests ETag and Last-Modified revalidation of the chart."""
+        self.set_default_user_info()
+        self.post_workout(duration=20, category="Workout")
+        mock_savefig.side_effect = lambda fp, format: fp.write(b"chart")
+        first = self.app_client.get('/progress.png')
+        self.assertIsNotNone(first.headers.get('ETag'))
+        self.assertIsNotNone(first.headers.get('Last-Modified'))
+        by_etag = self.app_client.get(
+            '/progress.png', headers={'If-None-Match': first.headers['ETag']}
+        )
+        self.assertEqual(by_etag.status_code, 304)
+        by_date = self.app_client.get(
+            '/progress.png', headers={'If-Modified-Since': first.headers['Last-Modified']}
+        )
+        self.assertEqual(by_date.status_code, 304)
+    @patch('matplotlib.figure.Figure.savefig')
+    def test_progress_falls_back_when_renderer_is_busy(self, mock_savefig):
+        """Tests the chart-less page and the 503 when the renderer is saturated."""
+        self.set_default_user_info()
+        self.post_workout(duration=20, category="Workout")
+        with patch.object(CHART_SERVICE, "saturated", return_value=True), \
+                patch.object(CHART_SERVICE, "render",
+                             side_effect=charts.ChartUnavailable("busy")):
+            page = self.app_client.get('/progress')
+            chart = self.app_client.get('/progress.png')
+        self.assertNotIn(b'/progress.png', page.data)
+        self.assertIn(b'The chart is busy right now', page.data)
+        self.assertIn(b'<strong>20</strong> minutes logged', page.data)
+        self.assertEqual(chart.status_code, 503)
+        self.assertEqual(chart.headers['Retry-After'], '2')
+        mock_savefig.assert_not_called()
+    def test_progress_chart_no_data(self):
+        """Tests that there is no chart to serve before any workout is logged."""
+        response = self.app_client.get('/progress.png')
+        self.assertEqual(response.status_code, 404)
+    def test_ready_reports_chart_warmup(self):
+        """Tests that the readiness probe answers and reports the charting state."""
+        response = self.app_client.get('/ready')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["status"], "ready")
+        self.assertIn(response.json["charts"], ("cold", "warming", "warm"))
+        charts.load()
+        self.assertEqual(self.app_client.get('/ready').json["charts"], "warm")
+    def test_app_import_does_not_load_plotting_modules(self):
+        """Tests that importing the app leaves matplotlib and pandas unloaded."""
+        code = ("import sys, src.app; "
+                "print(any(m in sys.modules for m in ('matplotlib', 'pandas')))")
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True,
+                                text=True, check=True).stdout
+        self.assertEqual(output.strip(), "False")
+    def test_create_app_builds_independent_app(self):
+        """Tests that the factory builds an app with its own store and the same routes."""
+        other = create_app({"CHART_WORKERS": 0, "TESTING": True})
+        self.assertFalse(other.debug)
+        self.assertEqual({rule.endpoint for rule in other.url_map.iter_rules()},
+                         {rule.endpoint for rule in app.url_map.iter_rules()})
+        other.test_client().post('/add', data={'category': 'Workout', 'exercise': 'Run', 'duration': '30'})
+        self.assertEqual(len(other.extensions["repository"].workouts(DEFAULT_USER_ID)["Workout"]), 1)
+        self.assertEqual(len(REPO.workouts(DEFAULT_USER_ID)["Workout"]), 0)
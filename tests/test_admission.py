@@ -0,0 +1,146 @@
+"""
+Unit tests for admission control: rate limits, the chart render cap and entry limits.
+"""
+import unittest
+
+# pylint: disable=import-error
+from src import admission
+from src.app import DEFAULT_USER_ID, create_app
+# pylint: enable=import-error
+
+
+class RateLimiterTests(unittest.TestCase):
+    """Tests for the per-client token buckets."""
+
+    def test_burst_then_refill(self):
+        """Tests that a client gets ``burst`` requests, then one per 1/rate seconds."""
+        limiter = admission.RateLimiter(rate=2.0, burst=3)
+        self.assertEqual([limiter.acquire("a", now=10.0) for _ in range(3)], [0.0] * 3)
+        self.assertAlmostEqual(limiter.acquire("a", now=10.0), 0.5)
+        self.assertAlmostEqual(limiter.acquire("a", now=10.25), 0.25)
+        self.assertEqual(limiter.acquire("a", now=10.5), 0.0)
+        # Idle time refills up to the burst, never beyond it
+        self.assertEqual([limiter.acquire("a", now=100.0) for _ in range(3)], [0.0] * 3)
+        self.assertGreater(limiter.acquire("a", now=100.0), 0)
+
+    def test_clients_are_independent(self):
+        """Tests that one client running dry does not affect another."""
+        limiter = admission.RateLimiter(rate=1.0, burst=1)
+        limiter.acquire("a", now=0.0)
+        self.assertGreater(limiter.acquire("a", now=0.0), 0)
+        self.assertEqual(limiter.acquire("b", now=0.0), 0.0)
+
+    def test_tracked_clients_stay_bounded(self):
+        """Tests that idle clients are forgotten and the table never passes its limit."""
+        limiter = admission.RateLimiter(rate=1.0, burst=2, max_clients=100)
+        for i in range(1000):
+            limiter.acquire(f"10.0.{i // 256}.{i % 256}", now=float(i) / 1000)
+        self.assertLessEqual(len(limiter), 100)
+        # A client seen long ago has a full bucket again anyway
+        limiter.acquire("late", now=50.0)
+        self.assertLessEqual(len(limiter), 100)
+
+    def test_parse_rules(self):
+        """Tests overriding, adding and dropping rules from the setting."""
+        rules = admission.parse_rules("progress_tracker=0.5/4, diet_guide=10/20,summary=off")
+        self.assertEqual(rules["progress_tracker"], (0.5, 4))
+        self.assertEqual(rules["diet_guide"], (10.0, 20))
+        self.assertNotIn("summary", rules)
+        self.assertEqual(rules["add_workout"], admission.DEFAULT_RULES["add_workout"])
+        self.assertEqual(admission.parse_rules("off"), {})
+        self.assertEqual(admission.parse_rules(""), admission.DEFAULT_RULES)
+        for bad in ("summary", "summary=1", "summary=x/2", "summary=0/5", "summary=1/0"):
+            with self.assertRaises(ValueError):
+                admission.parse_rules(bad)
+
+    def test_slots(self):
+        """Tests that slots turn callers away when full and 0 means no cap."""
+        slots = admission.Slots(2)
+        self.assertTrue(slots.acquire() and slots.acquire())
+        self.assertFalse(slots.acquire())
+        self.assertFalse(slots.available())
+        slots.release()
+        self.assertTrue(slots.available())
+        unlimited = admission.Slots(0)
+        self.assertTrue(all(unlimited.acquire() for _ in range(100)))
+
+
+class AdmissionRouteTests(unittest.TestCase):
+    """Tests for the limits as applied to the app's routes."""
+
+    def setUp(self):
+        # The default rules, whatever ACEEST_RATE_LIMITS the rest of the suite runs with
+        self.app = create_app({"RATE_LIMITS": "", "CHART_WORKERS": 0})
+        self.client = self.app.test_client()
+
+    def get(self, path, client_address):
+        """GETs ``path`` as the client at ``client_address``."""
+        return self.client.get(path, environ_base={"REMOTE_ADDR": client_address})
+
+    def test_flooding_one_route_gets_429_while_others_answer(self):
+        """Tests that a client out of /progress tokens is told when to retry."""
+        burst = admission.DEFAULT_RULES["progress_tracker"][1]
+        statuses = [self.get('/progress', '198.51.100.1').status_code for _ in range(burst + 3)]
+        self.assertEqual(statuses[:burst], [200] * burst)
+        self.assertEqual(statuses[burst:], [429] * 3)
+        limited = self.get('/progress', '198.51.100.1')
+        self.assertGreaterEqual(int(limited.headers["Retry-After"]), 1)
+        # Another client, and another route for the same client, are unaffected
+        self.assertEqual(self.get('/progress', '198.51.100.2').status_code, 200)
+        self.assertEqual(self.get('/summary', '198.51.100.1').status_code, 200)
+        self.assertEqual(self.get('/plan', '198.51.100.1').status_code, 200)
+
+    def test_api_rate_limit_answers_json(self):
+        """Tests the API's 429 body."""
+        burst = admission.DEFAULT_RULES["api_v1.get_trends"][1]
+        path = f'/api/v1/users/{DEFAULT_USER_ID}/trends'
+        for _ in range(burst):
+            self.get(path, '198.51.100.3')
+        response = self.get(path, '198.51.100.3')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("error", response.json)
+
+    def test_chart_renders_beyond_the_cap_get_503(self):
+        """Tests that chart misses are shed while every render slot is taken."""
+        self.client.post('/add', data={'category': 'Workout', 'exercise': 'Run',
+                                       'duration': '30'},
+                         environ_base={"REMOTE_ADDR": "198.51.100.4"})
+        slots = self.app.extensions["admission"].chart_slots
+        taken = 0
+        while slots.acquire():
+            taken += 1
+        try:
+            response = self.get('/progress.png', '198.51.100.4')
+            self.assertEqual(response.status_code, 503)
+            self.assertIn("Retry-After", response.headers)
+            # The page leaves the chart out instead of linking one that would be shed
+            page = self.get('/progress', '198.51.100.4')
+            self.assertNotIn(b'progress.png', page.data)
+            self.assertIn(b'chart is busy', page.data)
+        finally:
+            for _ in range(taken):
+                slots.release()
+
+    def test_entry_limit_per_category(self):
+        """Tests that a full category refuses /add, API and import sessions."""
+        self.app.config['MAX_ENTRIES_PER_CATEGORY'] = 2
+        for _ in range(2):
+            self.client.post('/add', data={'category': 'Workout', 'exercise': 'Run',
+                                           'duration': '10'})
+        response = self.client.post('/add', data={'category': 'Workout', 'exercise': 'Run',
+                                                  'duration': '10'}, follow_redirects=True)
+        self.assertIn(b'limit of 2 Workout sessions', response.data)
+        api = self.client.post(f'/api/v1/users/{DEFAULT_USER_ID}/workouts',
+                               json={'category': 'Workout', 'exercise': 'Run', 'duration': 10})
+        self.assertEqual(api.status_code, 409)
+        report = self.client.post(
+            '/workouts/import', content_type='text/csv',
+            data='category,exercise,duration\nWorkout,Run,10\nWarm-up,Jog,5\n'
+                 'Warm-up,Jog,5\nWarm-up,Jog,5\n').json
+        self.assertEqual((report["imported"], report["rejected"]), (2, 2))
+        totals = self.app.extensions["repository"].totals(DEFAULT_USER_ID)
+        self.assertEqual((totals['Workout']['sessions'], totals['Warm-up']['sessions']), (2, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+"""
+Unit tests for the trend analytics built on the repositories' aggregates.
+"""
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+# pylint: disable=import-error
+from src import analytics
+from src.charts import ChartCache
+from src.repository import InMemoryRepository
+from src.app import APP as app, REPO, DEFAULT_USER_ID
+# pylint: enable=import-error
+
+CATEGORIES = ["Warm-up", "Workout", "Cool-down"]
+# A Wednesday
+NOW = datetime(2024, 5, 15, 18, 0, 0)
+
+
+class TrendsTests(unittest.TestCase):
+    """Tests for trends() over a small, hand-checked history."""
+
+    def setUp(self):
+        self.repo = InMemoryRepository(CATEGORIES)
+
+    def log(self, days_ago, minutes, category="Workout", exercise="Run", calories=None):
+        """Logs one session ``days_ago`` days before NOW."""
+        self.repo.add_workout("A", category, exercise, minutes,
+                              calories if calories is not None else minutes * 10.0,
+                              NOW - timedelta(days=days_ago))
+
+    def test_daily_series_and_rolling_averages(self):
+        """Tests that per-day totals and trailing means line up with the dates."""
+        self.log(0, 30)
+        self.log(0, 10, category="Warm-up", exercise="Jog")
+        self.log(6, 14)
+        self.log(40, 60)  # only inside the 28-day look-back of the first shown day
+        report = analytics.trends(self.repo, "A", now=NOW)
+        daily = report["daily"]
+        self.assertEqual(len(daily["dates"]), analytics.DAILY_DAYS)
+        self.assertEqual(daily["dates"][-1], "2024-05-15")
+        self.assertEqual(daily["minutes"][-1], 40)
+        self.assertEqual(daily["sessions"][-1], 2)
+        self.assertEqual(daily["minutes"][-7], 14)
+        self.assertEqual(daily["minutes_by_category"]["Warm-up"][-1], 10)
+        self.assertEqual(sum(daily["minutes"]), 54)
+        rolling = report["rolling"]
+        self.assertAlmostEqual(rolling["minutes_7d"][-1], 54 / 7, places=2)
+        self.assertAlmostEqual(rolling["minutes_7d"][-2], 14 / 7, places=2)
+        self.assertAlmostEqual(rolling["minutes_28d"][-1], 54 / 28, places=2)
+        self.assertAlmostEqual(rolling["calories_7d"][-1], 540 / 7, places=2)
+        # The session 40 days ago is still inside the first day's 28-day window
+        self.assertAlmostEqual(rolling["minutes_28d"][0], 60 / 28, places=2)
+
+    def test_weekly_series_starts_on_monday(self):
+        """Tests that weeks are Monday-based and end with the current one."""
+        self.log(2, 20)   # Monday of this week
+        self.log(3, 25)   # Sunday of last week
+        report = analytics.trends(self.repo, "A", now=NOW)
+        weekly = report["weekly"]
+        self.assertEqual(len(weekly["weeks"]), analytics.WEEKLY_WEEKS)
+        self.assertEqual(weekly["weeks"][-1], "2024-05-13")
+        self.assertEqual(weekly["minutes"][-2:], [25, 20])
+        self.assertEqual(weekly["sessions"][-2:], [1, 1])
+
+    def test_streaks(self):
+        """Tests current and longest runs of consecutive active days."""
+        for days_ago in (1, 2, 3, 10, 11, 12, 13, 14):
+            self.log(days_ago, 5)
+        streaks = analytics.trends(self.repo, "A", now=NOW)["streaks"]
+        # Nothing today yet, but yesterday keeps the streak alive
+        self.assertEqual(streaks["current"], 3)
+        self.assertEqual(streaks["longest"], 5)
+        self.assertEqual((streaks["longest_start"], streaks["longest_end"]),
+                         ("2024-05-01", "2024-05-05"))
+        self.assertEqual(streaks["active_days"], 8)
+        later = analytics.trends(self.repo, "A", now=NOW + timedelta(days=2))["streaks"]
+        self.assertEqual(later["current"], 0)
+
+    def test_no_history(self):
+        """Tests the empty report."""
+        report = analytics.trends(self.repo, "A", now=NOW)
+        self.assertEqual(report["streaks"]["longest"], 0)
+        self.assertEqual(report["exercises"], [])
+        self.assertEqual(sum(report["weekly"]["minutes"]), 0)
+
+    def test_exercise_breakdown(self):
+        """Tests per-exercise totals across single and bulk appends."""
+        self.log(0, 30, exercise="Run")
+        self.log(1, 10, exercise="Run")
+        self.repo.add_workouts("A", {
+            "category": ["Workout", "Cool-down"], "exercise": ["Row", "Stretch"],
+            "duration": [50, 20], "calories": [400.0, 40.0],
+            "timestamp": [1715700000, 1715700000],
+        })
+        rows = analytics.trends(self.repo, "A", now=NOW)["exercises"]
+        self.assertEqual([(r["exercise"], r["minutes"], r["sessions"]) for r in rows],
+                         [("Row", 50, 1), ("Run", 40, 2), ("Stretch", 20, 1)])
+        self.assertAlmostEqual(rows[0]["minutes_pct"], 50 / 110 * 100)
+
+    def test_cache_reused_until_data_or_day_changes(self):
+        """Tests that reports are recomputed only after an append or at midnight."""
+        cache = ChartCache()
+        self.log(0, 30)
+        with patch.object(analytics, "trends", wraps=analytics.trends) as compute:
+            first = analytics.cached_trends(self.repo, cache, "A", now=NOW)
+            self.assertIs(analytics.cached_trends(self.repo, cache, "A", now=NOW), first)
+            self.log(0, 5)
+            updated = analytics.cached_trends(self.repo, cache, "A", now=NOW)
+            analytics.cached_trends(self.repo, cache, "A", now=NOW + timedelta(days=1))
+        self.assertEqual(compute.call_count, 3)
+        self.assertEqual(updated["daily"]["minutes"][-1], 35)
+
+
+class TrendRoutesTests(unittest.TestCase):
+    """Tests for the trend report on /progress and in the API."""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        REPO.clear()
+
+    def test_progress_page_and_api_show_trends(self):
+        """Tests that logged sessions appear in the streaks, averages and exercises."""
+        self.client.post('/add', data={'category': 'Workout', 'exercise': 'Squat',
+                                       'duration': '35'})
+        page = self.client.get('/progress')
+        self.assertIn(b'Current streak', page.data)
+        self.assertIn(b'Squat', page.data)
+        report = self.client.get(f'/api/v1/users/{DEFAULT_USER_ID}/trends').json
+        self.assertEqual(report["streaks"]["current"], 1)
+        self.assertEqual(report["daily"]["minutes"][-1], 35)
+        self.assertEqual(report["exercises"][0]["exercise"], "Squat")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+Tests for the member endpoints of the versioned JSON API.
+"""
+import unittest
+from unittest.mock import patch
+
+# pylint: disable=import-error
+from src.app import APP as app, REPO
+# pylint: enable=import-error
+
+PROFILE = {"name": "Alex", "age": 30, "gender": "m", "height": 175, "weight": 70}
+
+
+class UserApiTests(unittest.TestCase):
+    """Tests for /api/v1/users/<regn_id>/..."""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        REPO.clear()
+
+    def test_put_creates_then_replaces_profile(self):
+        """Tests 201 on creation, 200 on replacement and the computed BMI/BMR."""
+        response = self.client.put('/api/v1/users/A1', json=PROFILE)
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.headers["Location"].endswith('/api/v1/users/A1'))
+        self.assertEqual(response.json["bmi"], "22.9")
+        self.assertEqual(response.json["gender"], "M")
+        response = self.client.put('/api/v1/users/A1', json=dict(PROFILE, weight=80))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/v1/users/A1').json["weight"], 80.0)
+
+    def test_profile_validation_matches_form(self):
+        """Tests that invalid profiles get the same messages as the HTML form."""
+        response = self.client.put('/api/v1/users/A1', json=dict(PROFILE, gender="X"))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json, {"error": "Gender must be 'M' or 'F'."})
+        response = self.client.put('/api/v1/users/A1', json=dict(PROFILE, age="abc"))
+        self.assertIn("must be numbers", response.json["error"])
+        for field, value in (("name", ["a"]), ("gender", ["M"]), ("name", 5)):
+            response = self.client.put('/api/v1/users/A1', json=dict(PROFILE, **{field: value}))
+            self.assertEqual(response.json,
+                             {"error": "Please fill in all user information fields."})
+        self.assertEqual(self.client.get('/api/v1/users/A1').status_code, 404)
+
+    def test_log_and_list_workouts(self):
+        """Tests logging a session (201) and reading it back with filters."""
+        self.client.put('/api/v1/users/A1', json=PROFILE)
+        response = self.client.post('/api/v1/users/A1/workouts', json={
+            "category": "Workout", "exercise": "Run", "duration": 30})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json["exercise"], "Run")
+        self.assertAlmostEqual(response.json["calories"], 220.5)
+        self.assertIn("category=Workout", response.headers["Location"])
+        listing = self.client.get('/api/v1/users/A1/workouts?category=Workout').json
+        self.assertEqual([s["exercise"] for s in listing["workouts"]["Workout"]], ["Run"])
+        self.assertEqual(self.client.get(
+            '/api/v1/users/A1/workouts?since=2999-01-01').json["workouts"]["Workout"], [])
+        self.assertEqual(self.client.get(
+            '/api/v1/users/A1/workouts?since=yesterday').status_code, 400)
+
+    def test_list_workouts_pages(self):
+        """Tests that the listing pages with cursor/limit instead of returning everything."""
+        for exercise in ("Run", "Row", "Swim"):
+            self.client.post('/api/v1/users/A1/workouts', json={
+                "category": "Workout", "exercise": exercise, "duration": 10})
+        first = self.client.get('/api/v1/users/A1/workouts?category=Workout&limit=2').json
+        self.assertEqual([s["exercise"] for s in first["workouts"]["Workout"]], ["Swim", "Row"])
+        rest = self.client.get('/api/v1/users/A1/workouts?category=Workout&limit=2'
+                               f'&cursor={first["next"]["Workout"]}').json
+        self.assertEqual([s["exercise"] for s in rest["workouts"]["Workout"]], ["Run"])
+        self.assertIsNone(rest["next"]["Workout"])
+        for query in ("limit=1000", "cursor=abc&category=Workout", "cursor=abc"):
+            self.assertEqual(self.client.get(
+                f'/api/v1/users/A1/workouts?{query}').status_code, 400)
+
+    def test_invalid_workout(self):
+        """Tests that invalid sessions are rejected and nothing is stored."""
+        response = self.client.post('/api/v1/users/A1/workouts', json={
+            "category": "Workout", "exercise": "Run", "duration": -5})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json["error"], "Duration must be a positive whole number.")
+        response = self.client.post('/api/v1/users/A1/workouts', json={
+            "category": "Workout", "exercise": "Run", "duration": 10**30})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json["error"], "Duration must be at most 1440 minutes.")
+        for field, value in (("exercise", 5), ("category", ["Workout"])):
+            response = self.client.post('/api/v1/users/A1/workouts', json=dict(
+                {"category": "Workout", "exercise": "Run", "duration": 10}, **{field: value}))
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(response.json["error"], ("Please enter both exercise and duration.",
+                                                   "Invalid workout category selected."))
+        response = self.client.post('/api/v1/users/A1/workouts', data="nope")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(REPO.totals("A1")["Workout"]["sessions"], 0)
+
+    @patch('matplotlib.figure.Figure.savefig')
+    def test_summary_and_progress_without_rendering(self, mock_savefig):
+        """Tests the summary and progress payloads and that no chart is drawn."""
+        for category, duration in (("Workout", 45), ("Warm-up", 15)):
+            self.client.post('/api/v1/users/A1/workouts', json={
+                "category": category, "exercise": "X", "duration": duration})
+        summary = self.client.get('/api/v1/users/A1/summary').json
+        self.assertEqual(summary["total_minutes"], 60)
+        self.assertEqual(summary["range"]["sessions"], 2)
+        self.assertEqual(len(summary["sessions"]["Workout"]), 1)
+        self.assertEqual(summary["motivation"], "Excellent dedication! Keep up the great work.")
+        response = self.client.get(
+            '/api/v1/users/A1/summary?category=Workout&cursor=99999999999999999999999.0')
+        self.assertEqual((response.status_code, response.json),
+                         (400, {"error": "Invalid cursor."}))
+        progress = self.client.get('/api/v1/users/A1/progress').json
+        self.assertEqual(progress["minutes"], [15, 45, 0])
+        self.assertEqual(progress["distribution_pct"], [25.0, 75.0, 0.0])
+        mock_savefig.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+"""
+Unit tests for bulk workout import and export.
+"""
+import io
+import json
+import unittest
+from unittest.mock import patch
+
+# pylint: disable=import-error
+from src import bulk
+from src.app import APP as app, REPO, DEFAULT_USER_ID
+from src.fitness import calculate_calories
+# pylint: enable=import-error
+
+CSV_BODY = (
+    "category,exercise,duration,timestamp\n"
+    "Workout,Squats,30,2024-01-02 07:30:00\n"
+    "Warm-up,Jog,10,2024-01-01 07:00:00\n"
+    "Workout,Bench,abc,2024-01-03 07:00:00\n"
+    "Stretching,Yoga,20,\n"
+)
+
+
+class BulkImportExportTests(unittest.TestCase):
+    """Tests for /workouts/import and /workouts/export."""
+
+    def setUp(self):
+        self.app_client = app.test_client()
+        REPO.clear()
+        REPO.save_profile(DEFAULT_USER_ID, {"weight": 80.0})
+
+    def post_import(self, body, content_type):
+        """Posts a raw import body."""
+        return self.app_client.post(
+            '/workouts/import', data=body, headers={"Content-Type": content_type}
+        )
+
+    def test_csv_import_validates_rows(self):
+        """Tests that valid rows are stored and invalid ones reported by line."""
+        response = self.post_import(CSV_BODY, "text/csv")
+        self.assertEqual(response.status_code, 200)
+        report = response.get_json()
+        self.assertEqual(report["imported"], 2)
+        self.assertEqual(report["rejected"], 2)
+        self.assertEqual(report["errors"][0],
+                         {"line": 4, "error": "Duration must be a positive whole number."})
+        self.assertEqual(report["errors"][1]["error"], "Invalid workout category selected.")
+        workouts = REPO.sessions(DEFAULT_USER_ID, "Workout")
+        self.assertEqual(workouts[0]["timestamp"], "2024-01-02 07:30:00")
+        self.assertAlmostEqual(workouts[0]["calories"], calculate_calories("Workout", 30, 80.0))
+
+    def test_ndjson_import(self):
+        """Tests NDJSON bodies, including malformed lines."""
+        body = "\n".join([
+            json.dumps({"category": "Cool-down", "exercise": "Walk", "duration": 15}),
+            "{not json",
+            json.dumps({"category": "Workout", "exercise": "", "duration": 15}),
+        ])
+        report = self.post_import(body, "application/x-ndjson").get_json()
+        self.assertEqual(report["imported"], 1)
+        self.assertEqual([e["line"] for e in report["errors"]], [2, 3])
+        self.assertEqual(REPO.totals(DEFAULT_USER_ID)["Cool-down"]["minutes"], 15)
+
+    def test_non_text_fields_are_rejected_rows(self):
+        """Tests that NDJSON values of the wrong type are reported, not a server error."""
+        body = "\n".join([
+            json.dumps({"category": "Workout", "exercise": 5, "duration": 15}),
+            json.dumps({"category": ["Workout"], "exercise": "Run", "duration": 15}),
+            json.dumps({"category": "Workout", "exercise": "Run", "duration": 15}),
+        ])
+        response = self.post_import(body, "application/x-ndjson")
+        self.assertEqual(response.status_code, 200)
+        report = response.get_json()
+        self.assertEqual((report["imported"], report["rejected"]), (1, 2))
+        self.assertEqual([e["error"] for e in report["errors"]],
+                         ["Please enter both exercise and duration.",
+                          "Invalid workout category selected."])
+
+    def test_oversized_duration_is_a_rejected_row(self):
+        """Tests that durations beyond a day are rejected in CSV and NDJSON imports."""
+        csv_body = "category,exercise,duration\nWorkout,Run,99999999999999999999999\n"
+        ndjson_body = json.dumps({"category": "Workout", "exercise": "Run", "duration": 10**30})
+        for body, content_type in ((csv_body, "text/csv"), (ndjson_body, "application/x-ndjson")):
+            response = self.post_import(body, content_type)
+            self.assertEqual(response.status_code, 200)
+            report = response.get_json()
+            self.assertEqual((report["imported"], report["rejected"]), (0, 1))
+            self.assertEqual(report["errors"][0]["error"], "Duration must be at most 1440 minutes.")
+        self.assertEqual(REPO.totals(DEFAULT_USER_ID)["Workout"]["sessions"], 0)
+
+    def test_undecodable_csv_stops_with_a_report(self):
+        """Tests that a body that is not UTF-8 answers 400 with the rows already written."""
+        body = b"category,exercise,duration\nWorkout,Run,5\nWorkout,R\xffn,5\n"
+        response = self.post_import(body, "text/csv")
+        self.assertEqual(response.status_code, 400)
+        report = response.get_json()
+        self.assertIn("UTF-8", report["error"])
+        self.assertEqual(report["imported"], REPO.totals(DEFAULT_USER_ID)["Workout"]["sessions"])
+
+    def test_unsupported_content_type(self):
+        """Tests that non CSV/NDJSON bodies are refused."""
+        self.assertEqual(self.post_import("{}", "application/xml").status_code, 415)
+
+    def test_import_writes_in_chunks(self):
+        """Tests that rows are appended chunk by chunk rather than all at once."""
+        body = "category,exercise,duration\n" + "Workout,Run,5\n" * 25
+        with patch.object(REPO, "add_workouts", wraps=REPO.add_workouts) as add_workouts:
+            report = bulk.import_workouts(REPO, "chunky", io.BytesIO(body.encode()), "csv",
+                                          70.0, chunk_size=10)
+        self.assertEqual(report["imported"], 25)
+        self.assertEqual([len(call.args[1]["timestamp"]) for call in add_workouts.call_args_list],
+                         [10, 10, 5])
+        self.assertEqual(REPO.totals("chunky")["Workout"]["sessions"], 25)
+
+    def test_export_round_trip(self):
+        """Tests that a CSV export re-imports to the same totals."""
+        self.post_import(CSV_BODY, "text/csv")
+        response = self.app_client.get('/workouts/export')
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.mimetype, "text/csv")
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(lines[0], "category,exercise,duration,calories,timestamp")
+        self.assertTrue(lines[1].startswith("Warm-up,Jog,10,"))
+        report = bulk.import_workouts(REPO, "copy", io.BytesIO(response.data), "csv", 80.0)
+        self.assertEqual(report["imported"], 2)
+        self.assertEqual(REPO.totals("copy"), REPO.totals(DEFAULT_USER_ID))
+
+    def test_ndjson_export(self):
+        """Tests the NDJSON export format."""
+        self.post_import(CSV_BODY, "text/csv")
+        response = self.app_client.get('/workouts/export?format=ndjson')
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([row["exercise"] for row in rows], ["Jog", "Squats"])
+        self.assertEqual(self.app_client.get('/workouts/export?format=xml').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Unit tests for the chart rendering service.
+"""
+import threading
+import unittest
+from concurrent.futures import Future
+from unittest.mock import MagicMock, patch
+
+# pylint: disable=import-error
+from src import charts
+from src.app import create_app
+# pylint: enable=import-error
+
+TOTALS = {"Warm-up": 10, "Workout": 50, "Cool-down": 0}
+
+
+class ChartServiceTests(unittest.TestCase):
+    """Tests for coalescing, saturation and timeouts in ChartService."""
+
+    def setUp(self):
+        self.futures = []
+
+    def make_service(self, timeout=1.0):
+        """Returns a one-worker service whose pool hands out futures we control."""
+        service = charts.ChartService(1, timeout=timeout)
+        pool = MagicMock()
+        def submit(*_):
+            future = Future()
+            self.futures.append(future)
+            return future
+        pool.submit.side_effect = submit
+        patcher = patch.object(service, "_executor", return_value=pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return service
+
+    def test_concurrent_requests_share_one_render(self):
+        """Tests that requests for the same key wait on a single render."""
+        service = self.make_service()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(service.render("k", TOTALS)))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        while not self.futures:
+            pass
+        self.futures[0].set_result((b"png", {"savefig": 0.01}))
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [b"png"] * 4)
+        self.assertEqual(len(self.futures), 1)
+        self.assertEqual(service.pending(), 0)
+
+    def test_saturated_pool_is_refused(self):
+        """Tests that new keys are turned away once the pending limit is hit."""
+        service = self.make_service(timeout=0.01)
+        for key in range(service.max_pending):
+            with self.assertRaises(charts.ChartUnavailable):
+                service.render(key, TOTALS)
+        self.assertTrue(service.saturated())
+        with self.assertRaises(charts.ChartUnavailable):
+            service.render("new", TOTALS)
+        self.assertEqual(len(self.futures), service.max_pending)
+        self.futures[0].set_result((b"png", {"savefig": 0.01}))
+        self.assertFalse(service.saturated())
+
+    def test_render_that_times_out_is_stored(self):
+        """Tests that a timed-out render still hands its PNG to ``store``."""
+        service = self.make_service(timeout=0.01)
+        stored = []
+        with self.assertRaises(charts.ChartUnavailable):
+            service.render("k", TOTALS, stored.append)
+        self.futures[0].set_result((b"png", {"savefig": 0.01}))
+        self.assertEqual(stored, [b"png"])
+        self.assertEqual(service.pending(), 0)
+
+    def test_retry_after_timeout_is_served_from_cache(self):
+        """Tests that the retry after a 503 gets the render that outlived it."""
+        app = create_app({"CHART_WORKERS": 0})
+        app.extensions["charts"] = self.make_service(timeout=0.01)
+        client = app.test_client()
+        client.post('/add', data={'category': 'Workout', 'exercise': 'Run', 'duration': '30'})
+        self.assertEqual(client.get('/progress.png').status_code, 503)
+        self.futures[0].set_result((b"png", {"savefig": 0.01}))
+        retry = client.get('/progress.png')
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.data, b"png")
+        self.assertEqual(len(self.futures), 1)
+
+    def test_real_pool_renders_png(self):
+        """Tests rendering in an actual worker process."""
+        service = charts.ChartService(1, timeout=60)
+        self.addCleanup(service.shutdown)
+        png = service.render("k", TOTALS)
+        self.assertTrue(png.startswith(b"\x89PNG"))
+
+
+if __name__ == '__main__':
+    unittest.main()
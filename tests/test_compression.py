@@ -0,0 +1,102 @@
+"""
+Unit tests for response compression and the cached static pages.
+"""
+import gzip
+import unittest
+from unittest.mock import patch
+
+from flask import render_template
+from werkzeug.datastructures import Accept
+
+# pylint: disable=import-error
+from src import compression
+from src.app import APP as app, REPO
+# pylint: enable=import-error
+
+
+class NegotiationTests(unittest.TestCase):
+    """Tests for picking a content-coding from Accept-Encoding."""
+
+    def test_prefers_brotli_only_when_installed(self):
+        """Tests that br wins ties when available and gzip is used otherwise."""
+        accept = Accept([("gzip", 1), ("br", 1)])
+        with patch.object(compression, "brotli", object()):
+            self.assertEqual(compression.negotiate(accept), "br")
+        with patch.object(compression, "brotli", None):
+            self.assertEqual(compression.negotiate(accept), "gzip")
+
+    def test_identity_when_nothing_acceptable(self):
+        """Tests that no header, or q=0, means an uncompressed response."""
+        self.assertIsNone(compression.negotiate(Accept([])))
+        self.assertIsNone(compression.negotiate(Accept([("gzip", 0)])))
+        self.assertEqual(compression.negotiate(Accept([("*", 1)])),
+                         compression.encodings()[0])
+
+
+class CompressionTests(unittest.TestCase):
+    """Tests for compressed responses served by the app."""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        REPO.clear()
+        app.extensions["page_cache"].clear()
+
+    def test_html_is_gzipped_when_accepted(self):
+        """Tests that a large HTML page is compressed and advertises Vary."""
+        with patch.object(compression, "brotli", None):
+            plain = self.client.get('/add')
+            packed = self.client.get('/add', headers={'Accept-Encoding': 'gzip'})
+        self.assertIsNone(plain.content_encoding)
+        self.assertEqual(packed.content_encoding, 'gzip')
+        self.assertIn('Accept-Encoding', packed.vary)
+        self.assertEqual(gzip.decompress(packed.data), plain.data)
+        self.assertLess(len(packed.data), len(plain.data))
+
+    def test_small_and_binary_responses_are_left_alone(self):
+        """Tests that tiny bodies and non-text types are not compressed."""
+        ready = self.client.get('/ready', headers={'Accept-Encoding': 'gzip'})
+        self.assertIsNone(ready.content_encoding)
+        missing_chart = self.client.get('/progress.png', headers={'Accept-Encoding': 'gzip'})
+        self.assertIsNone(missing_chart.content_encoding)
+
+    def test_streamed_export_is_not_compressed(self):
+        """Tests that the streamed bulk export passes through unbuffered."""
+        response = self.client.get('/workouts/export?format=csv',
+                                   headers={'Accept-Encoding': 'gzip'})
+        self.assertTrue(response.is_streamed)
+        self.assertIsNone(response.content_encoding)
+
+    def test_static_page_is_rendered_once_and_revalidated(self):
+        """Tests the strong ETag, 304 answers and single render of /plan."""
+        with patch.object(compression, "brotli", None), \
+             patch('src.app.render_template', wraps=render_template) as render:
+            first = self.client.get('/plan', headers={'Accept-Encoding': 'gzip'})
+            etag, weak = first.get_etag()
+            again = self.client.get('/plan', headers={'Accept-Encoding': 'gzip',
+                                                      'If-None-Match': f'"{etag}"'})
+            plain = self.client.get('/plan')
+        self.assertEqual(render.call_count, 1)
+        self.assertFalse(weak)
+        self.assertEqual(first.content_encoding, 'gzip')
+        self.assertIn(b'Workout Plan', gzip.decompress(first.data))
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.data, b'')
+        # The uncompressed representation has its own ETag
+        self.assertEqual(plain.status_code, 200)
+        self.assertNotEqual(plain.get_etag()[0], etag)
+        self.assertEqual(plain.data, gzip.decompress(first.data))
+
+    def test_pending_flash_bypasses_page_cache(self):
+        """Tests that a page showing a flash message is rendered fresh and not stored."""
+        self.client.get('/diet')
+        with self.client.session_transaction() as sess:
+            sess['_flashes'] = [('info', 'Saved!')]
+        flashed = self.client.get('/diet')
+        self.assertIn(b'Saved!', flashed.data)
+        self.assertIsNone(flashed.get_etag()[0])
+        self.assertNotIn(b'Saved!', self.client.get('/diet').data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+Stress tests: many threads writing and reading the same member at once.
+"""
+import sys
+import threading
+import unittest
+from datetime import datetime
+
+# pylint: disable=import-error
+from src.app import APP as app, REPO
+from src.fitness import calculate_calories
+from src.store import WorkoutLog
+# pylint: enable=import-error
+
+THREADS = 8
+ROUNDS = 150
+REGN_ID = "STRESS1"
+# Weights the profile flips between; 70 kg (the default) must never be used
+WEIGHTS = (55.0, 95.0)
+
+
+def run_threads(targets):
+    """Starts one thread per callable, waits for all and re-raises the first failure."""
+    errors = []
+
+    def guarded(target):
+        try:
+            target()
+        except Exception as err:  # pylint: disable=broad-exception-caught
+            errors.append(err)
+
+    # Switch threads far more often than usual to shake out interleavings
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=guarded, args=(target,)) for target in targets]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    if errors:
+        raise errors[0]
+
+
+class StoreStressTests(unittest.TestCase):
+    """Concurrent appends and reads against one WorkoutLog."""
+
+    def test_concurrent_appends_keep_rows_and_aggregates_consistent(self):
+        """Tests that no append is lost and names, rows and totals agree."""
+        log = WorkoutLog(["Workout"])
+        when = datetime(2024, 5, 15, 12, 0, 0)
+
+        def writer(worker):
+            for i in range(ROUNDS):
+                log["Workout"].add(f"Ex{worker}-{i % 7}", worker + 1, float(worker + 1), when)
+
+        def reader():
+            for _ in range(ROUNDS):
+                for row in log["Workout"].page(limit=50)[0]:
+                    # A row never mixes one writer's duration with another's name
+                    self.assertEqual(int(row["exercise"][2:].split("-")[0]) + 1, row["duration"])
+                totals = log.totals()["Workout"]
+                self.assertAlmostEqual(totals["minutes"], totals["calories"])
+
+        run_threads([lambda w=w: writer(w) for w in range(THREADS)] + [reader] * 2)
+        sessions = THREADS * ROUNDS
+        self.assertEqual(len(log["Workout"]), sessions)
+        self.assertEqual(log.totals()["Workout"]["sessions"], sessions)
+        self.assertEqual(sum(row["duration"] for row in log["Workout"]),
+                         log.totals()["Workout"]["minutes"])
+        names = [row["exercise"] for row in log["Workout"]]
+        self.assertEqual(len(set(names)), THREADS * 7)
+        for row in log["Workout"]:
+            self.assertEqual(int(row["exercise"][2:].split("-")[0]) + 1, row["duration"])
+
+
+class RouteStressTests(unittest.TestCase):
+    """Hammers / and /add for one member from many threads."""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        REPO.clear()
+
+    def save_profile(self, client, weight):
+        """Saves the shared member's profile with ``weight``."""
+        response = client.post('/', data={
+            'name': 'Stress', 'regn_id': REGN_ID, 'age': '30', 'gender': 'F',
+            'height': '170', 'weight': str(weight),
+        })
+        self.assertEqual(response.status_code, 302)
+
+    def test_calories_never_use_a_half_updated_profile(self):
+        """Tests that every logged session used one of the saved weights, never the default."""
+        self.save_profile(app.test_client(), WEIGHTS[0])
+
+        def profile_writer():
+            client = app.test_client()
+            for i in range(ROUNDS):
+                self.save_profile(client, WEIGHTS[i % 2])
+
+        def logger():
+            client = app.test_client()
+            with client.session_transaction() as sess:
+                sess['regn_id'] = REGN_ID
+            for i in range(ROUNDS):
+                response = client.post('/add', data={
+                    'category': 'Workout', 'exercise': f'Lift{i % 5}', 'duration': '40'})
+                self.assertEqual(response.status_code, 302)
+
+        def summary_reader():
+            client = app.test_client()
+            with client.session_transaction() as sess:
+                sess['regn_id'] = REGN_ID
+            for _ in range(ROUNDS // 3):
+                self.assertEqual(client.get('/summary').status_code, 200)
+                self.assertEqual(client.get('/api/v1/users/STRESS1/summary').status_code, 200)
+
+        run_threads([profile_writer] * 2 + [logger] * THREADS + [summary_reader] * 2)
+        allowed = {round(calculate_calories('Workout', 40, weight), 6) for weight in WEIGHTS}
+        sessions = REPO.sessions(REGN_ID, 'Workout')
+        self.assertEqual(len(sessions), THREADS * ROUNDS)
+        self.assertEqual({round(entry['calories'], 6) for entry in sessions} - allowed, set())
+        self.assertEqual(REPO.totals(REGN_ID)['Workout']['sessions'], THREADS * ROUNDS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,230 @@
+"""
+Unit tests for the live progress events (broker, relay and /events stream).
+"""
+# pylint: disable=unbalanced-tuple-unpacking
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+
+# pylint: disable=import-error
+from src import events
+from src.app import APP as app, REPO, DEFAULT_USER_ID
+# pylint: enable=import-error
+
+
+def parse(chunk):
+    """Returns [(event, data)] of the events in an SSE chunk (comments skipped)."""
+    parsed = []
+    for block in chunk.decode().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines()
+                      if line and not line.startswith(":"))
+        if "event" in fields:
+            parsed.append((fields["event"], json.loads(fields["data"])))
+    return parsed
+
+
+class BrokerTests(unittest.TestCase):
+    """Tests for fan-out, back-pressure and the stream generator."""
+
+    def setUp(self):
+        self.broker = events.Broker(max_streams=3)
+
+    def test_publish_reaches_only_the_members_streams(self):
+        """Tests that every stream of the member gets the event and others do not."""
+        first, second = self.broker.subscribe("A"), self.broker.subscribe("A")
+        other = self.broker.subscribe("B")
+        self.assertTrue(self.broker.publish("A", "workout", {"minutes": 30}))
+        for subscription in (first, second):
+            self.assertEqual(parse(b"".join(subscription.wait(0))),
+                             [("workout", {"minutes": 30})])
+        self.assertEqual(other.wait(0), [])
+
+    def test_payload_built_only_when_someone_listens(self):
+        """Tests that the payload is built once for a member's streams, never without one."""
+        built = []
+        broker = events.Broker(max_streams=3, build=lambda user_id, event, detail: (
+            built.append((user_id, event, detail)) or {"detail": detail}))
+        self.assertFalse(broker.publish("A", "workout", 1))
+        broker.unsubscribe(broker.subscribe("A"))
+        self.assertFalse(broker.publish("A", "workout", 2))
+        self.assertEqual((built, broker.streams()), ([], 0))
+        first, second = broker.subscribe("A"), broker.subscribe("A")
+        self.assertTrue(broker.publish("A", "workout", 3))
+        self.assertEqual(built, [("A", "workout", 3)])
+        for subscription in (first, second):
+            self.assertEqual(parse(b"".join(subscription.wait(0))),
+                             [("workout", {"detail": 3})])
+
+    def test_slow_stream_keeps_the_newest_events(self):
+        """Tests that a full queue drops its oldest events."""
+        subscription = self.broker.subscribe("A")
+        for i in range(events.QUEUE_SIZE + 5):
+            self.broker.publish("A", "workout", {"i": i})
+        received = parse(b"".join(subscription.wait(0)))
+        self.assertEqual(len(received), events.QUEUE_SIZE)
+        self.assertEqual(received[-1], ("workout", {"i": events.QUEUE_SIZE + 4}))
+
+    def test_stream_limit(self):
+        """Tests that streams beyond max_streams are refused until one closes."""
+        subscriptions = [self.broker.subscribe(str(i)) for i in range(3)]
+        with self.assertRaises(events.StreamsExhausted):
+            self.broker.subscribe("A")
+        self.broker.unsubscribe(subscriptions[0])
+        self.broker.subscribe("A")
+
+    def test_stream_body(self):
+        """Tests the retry hint, first event, heartbeats and unsubscribing on close."""
+        subscription = self.broker.subscribe("A")
+        body = self.broker.stream(subscription, events.frame("progress", {"v": 1}),
+                                  heartbeat=0.01, lifetime=60)
+        self.assertEqual(next(body), f"retry: {events.RETRY_MS}\n\n".encode())
+        self.assertEqual(parse(next(body)), [("progress", {"v": 1})])
+        self.assertEqual(next(body), b": ping\n\n")
+        self.broker.publish("A", "workout", {"v": 2})
+        self.assertEqual(parse(next(body)), [("workout", {"v": 2})])
+        body.close()
+        self.assertEqual(self.broker.streams(), 0)
+
+    def test_drain_ends_streams_and_refuses_new_ones(self):
+        """Tests that a draining worker closes its streams for the browsers to move on."""
+        subscription = self.broker.subscribe("A")
+        body = self.broker.stream(subscription, heartbeat=60, lifetime=60)
+        next(body)
+        # Drain while the stream waits for its next event
+        threading.Timer(0.05, self.broker.drain).start()
+        start = time.monotonic()
+        self.assertEqual(list(body), [b""])
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(self.broker.streams(), 0)
+        with self.assertRaises(events.StreamsExhausted):
+            self.broker.subscribe("A")
+
+    def test_stream_ends_after_its_lifetime(self):
+        """Tests that a stream finishes so the browser reconnects."""
+        subscription = self.broker.subscribe("A")
+        chunks = list(self.broker.stream(subscription, heartbeat=0.01, lifetime=0.05))
+        self.assertIn(b": ping\n\n", chunks)
+        self.assertEqual(self.broker.streams(), 0)
+
+
+class RelayTests(unittest.TestCase):
+    """Tests for the Unix datagram relay between workers."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="aceest-events-")
+        # Payloads built per broker, to check only a broker with the stream builds one
+        self.built = [[], []]
+        self.brokers = [
+            events.Broker(max_streams=3, build=lambda user_id, event, detail, built=built: (
+                built.append(detail) or detail))
+            for built in self.built
+        ]
+        for broker in self.brokers:
+            broker.start_relay(self.directory)
+
+    def tearDown(self):
+        for broker in self.brokers:
+            broker.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_event_reaches_streams_on_another_worker(self):
+        """Tests that an event published by one broker arrives at the other's stream."""
+        subscription = self.brokers[1].subscribe("A")
+        self.assertTrue(self.brokers[0].publish("A", "workout", {"minutes": 5}))
+        self.assertEqual(parse(b"".join(subscription.wait(2.0))),
+                         [("workout", {"minutes": 5})])
+        # Only the details travel; the broker holding the stream built the payload
+        self.assertEqual(self.built, [[], [{"minutes": 5}]])
+
+    def test_stale_peer_sockets_are_removed(self):
+        """Tests that the socket of a worker that died without cleaning up is unlinked."""
+        stale = os.path.join(self.directory, "1-dead.sock")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.bind(stale)
+        time.sleep(events.PEER_REFRESH_SECONDS + 0.1)
+        self.brokers[0].publish("A", "workout", {"minutes": 5})
+        self.assertFalse(os.path.exists(stale))
+
+    def test_close_removes_the_socket(self):
+        """Tests that closing stops the relay and deletes its socket."""
+        self.brokers[0].close()
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+
+class EventRouteTests(unittest.TestCase):
+    """Tests for /events and the updates published by the write routes."""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        REPO.clear()
+
+    def open_stream(self):
+        """Opens /events; returns (response, chunk iterator) past the retry hint."""
+        response = self.client.get('/events', buffered=False)
+        self.assertEqual(response.mimetype, events.MIMETYPE)
+        chunks = iter(response.response)
+        next(chunks)
+        return response, chunks
+
+    def test_stream_starts_with_totals_and_follows_logged_sessions(self):
+        """Tests the first event and the delta published by /add and the API."""
+        response, chunks = self.open_stream()
+        try:
+            [(name, first)] = parse(next(chunks))
+            self.assertEqual((name, first["total_minutes"], first["entry"]), ("progress", 0, None))
+            self.client.post('/add', data={'category': 'Workout', 'exercise': 'Row',
+                                           'duration': '25'})
+            [(name, update)] = parse(next(chunks))
+            self.assertEqual(name, "workout")
+            self.assertEqual(update["entry"]["exercise"], "Row")
+            self.assertEqual((update["total_minutes"], update["week_minutes"],
+                              update["week_sessions"]), (25, 25, 1))
+            self.assertEqual(update["version"], REPO.version(DEFAULT_USER_ID))
+            self.client.post(f'/api/v1/users/{DEFAULT_USER_ID}/workouts',
+                             json={'category': 'Cool-down', 'exercise': 'Stretch',
+                                   'duration': 5})
+            [(_, update)] = parse(next(chunks))
+            self.assertEqual(update["minutes"], [0, 25, 5])
+        finally:
+            response.close()
+        self.assertEqual(app.extensions["events"].streams(), 0)
+
+    def test_bulk_import_publishes_once(self):
+        """Tests that an import sends one update with the new totals."""
+        response, chunks = self.open_stream()
+        try:
+            next(chunks)
+            self.client.post('/workouts/import', content_type='text/csv',
+                             data='category,exercise,duration\nWorkout,Run,10\nWorkout,Run,20\n')
+            [(name, update)] = parse(next(chunks))
+            self.assertEqual((name, update["total_minutes"]), ("import", 30))
+        finally:
+            response.close()
+
+    def test_streams_beyond_the_limit_get_204(self):
+        """Tests that a worker at its stream limit tells browsers to stop reconnecting."""
+        broker = app.extensions["events"]
+        limit, broker.max_streams = broker.max_streams, 1
+        response, _ = self.open_stream()
+        try:
+            self.assertEqual(app.test_client().get('/events').status_code, 204)
+        finally:
+            response.close()
+            broker.max_streams = limit
+
+    def test_pages_subscribe(self):
+        """Tests that the progress and summary pages open the event stream."""
+        self.client.post('/add', data={'category': 'Workout', 'exercise': 'Row',
+                                       'duration': '25'})
+        for page in ('/progress', '/summary'):
+            self.assertIn(b'new EventSource("/events")', self.client.get(page).data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+"""
+Parity tests for the vectorised fitness calculations and their batch endpoints.
+"""
+import unittest
+import numpy as np
+import pandas as pd
+
+# pylint: disable=import-error
+from src.app import APP as app
+from src.fitness import (
+    WORKOUT_CATEGORIES, calculate_metrics, calculate_calories,
+    calculate_metrics_batch, calculate_calories_batch
+)
+# pylint: enable=import-error
+
+ROWS = 20000
+
+
+class BatchParityTests(unittest.TestCase):
+    """The batch functions must match the scalar ones exactly, row for row."""
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(42)
+        cls.weight = rng.uniform(30, 200, ROWS)
+        cls.height = rng.uniform(120, 220, ROWS)
+        cls.age = rng.integers(10, 90, ROWS)
+        cls.gender = rng.choice(["M", "F", "m", "f"], ROWS)
+        cls.category = rng.choice(WORKOUT_CATEGORIES + ["Stretching"], ROWS)
+        cls.duration = rng.integers(1, 240, ROWS)
+
+    def test_metrics_match_scalar(self):
+        """Tests BMI and BMR parity over random members."""
+        bmi, bmr = calculate_metrics_batch(self.weight, self.height, self.age, self.gender)
+        expected = [
+            calculate_metrics(w, h, a, g) for w, h, a, g in zip(
+                self.weight.tolist(), self.height.tolist(), self.age.tolist(),
+                self.gender.tolist())
+        ]
+        np.testing.assert_array_equal(bmi, [e[0] for e in expected])
+        np.testing.assert_array_equal(bmr, [e[1] for e in expected])
+
+    def test_calories_match_scalar(self):
+        """Tests calorie parity, including the default MET for unknown categories."""
+        calories = calculate_calories_batch(self.category, self.duration, self.weight)
+        expected = [
+            calculate_calories(c, d, w) for c, d, w in zip(
+                self.category.tolist(), self.duration.tolist(), self.weight.tolist())
+        ]
+        np.testing.assert_array_equal(calories, expected)
+
+    def test_accepts_series_and_scalar_weight(self):
+        """Tests pandas Series input and a single weight broadcast to every row."""
+        frame = pd.DataFrame({"category": self.category[:100], "duration": self.duration[:100]})
+        calories = calculate_calories_batch(frame["category"], frame["duration"], 72.5)
+        expected = [calculate_calories(c, d, 72.5) for c, d in
+                    zip(frame["category"], frame["duration"])]
+        np.testing.assert_array_equal(calories, expected)
+        bmi, _ = calculate_metrics_batch(pd.Series([80.0]), pd.Series([170.0]),
+                                         pd.Series([25]), pd.Series(["F"]))
+        self.assertEqual(bmi[0], calculate_metrics(80.0, 170.0, 25, "F")[0])
+
+
+class BatchEndpointTests(unittest.TestCase):
+    """Tests for /api/v1/batch/metrics and /api/v1/batch/calories."""
+
+    def setUp(self):
+        self.app_client = app.test_client()
+
+    def test_metrics_endpoint(self):
+        """Tests a valid metrics batch."""
+        response = self.app_client.post('/api/v1/batch/metrics', json={
+            "weight": [80, 75], "height": [170, 180], "age": [25, 30], "gender": ["F", "m"]
+        })
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(body["bmr"], [calculate_metrics(80, 170, 25, "F")[1],
+                                       calculate_metrics(75, 180, 30, "M")[1]])
+
+    def test_calories_endpoint_with_single_weight(self):
+        """Tests a calories batch with one weight for every row."""
+        response = self.app_client.post('/api/v1/batch/calories', json={
+            "category": ["Workout", "Warm-up"], "duration": [10, 20], "weight": 75
+        })
+        self.assertEqual(response.get_json()["calories"], [78.75, 78.75])
+
+    def test_endpoint_validation(self):
+        """Tests that malformed batches are rejected with a JSON error."""
+        cases = [
+            {"weight": [80], "height": [170], "age": [25]},
+            {"weight": [80, 1], "height": [170], "age": [25], "gender": ["F"]},
+            {"weight": ["x"], "height": [170], "age": [25], "gender": ["F"]},
+            {"weight": [80], "height": [-1], "age": [25], "gender": ["F"]},
+            {"weight": [80], "height": [170], "age": [25], "gender": ["X"]},
+            {"weight": [[80, 75]], "height": [[170, 180]], "age": [[25, 30]],
+             "gender": ["F"]},
+            {"weight": [80], "height": [170], "age": [25.5], "gender": ["F"]},
+            {"weight": [80], "height": [170], "age": [True], "gender": ["F"]},
+        ]
+        for payload in cases:
+            response = self.app_client.post('/api/v1/batch/metrics', json=payload)
+            self.assertEqual(response.status_code, 400, payload)
+            self.assertIn("error", response.get_json())
+        response = self.app_client.post('/api/v1/batch/calories', json={
+            "category": ["Workout"], "duration": [[1, 2]], "weight": 75})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
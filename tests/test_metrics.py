@@ -0,0 +1,136 @@
+"""
+Unit tests for the metrics registry and the /metrics endpoint.
+"""
+import os
+import subprocess
+import sys
+import threading
+import unittest
+from unittest.mock import patch
+
+# pylint: disable=import-error
+from src import metrics
+from src.app import APP as app, REPO, CHART_SERVICE, create_app
+# pylint: enable=import-error
+
+
+class RegistryTests(unittest.TestCase):
+    """Tests for the sharded counters, gauges and histograms."""
+
+    def setUp(self):
+        self.registry = metrics.Registry()
+
+    def test_counter_sums_live_and_finished_threads(self):
+        """Tests that counts from every thread survive, including finished ones."""
+        counter = self.registry.counter("hits_total", "Hits.", ("route",))
+        def worker():
+            for _ in range(1000):
+                counter.inc("a")
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counter.inc("b", amount=5)
+        self.assertEqual(counter.collect(), {("a",): 8000, ("b",): 5})
+        # Finished threads were folded away, and scraping twice does not double count
+        self.assertEqual(counter.collect(), {("a",): 8000, ("b",): 5})
+
+    def test_greenlets_share_their_threads_shard(self):
+        """Tests that requests served by gevent greenlets leave no shard behind each."""
+        code = (
+            "from gevent import monkey; monkey.patch_all()\n"
+            "import gevent\n"
+            "from src import metrics\n"
+            "from src.app import APP\n"
+            "def get():\n"
+            "    APP.test_client().get('/plan')\n"
+            "for _ in range(3):\n"
+            "    gevent.joinall([gevent.spawn(get) for _ in range(200)])\n"
+            "    metrics.REGISTRY.render()\n"
+            "    print(len(metrics.REQUESTS._shards), len(metrics.REQUEST_SECONDS._shards),\n"
+            "          len(metrics.IN_FLIGHT._shards), sum(metrics.REQUESTS.collect().values()))\n"
+        )
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                check=True, env={**os.environ, "ACEEST_RATE_LIMITS": "off",
+                                                 "ACEEST_CHART_WORKERS": "0"}).stdout
+        self.assertEqual(output.split("\n")[:3], ["1 1 1 200", "1 1 1 400", "1 1 1 600"])
+
+    def test_gauge_goes_up_and_down(self):
+        """Tests in-flight style gauges."""
+        gauge = self.registry.gauge("busy", "Busy.")
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+        self.assertEqual(gauge.collect(), {(): 1})
+
+    def test_render_histogram_and_labels(self):
+        """Tests the Prometheus text format, including escaping."""
+        histogram = self.registry.histogram("latency_seconds", "Latency.", ("route",),
+                                            buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 3.0):
+            histogram.observe(value, 'x"y')
+        self.registry.gauge_function("size", "Size.", ("cat",), lambda: {("W",): 3})
+        text = self.registry.render()
+        self.assertIn("# TYPE latency_seconds histogram", text)
+        self.assertIn('latency_seconds_bucket{route="x\\"y",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{route="x\\"y",le="1.0"} 2', text)
+        self.assertIn('latency_seconds_bucket{route="x\\"y",le="+Inf"} 3', text)
+        self.assertIn('latency_seconds_sum{route="x\\"y"} 3.55', text)
+        self.assertIn('latency_seconds_count{route="x\\"y"} 3', text)
+        self.assertIn('size{cat="W"} 3', text)
+
+
+class MetricsEndpointTests(unittest.TestCase):
+    """Tests for the request instrumentation and /metrics."""
+
+    def setUp(self):
+        self.client = app.test_client()
+        REPO.clear()
+        workers = patch.object(CHART_SERVICE, "workers", 0)
+        workers.start()
+        self.addCleanup(workers.stop)
+
+    def sample(self, text, series):
+        """Returns the value of one exposed series, or 0 if absent."""
+        for line in text.splitlines():
+            if line.startswith(series + " "):
+                return float(line.split()[-1])
+        return 0
+
+    @patch('matplotlib.figure.Figure.savefig')
+    def test_requests_chart_phases_and_sizes_are_exposed(self, mock_savefig):
+        """Tests endpoint counters, latency, chart phases and per-category sizes."""
+        mock_savefig.side_effect = lambda fp, format: fp.write(b"chart")
+        before = self.client.get('/metrics').get_data(as_text=True)
+        self.client.get('/plan')
+        self.client.post('/add', data={"category": "Workout", "exercise": "Run",
+                                       "duration": "30"})
+        self.client.get('/progress.png')
+        response = self.client.get('/metrics')
+        self.assertTrue(response.content_type.startswith("text/plain; version=0.0.4"))
+        text = response.get_data(as_text=True)
+        series = 'aceest_http_requests_total{endpoint="workout_plan",method="GET",status="200"}'
+        self.assertEqual(self.sample(text, series) - self.sample(before, series), 1)
+        count = 'aceest_http_request_duration_seconds_count{endpoint="add_workout"}'
+        self.assertEqual(self.sample(text, count) - self.sample(before, count), 1)
+        in_flight = 'aceest_http_requests_in_flight{endpoint="metrics_endpoint"}'
+        self.assertEqual(self.sample(text, in_flight), 1)
+        for phase in ("figure", "tight_layout", "savefig"):
+            self.assertIn(f'aceest_chart_phase_seconds_count{{phase="{phase}"}}', text)
+        self.assertEqual(self.sample(text, 'aceest_workout_sessions{category="Workout"}'), 1)
+
+    def test_another_app_keeps_its_own_gauges(self):
+        """Tests that building a second app does not rebind APP's storage gauges."""
+        self.client.post('/add', data={"category": "Workout", "exercise": "Run",
+                                       "duration": "30"})
+        other = create_app({"CHART_WORKERS": 0})
+        series = 'aceest_workout_sessions{category="Workout"}'
+        text = self.client.get('/metrics').get_data(as_text=True)
+        self.assertEqual(self.sample(text, series), 1)
+        text = other.test_client().get('/metrics').get_data(as_text=True)
+        self.assertEqual(self.sample(text, series), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
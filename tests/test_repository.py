@@ -0,0 +1,357 @@
+# pylint: disable=no-member, attribute-defined-outside-init
+"""
+Unit tests for the storage repositories, run against every backend.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+# pylint: disable=import-error
+from src.repository import (
+    InMemoryRepository, DurableRepository, SQLiteRepository, create_repository
+)
+from src.wal import WALError, WriteAheadLog
+from src.store import to_epoch
+# pylint: enable=import-error
+
+CATEGORIES = ["Warm-up", "Workout", "Cool-down"]
+
+
+class RepositoryContract:
+    """Behaviour every repository must provide; mixed into one TestCase per backend."""
+
+    def make_repository(self):
+        """Returns a fresh, empty repository."""
+        raise NotImplementedError
+
+    def setUp(self): # pylint: disable=invalid-name
+        """Creates the repository under test."""
+        self.repo = self.make_repository()
+        self.now = datetime(2024, 5, 15, 12, 0, 0)
+
+    def test_profiles_are_keyed_by_user(self):
+        """Tests saving, replacing and reading profiles."""
+        self.assertEqual(self.repo.get_profile("A"), {})
+        self.repo.save_profile("A", {"weight": 70.0})
+        self.repo.save_profile("A", {"weight": 72.5})
+        self.repo.save_profile("B", {"weight": 90.0})
+        self.assertEqual(self.repo.get_profile("A"), {"weight": 72.5})
+        self.assertEqual(self.repo.get_profile("B"), {"weight": 90.0})
+
+    def test_totals_windows_and_sessions(self):
+        """Tests aggregates and time-ordered session reads per user."""
+        self.repo.add_workout("A", "Workout", "Run", 30, 100.0, self.now)
+        self.repo.add_workout("A", "Workout", "Row", 20, 50.0, self.now - timedelta(days=10))
+        self.repo.add_workout("B", "Warm-up", "Jog", 5, 10.0, self.now)
+        totals = self.repo.totals("A")
+        self.assertEqual(totals["Workout"], {"minutes": 50, "calories": 150.0, "sessions": 2})
+        self.assertEqual(totals["Warm-up"]["sessions"], 0)
+        self.assertEqual(self.repo.window("A", 7, now=self.now)["Workout"]["minutes"], 30)
+        sessions = self.repo.sessions("A", "Workout")
+        self.assertEqual([s["exercise"] for s in sessions], ["Row", "Run"])
+        self.assertEqual(sessions[1]["timestamp"], "2024-05-15 12:00:00")
+        recent = self.repo.sessions("A", "Workout", since=self.now - timedelta(days=1))
+        self.assertEqual([s["exercise"] for s in recent], ["Run"])
+
+    def test_version_changes_on_write(self):
+        """Tests that each logged workout produces a new version."""
+        before = self.repo.version("A")
+        self.repo.add_workout("A", "Workout", "Run", 30, 100.0, self.now)
+        after = self.repo.version("A")
+        self.assertNotEqual(before, after)
+        self.repo.add_workout("B", "Workout", "Run", 30, 100.0, self.now)
+        self.assertEqual(self.repo.version("A"), after)
+
+    def test_concurrent_writes_are_all_kept(self):
+        """Tests that writes from many threads are neither lost nor duplicated."""
+        def worker(user):
+            for _ in range(25):
+                self.repo.add_workout(user, "Workout", "Run", 1, 1.0, self.now)
+        threads = [threading.Thread(target=worker, args=(f"U{i % 2}",)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.repo.totals("U0")["Workout"]["sessions"], 100)
+        self.assertEqual(self.repo.totals("U1")["Workout"]["minutes"], 100)
+
+    def test_bulk_add_and_chunked_iteration(self):
+        """Tests batch appends (including back-dated rows) and chunked reads."""
+        base = to_epoch(self.now)
+        self.repo.add_workout("A", "Workout", "Run", 30, 100.0, self.now)
+        self.repo.add_workouts("A", {
+            "category": ["Workout", "Warm-up", "Workout"],
+            "exercise": ["Row", "Jog", "Swim"],
+            "duration": [10, 5, 20],
+            "calories": [20.0, 5.0, 40.0],
+            "timestamp": [base - 3 * 86400, base, base - 86400],
+        })
+        self.assertEqual(self.repo.totals("A")["Workout"],
+                         {"minutes": 60, "calories": 160.0, "sessions": 3})
+        self.assertEqual(self.repo.window("A", 1, now=self.now)["Workout"]["minutes"], 30)
+        chunks = list(self.repo.iter_sessions("A", chunk_size=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [1, 2, 1])
+        self.assertEqual([row["exercise"] for chunk in chunks for row in chunk],
+                         ["Jog", "Row", "Swim", "Run"])
+
+    def test_page_walks_history_newest_first(self):
+        """Tests cursor pagination (including timestamp ties) and range bounds."""
+        base = to_epoch(self.now)
+        self.repo.add_workouts("A", {
+            "category": ["Workout"] * 5,
+            "exercise": ["E0", "E1", "E2", "E3", "E4"],
+            "duration": [1, 2, 3, 4, 5],
+            "calories": [1.0] * 5,
+            # E1..E3 share a timestamp, so a page boundary falls inside the tie
+            "timestamp": [base - 3 * 86400, base - 86400, base - 86400, base - 86400, base],
+        })
+        seen, cursor = [], None
+        while True:
+            rows, cursor = self.repo.page("A", "Workout", cursor=cursor, limit=2)
+            seen.append([row["duration"] for row in rows])
+            if cursor is None:
+                break
+        self.assertEqual(sorted(d for page in seen for d in page), [1, 2, 3, 4, 5])
+        self.assertEqual([len(page) for page in seen], [2, 2, 1])
+        self.assertEqual(seen[0][0], 5)
+        self.assertEqual(seen[-1], [1])
+        rows, cursor = self.repo.page("A", "Workout", start=base - 2 * 86400, end=base)
+        self.assertEqual(sorted(row["exercise"] for row in rows), ["E1", "E2", "E3"])
+        self.assertIsNone(cursor)
+        self.assertEqual(rows[0]["date"], "2024-05-14")
+        day = base // 86400
+        self.assertEqual(self.repo.between("A", day - 1, day)["Workout"]["minutes"], 14)
+
+    def test_daily_and_exercise_aggregates(self):
+        """Tests the per-day buckets and per-exercise totals behind the trends."""
+        day = to_epoch(self.now) // 86400
+        self.repo.add_workout("A", "Workout", "Run", 30, 100.0, self.now)
+        self.repo.add_workout("A", "Workout", "Run", 10, 50.0, self.now - timedelta(days=2))
+        self.repo.add_workouts("A", {
+            "category": ["Workout", "Cool-down"], "exercise": ["Row", "Stretch"],
+            "duration": [20, 5], "calories": [80.0, 10.0],
+            "timestamp": [to_epoch(self.now), to_epoch(self.now)],
+        })
+        daily = self.repo.daily("A")
+        self.assertEqual(daily["Workout"]["day"].tolist(), [day - 2, day])
+        self.assertEqual(daily["Workout"]["minutes"].tolist(), [10, 50])
+        self.assertEqual(daily["Workout"]["sessions"].tolist(), [1, 2])
+        self.assertEqual(daily["Warm-up"]["day"].tolist(), [])
+        self.assertEqual(self.repo.exercise_totals("A"), {
+            "Warm-up": {},
+            "Workout": {"Run": {"minutes": 40, "calories": 150.0, "sessions": 2},
+                        "Row": {"minutes": 20, "calories": 80.0, "sessions": 1}},
+            "Cool-down": {"Stretch": {"minutes": 5, "calories": 10.0, "sessions": 1}},
+        })
+        self.assertEqual(self.repo.exercise_totals("B")["Workout"], {})
+
+    def test_category_sizes(self):
+        """Tests session counts per category across every member."""
+        self.repo.add_workout("A", "Workout", "Run", 30, 100.0, self.now)
+        self.repo.add_workout("A", "Workout", "Row", 20, 50.0, self.now - timedelta(days=3))
+        self.repo.add_workout("B", "Warm-up", "Jog", 5, 10.0, self.now)
+        self.assertEqual(self.repo.category_sizes(),
+                         {"Warm-up": 1, "Workout": 2, "Cool-down": 0})
+
+    def test_clear(self):
+        """Tests that clear() removes profiles and sessions."""
+        self.repo.save_profile("A", {"weight": 70.0})
+        self.repo.add_workout("A", "Workout", "Run", 30, 100.0, self.now)
+        self.repo.clear()
+        self.assertEqual(self.repo.get_profile("A"), {})
+        self.assertEqual(self.repo.sessions("A", "Workout"), [])
+        self.assertEqual(self.repo.totals("A")["Workout"]["minutes"], 0)
+
+
+class InMemoryRepositoryTests(RepositoryContract, unittest.TestCase):
+    """Runs the repository contract against InMemoryRepository."""
+
+    def make_repository(self):
+        return InMemoryRepository(CATEGORIES)
+
+
+class SQLiteRepositoryTests(RepositoryContract, unittest.TestCase):
+    """Runs the repository contract against SQLiteRepository."""
+
+    def make_repository(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.path = os.path.join(self.tmpdir, "aceest.db")
+        return SQLiteRepository(CATEGORIES, self.path)
+
+    def test_uses_wal_journal(self):
+        """Tests that the database is switched to write-ahead logging."""
+        rows = self.repo._query("PRAGMA journal_mode") # pylint: disable=protected-access
+        self.assertEqual(rows[0][0], "wal")
+
+    def test_state_is_shared_between_instances(self):
+        """Tests that a second worker opening the same file sees the same data."""
+        self.repo.save_profile("A", {"weight": 70.0})
+        self.repo.add_workout("A", "Workout", "Run", 30, 100.0, self.now)
+        other = SQLiteRepository(CATEGORIES, self.path)
+        self.assertEqual(other.get_profile("A"), {"weight": 70.0})
+        self.assertEqual(other.totals("A")["Workout"]["minutes"], 30)
+        self.assertEqual(other.version("A"), self.repo.version("A"))
+
+
+    def test_exercise_totals_backfilled_for_older_databases(self):
+        """Tests that a database from before exercise_totals gets it filled from workouts."""
+        self.repo.add_workout("A", "Workout", "Run", 30, 100.0, self.now)
+        self.repo.add_workout("A", "Workout", "Run", 15, 50.0, self.now)
+        self.repo._write([("DROP TABLE exercise_totals", ())]) # pylint: disable=protected-access
+        reopened = SQLiteRepository(CATEGORIES, self.path)
+        self.assertEqual(reopened.exercise_totals("A")["Workout"],
+                         {"Run": {"minutes": 45, "calories": 150.0, "sessions": 2}})
+        # Only once: opening it again does not add the workouts a second time
+        again = SQLiteRepository(CATEGORIES, self.path)
+        self.assertEqual(again.exercise_totals("A")["Workout"]["Run"]["sessions"], 2)
+
+
+class DurableRepositoryTests(RepositoryContract, unittest.TestCase):
+    """Runs the repository contract against DurableRepository, plus recovery."""
+
+    def make_repository(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        repo = DurableRepository(CATEGORIES, self.tmpdir)
+        self.addCleanup(repo.close)
+        return repo
+
+    def reopen(self):
+        """Closes the repository under test and returns a fresh one on its directory."""
+        self.repo.close()
+        self.repo = DurableRepository(CATEGORIES, self.tmpdir)
+        self.addCleanup(self.repo.close)
+        return self.repo
+
+    def populate(self):
+        """Logs a profile, single sessions and a batch."""
+        self.repo.save_profile("A", {"weight": 70.0})
+        self.repo.add_workout("A", "Workout", "Run", 30, 100.0, self.now)
+        self.repo.add_workout("A", "Cool-down", "Stretch", 5, 10.0, self.now)
+        self.repo.add_workouts("B", {
+            "category": ["Workout", "Warm-up"], "exercise": ["Row", "Jog"],
+            "duration": [20, 10], "calories": [80.0, 30.0],
+            "timestamp": [to_epoch(self.now), to_epoch(self.now - timedelta(days=1))],
+        })
+
+    def assert_populated(self, repo):
+        """Checks the state written by populate()."""
+        self.assertEqual(repo.get_profile("A"), {"weight": 70.0})
+        self.assertEqual(repo.totals("A")["Workout"], {"minutes": 30, "calories": 100.0,
+                                                       "sessions": 1})
+        self.assertEqual([s["exercise"] for s in repo.sessions("B", "Warm-up")], ["Jog"])
+        self.assertEqual(repo.window("B", 7, now=self.now)["Workout"]["minutes"], 20)
+
+    def test_state_survives_restart_from_the_log(self):
+        """Tests that reopening replays every logged write."""
+        self.populate()
+        self.assert_populated(self.reopen())
+
+    def test_state_survives_restart_from_snapshot_and_tail(self):
+        """Tests recovery from a snapshot plus the log written after it."""
+        self.populate()
+        self.repo.snapshot()
+        self.repo.add_workout("C", "Workout", "Swim", 15, 50.0, self.now)
+        repo = self.reopen()
+        self.assert_populated(repo)
+        self.assertEqual([s["exercise"] for s in repo.sessions("C", "Workout")], ["Swim"])
+        # Snapshot columns are memory-mapped read-only; appending must still work
+        repo.add_workout("A", "Workout", "Bike", 10, 40.0, self.now)
+        self.assertEqual([s["exercise"] for s in repo.sessions("A", "Workout")],
+                         ["Run", "Bike"])
+        self.assertEqual(sorted(os.listdir(self.tmpdir)),
+                         ["LOCK", "snapshot-00000002", "wal-00000002.log"])
+
+    def test_torn_tail_is_truncated(self):
+        """Tests that a record cut short by a crash is dropped, and later writes kept."""
+        self.populate()
+        self.repo.close()
+        segment = os.path.join(self.tmpdir, "wal-00000001.log")
+        with open(segment, "ab") as log:
+            log.write(b"\x02\xff\xff")
+        repo = self.reopen()
+        self.assert_populated(repo)
+        repo.add_workout("A", "Workout", "Swim", 15, 50.0, self.now)
+        self.assertEqual(self.reopen().totals("A")["Workout"]["sessions"], 2)
+
+    def test_clear_is_durable(self):
+        """Tests that clearing is logged like any other write."""
+        self.populate()
+        self.repo.clear()
+        self.assertEqual(self.reopen().get_profile("A"), {})
+
+    def test_snapshot_runs_in_background_past_threshold(self):
+        """Tests that enough log triggers a snapshot that compacts it."""
+        self.repo.snapshot_bytes = 1
+        self.populate()
+        for thread in threading.enumerate():
+            if thread.name == "aceest-snapshot":
+                thread.join()
+        self.assertTrue(any(name.startswith("snapshot-") for name in os.listdir(self.tmpdir)))
+        self.assert_populated(self.reopen())
+
+    def test_failed_log_leaves_memory_as_on_disk(self):
+        """Tests that writes the log could not take are neither kept nor visible."""
+        self.populate()
+        with patch.object(WriteAheadLog, "_write", side_effect=OSError("disk full")):
+            for _ in range(3):
+                with self.assertRaises(WALError):
+                    self.repo.add_workout("A", "Workout", "Swim", 15, 50.0, self.now)
+        self.assert_populated(self.repo)
+        with self.assertRaises(WALError):
+            self.repo.save_profile("A", {"weight": 90.0})
+        self.assertEqual(self.repo.get_profile("A"), {"weight": 70.0})
+        self.assert_populated(self.reopen())
+
+    def test_forked_workers_cannot_share_the_log(self):
+        """Tests that of two processes forked from the owner only the first may append."""
+        self.populate()
+        ready_r, ready_w = os.pipe()
+        done_r, done_w = os.pipe()
+        first = os.fork()
+        if first == 0:
+            self.repo.reopen()
+            os.write(ready_w, b"1")
+            os.read(done_r, 1)
+            os._exit(0)
+        os.read(ready_r, 1)
+        second = os.fork()
+        if second == 0:
+            try:
+                self.repo.reopen()
+            except WALError:
+                os._exit(0)
+            os._exit(1)
+        _, status = os.waitpid(second, 0)
+        os.write(done_w, b"1")
+        os.waitpid(first, 0)
+        for fd in (ready_r, ready_w, done_r, done_w):
+            os.close(fd)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+
+    def test_directory_is_owned_by_one_process(self):
+        """Tests that a second repository cannot append to the same log."""
+        with self.assertRaises(WALError):
+            DurableRepository(CATEGORIES, self.tmpdir)
+
+
+class CreateRepositoryTests(unittest.TestCase):
+    """Tests for the storage URL parsing."""
+
+    def test_memory_url(self):
+        """Tests the in-memory default."""
+        self.assertIsInstance(create_repository("memory://", CATEGORIES), InMemoryRepository)
+
+    def test_unknown_url(self):
+        """Tests that unsupported schemes are rejected."""
+        with self.assertRaises(ValueError):
+            create_repository("redis://localhost", CATEGORIES)
+
+
+if __name__ == '__main__':
+    unittest.main()
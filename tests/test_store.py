@@ -0,0 +1,141 @@
+# pylint: disable=protected-access
+"""
+Unit tests for the WorkoutLog store and its running aggregates.
+"""
+import unittest
+from datetime import datetime, timedelta
+import numpy as np
+
+# pylint: disable=import-error
+from src.store import WorkoutLog, TIMESTAMP_FORMAT, decode_cursor, encode_cursor, window_start
+# pylint: enable=import-error
+
+
+def make_entry(duration, calories, when, exercise="Running"):
+    """Builds a log entry in the same shape add_workout() stores."""
+    return {
+        "exercise": exercise,
+        "duration": duration,
+        "calories": calories,
+        "timestamp": when.strftime(TIMESTAMP_FORMAT),
+    }
+
+
+class WorkoutLogTests(unittest.TestCase):
+    """Tests for WorkoutLog aggregates, windows and versioning."""
+
+    def setUp(self):
+        self.log = WorkoutLog(["Warm-up", "Workout", "Cool-down"])
+        self.now = datetime(2024, 5, 15, 12, 0, 0)
+
+    def test_append_updates_totals(self):
+        """Tests that totals follow appends without rescanning."""
+        self.log["Workout"].append(make_entry(30, 100.0, self.now))
+        self.log["Workout"].append(make_entry(15, 50.5, self.now))
+        self.log["Warm-up"].append(make_entry(5, 10.0, self.now))
+        totals = self.log.totals()
+        self.assertEqual(totals["Workout"], {"minutes": 45, "calories": 150.5, "sessions": 2})
+        self.assertEqual(totals["Warm-up"]["sessions"], 1)
+        self.assertEqual(totals["Cool-down"], {"minutes": 0, "calories": 0.0, "sessions": 0})
+
+    def test_clear_resets_aggregates_and_bumps_version(self):
+        """Tests that clearing a category zeroes its aggregates."""
+        self.log["Workout"].append(make_entry(30, 100.0, self.now))
+        version = self.log.version
+        self.log["Workout"].clear()
+        self.assertGreater(self.log.version, version)
+        self.assertEqual(len(self.log["Workout"]), 0)
+        self.assertEqual(self.log.totals()["Workout"]["minutes"], 0)
+        self.assertEqual(self.log.window(7, now=self.now)["Workout"]["sessions"], 0)
+
+    def test_day_and_week_windows(self):
+        """Tests rolling windows over the per-day buckets."""
+        self.log["Workout"].append(make_entry(10, 1.0, self.now - timedelta(days=8)))
+        self.log["Workout"].append(make_entry(20, 2.0, self.now - timedelta(days=3)))
+        self.log["Workout"].append(make_entry(40, 4.0, self.now))
+        self.assertEqual(self.log.window(1, now=self.now)["Workout"]["minutes"], 40)
+        self.assertEqual(self.log.window(7, now=self.now)["Workout"]["minutes"], 60)
+        self.assertEqual(self.log.totals()["Workout"]["minutes"], 70)
+
+    def test_since_uses_time_index_for_back_dated_entries(self):
+        """Tests that back-dated sessions are kept in timestamp order."""
+        self.log["Workout"].append(make_entry(40, 4.0, self.now))
+        self.log["Workout"].append(make_entry(10, 1.0, self.now - timedelta(days=10)))
+        self.log["Workout"].append(make_entry(20, 2.0, self.now - timedelta(days=2)))
+        self.assertEqual([e["duration"] for e in self.log["Workout"]], [10, 20, 40])
+        recent = self.log["Workout"].since(window_start(7, now=self.now))
+        self.assertEqual([e["duration"] for e in recent], [20, 40])
+
+
+class ColumnarStorageTests(unittest.TestCase):
+    """Tests for the array-backed session columns."""
+
+    def setUp(self):
+        self.log = WorkoutLog(["Warm-up", "Workout", "Cool-down"])
+        self.now = datetime(2024, 5, 15, 12, 0, 0)
+
+    def test_entries_round_trip_through_columns(self):
+        """Tests that reads return the same entry dicts that were logged."""
+        entry = make_entry(25, 91.875, self.now, exercise="Squats")
+        self.log["Workout"].append(entry)
+        self.assertEqual(self.log["Workout"][0], entry)
+        self.assertEqual(self.log["Workout"][-1], entry)
+        self.assertEqual(list(self.log["Workout"]), [entry])
+        with self.assertRaises(IndexError):
+            _ = self.log["Workout"][1]
+
+    def test_growth_preserves_rows_and_earlier_views(self):
+        """Tests that reallocation keeps data and leaves older views intact."""
+        log = self.log["Workout"]
+        log.add("Run", 1, 1.0, self.now)
+        early = log.columns()["duration"]
+        for minutes in range(2, 101):
+            log.add("Run", minutes, float(minutes), self.now)
+        self.assertEqual(len(log), 100)
+        self.assertEqual(log.columns()["duration"].tolist(), list(range(1, 101)))
+        self.assertEqual(early.tolist(), [1])
+
+    def test_columns_are_typed_read_only_views(self):
+        """Tests the dtypes and immutability of the exposed columns."""
+        self.log["Workout"].add("Run", 30, 100.0, self.now)
+        columns = self.log["Workout"].columns()
+        self.assertEqual(columns["duration"].dtype, np.int64)
+        self.assertEqual(columns["calories"].dtype, np.float64)
+        self.assertEqual(columns["timestamp"].dtype, np.int64)
+        self.assertEqual(columns["exercise"].dtype, np.int32)
+        with self.assertRaises(ValueError):
+            columns["duration"][0] = 1
+
+    def test_exercise_names_are_interned(self):
+        """Tests that repeated names share one string-table code across categories."""
+        self.log["Workout"].add("Run", 30, 100.0, self.now)
+        self.log["Warm-up"].add("Run", 5, 10.0, self.now)
+        self.log["Workout"].add("Row", 10, 50.0, self.now)
+        self.assertEqual(self.log["Workout"].columns()["exercise"].tolist(), [0, 1])
+        self.assertEqual(self.log["Warm-up"].columns()["exercise"].tolist(), [0])
+
+    def test_frame_shares_memory_with_columns(self):
+        """Tests that the pandas view is built without copying the columns."""
+        self.log["Workout"].add("Run", 30, 100.0, self.now)
+        self.log["Workout"].add("Row", 10, 50.0, self.now)
+        frame = self.log.frame("Workout")
+        columns = self.log["Workout"].columns()
+        self.assertTrue(np.shares_memory(frame["duration"].to_numpy(), columns["duration"]))
+        self.assertEqual(frame["exercise"].tolist(), ["Run", "Row"])
+        self.assertEqual(frame["calories"].sum(), 150.0)
+
+
+class CursorTests(unittest.TestCase):
+    """Tests for page cursors."""
+
+    def test_round_trip_and_bounds(self):
+        """Tests that cursors decode back and out-of-range parts are rejected."""
+        self.assertEqual(decode_cursor(encode_cursor(1715774400, 3)), (1715774400, 3))
+        for bad in ("99999999999999999999999.0", f"0.{2**63}", f"{-2**63 - 1}.0",
+                    "5.-1", "abc", "5"):
+            with self.assertRaises(ValueError):
+                decode_cursor(bad)
+
+
+if __name__ == '__main__':
+    unittest.main()